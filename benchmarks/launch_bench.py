@@ -0,0 +1,453 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# launch_bench MODULE
+# --------------------------------------------------
+"""
+Launch-latency and density benchmark.
+
+Measures, and writes as one JSON document:
+
+- cold and warm (zygote) start-to-exec latency: p50 / p95 / p99
+- launches per second at concurrency 1, 2, 4, ... N
+- per-container memory: runtime RSS, container RSS and kernel objects
+
+    sudo python -m benchmarks.launch_bench --rootfs /tmp/rootfs
+    python -m benchmarks.launch_bench --mock --output bench.json
+    python -m benchmarks.launch_bench --mock --compare bench.json
+
+--mock runs unprivileged through MockBackend: spawn becomes a plain
+fork, hostname/rootfs setup are skipped, and cgroups live in a temporary
+directory. It measures the runtime's own overhead, not the kernel's.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from mini_container_runtime import cgroups
+from mini_container_runtime.backend import LinuxBackend, set_backend
+from mini_container_runtime.runtime import MiniRuntime
+
+
+COMMAND = ["/bin/sh", "-c", "exit 0"]
+# Blocks on stdin, which the density run points at a pipe it holds open
+IDLE_COMMAND = ["/bin/sh", "-c", "read x"]
+POLL_INTERVAL = 50e-6
+
+
+# --------------------------------------------------
+# mock mode
+# --------------------------------------------------
+class MockBackend(LinuxBackend):
+    """
+    Real processes without privileges: plain fork instead of clone3
+    into namespaces, no hostname / mounts / chroot, and cgroups as
+    ordinary directories.
+    """
+
+    name = "mock"
+
+    def require_privileges(self):
+        pass
+
+    def cgroup_open(self, path: str) -> int:
+        handle = super().cgroup_open(path)
+        # What a real cgroupfs would provide for an empty cgroup
+        self.cgroup_write(handle, "cgroup.events", "populated 0\nfrozen 0\n")
+        return handle
+
+    def cgroup_write(self, handle: int, filename: str, value):
+        # Plain directories: control files appear on first write
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644,
+                     dir_fd=handle)
+        try:
+            os.write(fd, str(value).encode())
+        finally:
+            os.close(fd)
+
+    def clone(self, flags: int, cgroup: int = None):
+        pid = os.fork()
+        if pid:
+            return pid, os.pidfd_open(pid)
+        return 0, None
+
+    def clone_safe(self) -> bool:
+        return True  # clone() is a plain os.fork() here
+
+    def sethostname(self, hostname: str):
+        pass
+
+    def mount(self, source, target, fstype=None, flags: int = 0, data=None):
+        pass
+
+    def chroot(self, path: str):
+        pass
+
+
+def enable_mock(cgroup_root: str):
+    """
+    Install MockBackend with cgroups under `cgroup_root`.
+
+    Returns a function that puts the previous setup back.
+    """
+    previous_root = cgroups.CGROUP_ROOT
+    previous = set_backend(MockBackend())
+    cgroups.CGROUP_ROOT = cgroup_root
+
+    def restore():
+        cgroups.CGROUP_ROOT = previous_root
+        set_backend(previous)
+    return restore
+
+
+# --------------------------------------------------
+# helpers
+# --------------------------------------------------
+def percentiles(samples_ns) -> dict:
+    ordered = sorted(samples_ns)
+    if not ordered:
+        return {}
+
+    def rank(p):
+        index = max(0, -(-len(ordered) * p // 100) - 1)  # nearest rank
+        return round(ordered[int(index)] / 1e6, 3)
+
+    return {
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "mean_ms": round(sum(ordered) / len(ordered) / 1e6, 3),
+        "samples": len(ordered),
+    }
+
+
+def wait_exec(pid: int, timeout: float = 10.0):
+    """
+    Poll until `pid` is no longer running the Python interpreter, i.e.
+    it has exec'd (or already exited). TimeoutError if it never does.
+
+    Sleeps 50us between checks so a busy loop does not steal the CPU
+    from the very child being measured on small machines.
+    """
+    python = os.path.realpath(sys.executable)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if os.readlink(f"/proc/{pid}/exe") != python:
+                return
+        except OSError:
+            return  # exited (zombie) - exit code checked later
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"pid {pid} did not exec within {timeout}s")
+
+
+def workload_pid(container, timeout: float = 10.0) -> int:
+    """
+    Host pid of the process running the container's command: the
+    container's own pid, or under init (which stays Python) its child.
+    """
+    if not container.init:
+        return container.pid
+    children = f"/proc/{container.pid}/task/{container.pid}/children"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(children) as f:
+                pids = f.read().split()
+            if pids:
+                return int(pids[0])
+            os.readlink(f"/proc/{container.pid}/exe")
+        except OSError:
+            return container.pid  # init already exited (zombie or reaped)
+        time.sleep(POLL_INTERVAL)
+    raise TimeoutError(f"container {container.id} never started its command")
+
+
+def _status_kb(pid, field: str) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _kernel_kb() -> int:
+    # Slab (task_struct, nsproxy, dentries, cgroup css...) plus
+    # per-task kernel stacks and page tables
+    fields = {"Slab", "KernelStack", "PageTables"}
+    total = 0
+    with open("/proc/meminfo") as f:
+        for line in f:
+            name, value = line.split(":", 1)
+            if name in fields:
+                total += int(value.split()[0])
+    return total
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --------------------------------------------------
+# benchmarks
+# --------------------------------------------------
+def bench_latency(rt: MiniRuntime, rootfs: str, iterations: int) -> dict:
+    """
+    Sequential launches; time from launch() to the container's exec.
+    """
+    samples = []
+    failures = 0
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        c = rt.launch(COMMAND, rootfs)
+        try:
+            wait_exec(workload_pid(c))
+        except TimeoutError:
+            rt.stop(c.id)
+            raise
+        elapsed = time.perf_counter_ns() - start
+        rt.wait_all([c])
+        if c.exit_code == 0:
+            samples.append(elapsed)
+        else:
+            failures += 1
+    result = percentiles(samples)
+    result["failures"] = failures
+    return result
+
+
+def bench_throughput(rt: MiniRuntime, rootfs: str, max_concurrency: int,
+                     launches: int) -> list:
+    """
+    Launch-and-wait loops on `concurrency` threads; launches per second.
+    """
+    def worker(count):
+        for _ in range(count):
+            rt.wait_all([rt.launch(COMMAND, rootfs)])
+
+    results = []
+    concurrency = 1
+    while concurrency <= max_concurrency:
+        per_worker = max(1, launches // concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(worker, [per_worker] * concurrency))
+        seconds = time.perf_counter() - start
+        total = per_worker * concurrency
+        results.append({
+            "concurrency": concurrency,
+            "launches": total,
+            "seconds": round(seconds, 3),
+            "launches_per_sec": round(total / seconds, 1),
+        })
+        concurrency *= 2
+    return results
+
+
+def bench_memory(rt: MiniRuntime, rootfs: str, count: int) -> dict:
+    """
+    Hold `count` idle containers and attribute the memory growth.
+    """
+    stdin_r, stdin_w = os.pipe()
+    saved_stdin = os.dup(0)
+    os.dup2(stdin_r, 0)
+    os.close(stdin_r)
+
+    runtime_before = _status_kb("self", "VmRSS")
+    kernel_before = _kernel_kb()
+    try:
+        held = [rt.launch(IDLE_COMMAND, rootfs) for _ in range(count)]
+    finally:
+        os.dup2(saved_stdin, 0)
+        os.close(saved_stdin)
+    try:
+        workloads = [workload_pid(c) for c in held]
+        for pid in workloads:
+            wait_exec(pid)
+        time.sleep(0.2)  # let the shells settle into read()
+
+        runtime_kb = _status_kb("self", "VmRSS") - runtime_before
+        kernel_kb = _kernel_kb() - kernel_before
+        container_kb = 0
+        for c, pid in zip(held, workloads):
+            container_kb += _status_kb(pid, "VmRSS")
+            if pid != c.pid:
+                container_kb += _status_kb(c.pid, "VmRSS")  # init
+    finally:
+        os.close(stdin_w)  # every `read` sees EOF and the containers exit
+        rt.wait_all(held, timeout=30)
+    return {
+        "containers": count,
+        "runtime_rss_kb_per_container": round(runtime_kb / count, 1),
+        "container_rss_kb_per_container": round(container_kb / count, 1),
+        "kernel_kb_per_container": round(kernel_kb / count, 1),
+    }
+
+
+def run(args) -> dict:
+    tmp = None
+    restore = None
+    if args.mock:
+        tmp = tempfile.mkdtemp(prefix="mcr-bench-")
+        restore = enable_mock(os.path.join(tmp, "cgroup"))
+    elif args.cgroup_root:
+        cgroups.CGROUP_ROOT = args.cgroup_root
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "mode": "mock" if args.mock else "kernel",
+            "kernel": platform.release(),
+            "python": platform.python_version(),
+            "params": {
+                "iterations": args.iterations,
+                "max_concurrency": args.max_concurrency,
+                "launches": args.launches,
+                "density": args.density,
+            },
+        },
+    }
+    try:
+        cold = MiniRuntime()
+        try:
+            results["latency"] = {
+                "cold": bench_latency(cold, args.rootfs, args.iterations),
+            }
+            results["throughput"] = bench_throughput(
+                cold, args.rootfs, args.max_concurrency, args.launches
+            )
+            results["memory"] = bench_memory(cold, args.rootfs, args.density)
+        finally:
+            cold.shutdown()
+
+        warm = MiniRuntime(zygote=True)
+        try:
+            warm.pool.prewarm(args.rootfs)
+            results["latency"]["warm"] = bench_latency(
+                warm, args.rootfs, args.iterations
+            )
+            results["latency"]["warm"]["pool"] = warm.pool_stats()
+        finally:
+            warm.shutdown()
+    finally:
+        if restore:
+            restore()
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """
+    Relative change of the headline numbers, as printable lines.
+    """
+    lines = []
+
+    def delta(label, old, new, higher_is_better=False):
+        if not old or new is None:
+            return
+        change = (new - old) / old * 100
+        better = change > 0 if higher_is_better else change < 0
+        lines.append(
+            f"{label:<32} {old:>10} -> {new:>10}  {change:+6.1f}%"
+            f"{'' if abs(change) < 5 else ('  better' if better else '  WORSE')}"
+        )
+
+    for kind in ("cold", "warm"):
+        old = baseline.get("latency", {}).get(kind, {})
+        new = current.get("latency", {}).get(kind, {})
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            delta(f"latency.{kind}.{key}", old.get(key), new.get(key))
+    old_tp = {r["concurrency"]: r for r in baseline.get("throughput", [])}
+    for row in current.get("throughput", []):
+        old = old_tp.get(row["concurrency"])
+        if old:
+            delta(f"launches_per_sec@{row['concurrency']}",
+                  old["launches_per_sec"], row["launches_per_sec"], True)
+    old_mem = baseline.get("memory", {})
+    for key, value in current.get("memory", {}).items():
+        if key.endswith("_per_container"):
+            delta(f"memory.{key}", old_mem.get(key), value)
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mock", action="store_true",
+                        help="unprivileged run with mocked syscalls")
+    parser.add_argument("--rootfs", default="/tmp/rootfs")
+    parser.add_argument("--cgroup-root", default=None,
+                        help="cgroup2 mount to use (default /sys/fs/cgroup)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--launches", type=int, default=256,
+                        help="launches per concurrency level")
+    parser.add_argument("--density", type=int, default=100,
+                        help="idle containers held for the memory run")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {args.compare} ({baseline['meta'].get('commit')}):",
+              file=sys.stderr)
+        for line in compare(baseline, results):
+            print(line, file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    main()
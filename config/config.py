@@ -49,6 +49,8 @@ class Config:
     DEFAULT_CGROUP_CPU_LIMIT = os.getenv("MCR_CPU_LIST", "100%")
     DEFAULT_CGROUP_MEMORY_LIST = os.getenv("MCR_MEMORY_LIMIT", "512M")
     DEFAULT_CONTAINER_ROOT = os.getenv("MCR_ROOT_FS", "/var/lib/mcr")
+    # Network mode of new containers: host, none, loopback or bridge
+    # (see mini_container_runtime.network)
     DEFAULT_NETWORK_NAMESPACE = os.getenv("MCR_NET_NS", "host")
 
     # Logging
@@ -56,9 +58,20 @@ class Config:
     PROJECT_DIR = os.path.abspath(os.path.join(
             os.path.dirname(__file__), "..",
         ))
-    LOG_FILE = os.path.join(PROJECT_DIR, "logs",
-                            "mini_container.log")
+    LOG_FILE = os.getenv("MCR_LOG_FILE", os.path.join(
+        PROJECT_DIR, "logs", "mini_container.log",
+    ))
+    # Records buffered for the background writer before new ones are dropped
+    LOG_QUEUE_SIZE = int(os.getenv("MCR_LOG_QUEUE_SIZE", "10000"))
+    LOG_FLUSH_INTERVAL = float(os.getenv("MCR_LOG_FLUSH_INTERVAL", "0.2"))
     
+    # Per-container launch tracing (see mini_container_runtime.tracing)
+    TRACE_ENABLED = os.getenv("MCR_TRACE", "0").lower() in ("1", "true")
+
+    # Run a minimal init as PID 1 of each container (see
+    # mini_container_runtime.init)
+    INIT_ENABLED = os.getenv("MCR_INIT", "0").lower() in ("1", "true")
+
     # Heartbeat / monitoring
     HEARTBEAT_INTERVAL = int(os.getenv(
         "MCR_HEARTBEAT_INTERVAL", "5"
@@ -68,3 +81,64 @@ class Config:
     DEFAULT_TIMEOUT_SECONDS = int(os.getenv(
         "MCR_DEFAULT_TIMEOUT", "60"
     ))
+
+    # Zygote mode (warm pool of pre-isolated init processes)
+    ZYGOTE_POOL_SIZE = int(os.getenv(
+        "MCR_ZYGOTE_POOL_SIZE", "4"
+    ))
+    ZYGOTE_MAX_IDLE_SECONDS = int(os.getenv(
+        "MCR_ZYGOTE_MAX_IDLE", "300"
+    ))
+
+    # Cgroup lifecycle
+    CGROUP_PARENT = os.getenv("MCR_CGROUP_PARENT", "mini.slice")
+    CGROUP_FREE_LIST_SIZE = int(os.getenv(
+        "MCR_CGROUP_FREE_LIST", "64"
+    ))
+    CGROUP_REAP_INTERVAL = int(os.getenv(
+        "MCR_CGROUP_REAP_INTERVAL", "10"
+    ))
+
+    # Captured container stdout/stderr
+    CONTAINER_LOG_DIR = os.getenv(
+        "MCR_CONTAINER_LOG_DIR", os.path.join(DEFAULT_CONTAINER_ROOT, "logs")
+    )
+    OUTPUT_RING_KB = int(os.getenv("MCR_OUTPUT_RING_KB", "64"))
+    OUTPUT_MAX_BYTES = int(os.getenv(
+        "MCR_OUTPUT_MAX_BYTES", str(10 * 1024 * 1024)
+    ))
+    OUTPUT_BACKUPS = int(os.getenv("MCR_OUTPUT_BACKUPS", "3"))
+    # Seconds an exited container (and its output tail) stays in memory
+    EXITED_RETENTION = float(os.getenv("MCR_EXITED_RETENTION", "300"))
+
+    # Placement scheduler: CPUs kept for the host, and how far shared
+    # CPU requests may exceed the shared pool
+    RESERVED_CPUS = os.getenv("MCR_RESERVED_CPUS", "")
+    CPU_OVERCOMMIT = float(os.getenv("MCR_CPU_OVERCOMMIT", "1.0"))
+
+    # Admission control: host budget for reserved memory_limit (bytes,
+    # K/M/G accepted) and cpu_quota (CPUs); empty means the whole host
+    ADMISSION_MEMORY = os.getenv("MCR_ADMISSION_MEMORY", "")
+    ADMISSION_CPUS = os.getenv("MCR_ADMISSION_CPUS", "")
+
+    # Container state store (SQLite, WAL mode)
+    STATE_DB = os.getenv(
+        "MCR_STATE_DB", os.path.join(DEFAULT_CONTAINER_ROOT, "state.db")
+    )
+
+    # Runtime daemon (mcrd) and its client (mcr)
+    DAEMON_SOCKET = os.getenv("MCR_SOCKET", "/run/mcr.sock")
+    DAEMON_WORKERS = int(os.getenv("MCR_DAEMON_WORKERS", "16"))
+    # Grace period between SIGTERM and SIGKILL on stop
+    STOP_TIMEOUT = float(os.getenv("MCR_STOP_TIMEOUT", "10"))
+
+    # Container networking: the bridge and subnet of "bridge" mode, and
+    # how many pre-configured namespaces to keep per mode
+    NETWORK_BRIDGE = os.getenv("MCR_BRIDGE", "mcr0")
+    NETWORK_SUBNET = os.getenv("MCR_SUBNET", "10.88.0.0/16")
+    NETNS_POOL_SIZE = int(os.getenv("MCR_NETNS_POOL_SIZE", "8"))
+
+    # Per-container scratch area (overlay upper/work dirs)
+    SCRATCH_DIR = os.getenv(
+        "MCR_SCRATCH_DIR", os.path.join(DEFAULT_CONTAINER_ROOT, "containers")
+    )
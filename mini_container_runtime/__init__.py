@@ -38,5 +38,21 @@ A minimal educational container runtime using Linux namespaces and cgroups.
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
-from .runtime import MiniRuntime
-from .container import Container
+import importlib
+
+__all__ = ["MiniRuntime", "Container"]
+
+# Loaded on first use so light entry points (client.py) don't pay for
+# the whole runtime at startup
+_LAZY = {
+    "MiniRuntime": ".runtime",
+    "Container": ".container",
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,283 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# admission MODULE
+# --------------------------------------------------
+"""
+Host-wide admission control for container launches.
+
+Every launch reserves its memory_limit and cpu_quota against a host
+budget. Requests that do not fit wait in a queue and are admitted as
+running containers exit:
+
+- higher priorities first, strictly
+- within a priority, the tenant that has used the least (dominant share
+  of memory or CPU, divided by its weight) goes next
+- the head of the queue is never skipped for a smaller request behind
+  it, so large requests cannot starve
+
+Containers without a memory_limit or cpu_quota reserve nothing of that
+resource.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import threading
+import time
+from collections import deque
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import parse_bytes, parse_cpu
+
+
+log = setup_logger("Admission")
+
+
+# --------------------------------------------------
+# ticket
+# --------------------------------------------------
+class Ticket:
+    """
+    A queued launch. `spec` holds the launch keyword arguments.
+    """
+
+    def __init__(self, tenant: str, priority: int, memory: int,
+                 cpus: float, spec: dict = None):
+        self.tenant = tenant
+        self.priority = priority
+        self.memory = memory
+        self.cpus = cpus
+        self.spec = spec or {}
+        self.submitted = time.monotonic()
+        self.admitted = None
+        self.container = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def wait_time(self) -> float:
+        end = self.admitted if self.admitted is not None else time.monotonic()
+        return end - self.submitted
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: float = None):
+        """
+        Block until launched and return the container. Needs something
+        else dispatching exit events (e.g. runtime.monitor.start()).
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Not admitted after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.container
+
+    def finish(self, container=None, error=None):
+        self.container = container
+        self.error = error
+        self._done.set()
+
+
+def request_size(memory_limit=None, cpu_quota=None) -> tuple:
+    """
+    (bytes, CPUs) a launch reserves; unlimited resources count as 0.
+    """
+    memory = 0
+    if memory_limit is not None:
+        size = parse_bytes(memory_limit)
+        memory = 0 if size == "max" else size
+    cpus = 0.0
+    if cpu_quota is not None:
+        quota = parse_cpu(cpu_quota)
+        cpus = 0.0 if quota == "max" else quota / 100000
+    return memory, cpus
+
+
+# --------------------------------------------------
+# admission controller
+# --------------------------------------------------
+class AdmissionController:
+    def __init__(
+        self,
+        memory_budget=Config.ADMISSION_MEMORY,
+        cpu_budget=Config.ADMISSION_CPUS,
+        weights: dict = None,
+    ):
+        if memory_budget in ("", None):
+            memory_budget = (os.sysconf("SC_PHYS_PAGES")
+                             * os.sysconf("SC_PAGE_SIZE"))
+        if cpu_budget in ("", None):
+            cpu_budget = os.cpu_count()
+        self.memory_budget = parse_bytes(memory_budget)
+        self.cpu_budget = float(cpu_budget)
+        self.weights = weights or {}
+        self.memory_used = 0
+        self.cpu_used = 0.0
+        # priority -> tenant -> queued tickets
+        self._queues = {}
+        self._vtime = {}
+        self._clock = 0.0
+        self._depth = 0
+        self._admitted = 0
+        self._waits = deque(maxlen=1024)
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return self._depth
+
+    def submit(self, tenant: str = "default", priority: int = 0,
+               memory: int = 0, cpus: float = 0.0,
+               spec: dict = None) -> Ticket:
+        """
+        Queue a request; admissible() hands it back once it fits.
+        """
+        if memory > self.memory_budget or cpus > self.cpu_budget:
+            raise ValueError(
+                f"Request ({memory} bytes, {cpus} CPUs) exceeds the host "
+                f"budget ({self.memory_budget} bytes, {self.cpu_budget} CPUs)"
+            )
+        ticket = Ticket(tenant, priority, memory, cpus, spec)
+        with self._lock:
+            if not self._active(tenant):
+                # No credit for time spent idle
+                self._vtime[tenant] = max(
+                    self._vtime.get(tenant, 0.0), self._clock
+                )
+            tenants = self._queues.setdefault(priority, {})
+            tenants.setdefault(tenant, deque()).append(ticket)
+            self._depth += 1
+        return ticket
+
+    def admissible(self) -> list:
+        """
+        Dequeue and reserve every ticket that fits now, in fair order.
+        """
+        admitted = []
+        with self._lock:
+            while self._depth:
+                tenants = self._queues[max(self._queues)]
+                tenant = min(tenants, key=lambda t: (self._vtime[t], t))
+                ticket = tenants[tenant][0]
+                if not self._fits(ticket):
+                    break
+                tenants[tenant].popleft()
+                if not tenants[tenant]:
+                    del tenants[tenant]
+                    if not tenants:
+                        del self._queues[ticket.priority]
+                self._depth -= 1
+                self._reserve(ticket)
+                admitted.append(ticket)
+        for ticket in admitted:
+            if ticket.wait_time > 0.001:
+                log.info(
+                    f"Admitted {ticket.tenant} request after "
+                    f"{ticket.wait_time:.3f}s in queue"
+                )
+        return admitted
+
+    def restore(self, tenant: str, memory: int = 0,
+                cpus: float = 0.0) -> Ticket:
+        """
+        Book a container admitted before a runtime restart; returns its
+        (already admitted) ticket for release().
+        """
+        ticket = Ticket(tenant, 0, memory, cpus, None)
+        with self._lock:
+            self.memory_used += memory
+            self.cpu_used += cpus
+            ticket.admitted = ticket.submitted
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """
+        Give back an admitted ticket's reservation.
+        """
+        with self._lock:
+            self.memory_used -= ticket.memory
+            self.cpu_used -= ticket.cpus
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            depth = {}
+            oldest = 0.0
+            for tenants in self._queues.values():
+                for tenant, queued in tenants.items():
+                    depth[tenant] = depth.get(tenant, 0) + len(queued)
+                    oldest = max(oldest, queued[0].wait_time)
+            return {
+                "memory_used": self.memory_used,
+                "memory_budget": self.memory_budget,
+                "cpu_used": round(self.cpu_used, 3),
+                "cpu_budget": self.cpu_budget,
+                "queued": self._depth,
+                "queued_by_tenant": depth,
+                "oldest_wait": oldest,
+                "admitted": self._admitted,
+                "wait_p50": _percentile(waits, 50),
+                "wait_p95": _percentile(waits, 95),
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+
+    def _active(self, tenant: str) -> bool:
+        return any(tenant in tenants for tenants in self._queues.values())
+
+    def _fits(self, ticket: Ticket) -> bool:
+        return (
+            self.memory_used + ticket.memory <= self.memory_budget
+            and self.cpu_used + ticket.cpus <= self.cpu_budget
+        )
+
+    def _reserve(self, ticket: Ticket):
+        self.memory_used += ticket.memory
+        self.cpu_used += ticket.cpus
+        # Charge the tenant its dominant share, scaled by its weight;
+        # unlimited launches still cost a little so they take turns
+        share = max(ticket.memory / self.memory_budget,
+                    ticket.cpus / self.cpu_budget, 0.001)
+        self._clock = self._vtime[ticket.tenant]
+        self._vtime[ticket.tenant] += (
+            share / self.weights.get(ticket.tenant, 1.0)
+        )
+        ticket.admitted = time.monotonic()
+        self._admitted += 1
+        self._waits.append(ticket.wait_time)
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * pct / 100))
+    return values[index]
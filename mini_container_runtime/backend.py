@@ -0,0 +1,1043 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# backend MODULE
+# --------------------------------------------------
+"""
+Kernel backends.
+
+Every interaction with the kernel - cgroupfs, namespaces, mounts and
+process creation / reaping - goes through the process-wide backend
+returned by `get_backend()`:
+
+- LinuxBackend      - the real thing (syscalls, /sys/fs/cgroup, pidfds)
+- SimulatedBackend  - in-process model of a cgroup v2 hierarchy, its
+                      limits and process membership, for running
+                      placement / reaping / telemetry at scale, unprivileged
+
+Handles returned by `cgroup_open` are opaque ints: real O_PATH fds on
+Linux, table keys in the simulation.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import abc
+import collections
+import contextlib
+import errno
+import itertools
+import os
+import signal
+import socket
+import struct
+import threading
+from mini_container_runtime import netlink, syscalls, utils
+
+
+# --------------------------------------------------
+# kernel backend
+# --------------------------------------------------
+class KernelBackend(abc.ABC):
+    """
+    Interface every backend implements; a backend missing any method
+    fails when it is constructed.
+    """
+
+    name = "abstract"
+
+    @abc.abstractmethod
+    def require_privileges(self):
+        raise NotImplementedError
+
+    # cgroupfs
+    @abc.abstractmethod
+    def cgroup_open(self, path: str) -> int:
+        """Create `path` (and parents) if missing; return a handle."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cgroup_close(self, handle: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cgroup_read(self, handle: int, filename: str) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cgroup_write(self, handle: int, filename: str, value):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cgroup_remove(self, path: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat_open(self, handle: int, filename: str) -> int:
+        """Open a stat file of a cgroup for repeated `stat_read`."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat_read(self, stat_handle: int) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stat_close(self, stat_handle: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def watch_events(self, inotify_fd: int, path: str):
+        """
+        Arrange for changes to `path`/cgroup.events to wake `inotify_fd`.
+        Returns a watch descriptor, or None when not needed.
+        """
+        raise NotImplementedError
+
+    # processes and namespaces
+    @abc.abstractmethod
+    def clone(self, flags: int, cgroup: int = None):
+        """
+        Create a process in new namespaces `flags` (and in `cgroup`).
+        Returns (pid, pidfd) in the parent and (0, None) in the child.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clone_safe(self) -> bool:
+        """
+        Whether a clone() child may run arbitrary code right now. When
+        False, callers clone from a single-threaded process forked for
+        the purpose (see namespaces.spawn).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def fork(self) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def pidfd_open(self, pid: int) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def pidfd_signal(self, pidfd: int, sig: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def start_time(self, pid: int):
+        """
+        When `pid` started, in backend-specific units; None if there is
+        no such process. Tells a live process from a reused PID.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def wait(self, pid: int, options: int = 0):
+        """os.wait4() semantics: (pid, status, rusage)."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def kill(self, pid: int, sig: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def unshare(self, flags: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def setns(self, pidfd: int, flags: int):
+        """Join the namespaces `flags` of the process behind `pidfd`."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def open_root(self, pid: int):
+        """
+        Handle on the root directory of `pid` (after its chroot), for
+        fchdir() + chroot("."); None if there is none to hand out.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def sethostname(self, hostname: str):
+        raise NotImplementedError
+
+    # network namespaces
+    @abc.abstractmethod
+    def netns_create(self) -> int:
+        """
+        A new network namespace, held open by the returned fd; processes
+        join it with setns(fd, CLONE_NEWNET).
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def netns_close(self, netns: int):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def netlink_open(self, netns: int = None):
+        """
+        An rtnetlink socket whose requests apply to `netns` (default:
+        ours), for netlink.Netlink.
+        """
+        raise NotImplementedError
+
+    # mounts
+    @abc.abstractmethod
+    def mount(self, source, target, fstype=None, flags: int = 0, data=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def chroot(self, path: str):
+        raise NotImplementedError
+
+
+# --------------------------------------------------
+# linux backend
+# --------------------------------------------------
+class LinuxBackend(KernelBackend):
+    name = "linux"
+
+    def require_privileges(self):
+        utils.require_root()
+
+    def cgroup_open(self, path: str) -> int:
+        utils.ensure_dir(path)
+        return os.open(path, os.O_PATH | os.O_DIRECTORY)
+
+    def cgroup_close(self, handle: int):
+        os.close(handle)
+
+    def cgroup_read(self, handle: int, filename: str) -> str:
+        fd = os.open(filename, os.O_RDONLY, dir_fd=handle)
+        try:
+            return os.read(fd, 65536).decode()
+        finally:
+            os.close(fd)
+
+    def cgroup_write(self, handle: int, filename: str, value):
+        # Control files always exist: a typo must fail, not create one
+        fd = os.open(filename, os.O_WRONLY, dir_fd=handle)
+        try:
+            os.write(fd, str(value).encode())
+        finally:
+            os.close(fd)
+
+    def cgroup_remove(self, path: str):
+        os.rmdir(path)
+
+    def stat_open(self, handle: int, filename: str) -> int:
+        return os.open(filename, os.O_RDONLY, dir_fd=handle)
+
+    def stat_read(self, stat_handle: int) -> str:
+        return os.pread(stat_handle, 4096, 0).decode()
+
+    def stat_close(self, stat_handle: int):
+        os.close(stat_handle)
+
+    def watch_events(self, inotify_fd: int, path: str):
+        return syscalls.inotify_add_watch(
+            inotify_fd,
+            os.path.join(path, "cgroup.events"),
+            syscalls.IN_MODIFY,
+        )
+
+    def clone(self, flags: int, cgroup: int = None):
+        try:
+            return syscalls.clone3(flags, cgroup)
+        except OSError as e:
+            # Old kernels (or seccomp profiles) without clone3 or
+            # CLONE_INTO_CGROUP: clone, then join the cgroup
+            if e.errno not in (errno.ENOSYS, errno.E2BIG):
+                raise
+        pid = syscalls.clone(flags)
+        if pid == 0:
+            if cgroup is not None:
+                try:
+                    self.cgroup_write(cgroup, "cgroup.procs", 0)
+                except OSError:
+                    os._exit(127)
+            return 0, None
+        if flags & syscalls.CLONE_PARENT:
+            return pid, None  # our parent's child: not ours to open
+        return pid, os.pidfd_open(pid)
+
+    def clone_safe(self) -> bool:
+        # A raw clone3 skips libc's atfork handlers: a lock another
+        # thread holds (malloc, stdio) stays locked in the child forever
+        return len(os.listdir("/proc/self/task")) == 1
+
+    def fork(self) -> int:
+        return os.fork()
+
+    def pidfd_open(self, pid: int) -> int:
+        return os.pidfd_open(pid)
+
+    def pidfd_signal(self, pidfd: int, sig: int):
+        signal.pidfd_send_signal(pidfd, sig)
+
+    def start_time(self, pid: int):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Field 22, counted after the parenthesised comm
+                return int(f.read().rsplit(")", 1)[1].split()[19])
+        except (FileNotFoundError, ProcessLookupError):
+            return None
+
+    def wait(self, pid: int, options: int = 0):
+        return os.wait4(pid, options)
+
+    def kill(self, pid: int, sig: int):
+        os.kill(pid, sig)
+
+    def unshare(self, flags: int):
+        syscalls.unshare(flags)
+
+    def setns(self, pidfd: int, flags: int):
+        syscalls.setns(pidfd, flags)
+
+    def open_root(self, pid: int):
+        return os.open(f"/proc/{pid}/root", os.O_PATH | os.O_DIRECTORY)
+
+    def sethostname(self, hostname: str):
+        syscalls.sethostname(hostname)
+
+    # network namespaces
+    def netns_create(self) -> int:
+        with _thread_netns():
+            return os.open("/proc/thread-self/ns/net", os.O_RDONLY)
+
+    def netns_close(self, netns: int):
+        # The kernel tears the namespace (and its veths) down once the
+        # last process has left it too
+        os.close(netns)
+
+    def netlink_open(self, netns: int = None):
+        with _thread_netns(netns) if netns is not None else \
+                contextlib.nullcontext():
+            return socket.socket(socket.AF_NETLINK, socket.SOCK_RAW,
+                                 socket.NETLINK_ROUTE)
+
+    def mount(self, source, target, fstype=None, flags: int = 0, data=None):
+        syscalls.mount(source, target, fstype, flags, data)
+
+    def chroot(self, path: str):
+        os.chroot(path)
+
+
+@contextlib.contextmanager
+def _thread_netns(netns: int = None):
+    """
+    Run the block with the calling thread (only) in `netns`, or in a
+    fresh network namespace; sockets opened there stay bound to it.
+    """
+    host = os.open("/proc/thread-self/ns/net", os.O_RDONLY)
+    try:
+        if netns is None:
+            syscalls.unshare(syscalls.CLONE_NEWNET)
+        else:
+            syscalls.setns(netns, syscalls.CLONE_NEWNET)
+        try:
+            yield
+        finally:
+            syscalls.setns(host, syscalls.CLONE_NEWNET)
+    finally:
+        os.close(host)
+
+
+# --------------------------------------------------
+# simulated backend
+# --------------------------------------------------
+SIM_CONTROLLERS = ("cpu", "cpuset", "io", "memory", "pids", "hugetlb")
+
+# What an untouched control file reads back as
+SIM_DEFAULTS = {
+    "memory.max": "max",
+    "memory.high": "max",
+    "memory.low": "0",
+    "memory.min": "0",
+    "memory.swap.max": "max",
+    "pids.max": "max",
+    "cpu.max": "max 100000",
+    "cpu.weight": "100",
+    "io.weight": "default 100",
+    "io.max": "",
+    "cpuset.cpus": "",
+    "cpuset.mems": "",
+}
+
+_PRESSURE = (
+    "some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+    "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+)
+
+
+def _sim_error(code: int, path: str = None):
+    return OSError(code, os.strerror(code), path)
+
+
+class SimCgroup:
+    def __init__(self, path: str, parent=None):
+        self.path = path
+        self.parent = parent
+        self.children = {}
+        self.files = {}
+        self.subtree_control = set()
+        self.procs = set()
+        self.frozen = False
+        self.memory_peak = 0
+        self.oom_kills = 0
+
+    def controllers(self, root_controllers) -> set:
+        if self.parent is None:
+            return set(root_controllers)
+        return set(self.parent.subtree_control)
+
+    def subtree(self):
+        yield self
+        for child in self.children.values():
+            yield from child.subtree()
+
+    def limit(self, filename: str):
+        value = self.files.get(filename, "max").split()[0]
+        return None if value == "max" else int(value)
+
+
+_sim_clock = itertools.count(1)
+
+
+class SimProcess:
+    def __init__(self, pid: int, flags: int, cgroup: SimCgroup, pidfd: int):
+        self.pid = pid
+        self.flags = flags
+        self.cgroup = cgroup
+        self.pidfd = pidfd
+        self.memory = 0
+        self.cpu_usec = 0
+        self.status = None  # wait status once exited
+        self.started = next(_sim_clock)
+
+
+class SimLink:
+    def __init__(self, index: int, name: str, kind: str):
+        self.index = index
+        self.name = name
+        self.kind = kind
+        self.up = False
+        self.master = None
+        self.addresses = []
+        self.peer = None  # (netns, name) of the other end of a veth
+
+
+class SimNetns:
+    def __init__(self):
+        self.links = {"lo": SimLink(1, "lo", "loopback")}
+        self.routes = []
+
+    def link(self, index: int = 0, name: str = None) -> SimLink:
+        for link in self.links.values():
+            if link.index == index or link.name == name:
+                return link
+        raise _sim_error(errno.ENODEV, name)
+
+
+class SimNetlink:
+    """
+    Stand-in for an rtnetlink socket: applies the requests netlink.Netlink
+    sends to the backend's model of namespace `netns` and queues the
+    replies the kernel would send.
+    """
+
+    def __init__(self, backend, netns):
+        self.backend = backend
+        self.netns = netns
+        self._replies = collections.deque()
+
+    def send(self, data: bytes) -> int:
+        for kind, flags, seq, body in netlink.parse_messages(data):
+            try:
+                with self.backend._lock:
+                    replies = self._handle(kind, flags, body)
+                code = 0
+            except OSError as e:
+                replies, code = [], e.errno
+            # Only RTM_GETLINK answers with a message (an RTM_NEWLINK)
+            for reply in replies:
+                self._replies.append(netlink.message(
+                    netlink.RTM_NEWLINK, 0, seq, reply
+                ))
+            self._replies.append(netlink.message(
+                netlink.NLMSG_ERROR, 0, seq,
+                struct.pack("=i", -code) + data[:16],
+            ))
+        return len(data)
+
+    def recv(self, size: int) -> bytes:
+        return self._replies.popleft()
+
+    def close(self):
+        pass
+
+    def _handle(self, kind: int, flags: int, body: bytes) -> list:
+        ns = self.backend._netns_model(self.netns)
+        if kind in (netlink.RTM_NEWADDR, netlink.RTM_NEWROUTE):
+            return self._address_or_route(ns, kind, flags, body)
+        _, _, index, ifflags, change = struct.unpack_from(
+            netlink.IFINFOMSG, body
+        )
+        attrs = netlink.parse_attrs(body[16:])
+        name = attrs.get(netlink.IFLA_IFNAME, b"").rstrip(b"\0").decode()
+        if kind == netlink.RTM_GETLINK:
+            link = ns.link(index, name)
+            return [struct.pack(netlink.IFINFOMSG, 0, 0, link.index,
+                                int(link.up), 0)]
+        if kind == netlink.RTM_DELLINK:
+            self.backend._remove_link(self.netns, ns.link(index).name)
+            return []
+        if index:
+            link = ns.link(index)
+            if change & netlink.IFF_UP:
+                link.up = bool(ifflags & netlink.IFF_UP)
+            return []
+        if name in ns.links:
+            if flags & netlink.NLM_F_EXCL:
+                raise _sim_error(errno.EEXIST, name)
+            return []
+        info = netlink.parse_attrs(attrs[netlink.IFLA_LINKINFO])
+        link = self.backend._add_link(
+            ns, name, info[netlink.IFLA_INFO_KIND].decode()
+        )
+        if netlink.IFLA_MASTER in attrs:
+            master = struct.unpack("=I", attrs[netlink.IFLA_MASTER])[0]
+            link.master = ns.link(master).name
+        if link.kind == "veth":
+            data = netlink.parse_attrs(info[netlink.IFLA_INFO_DATA])
+            peer_msg = data[netlink.VETH_INFO_PEER]
+            peer_attrs = netlink.parse_attrs(peer_msg[16:])
+            peer_netns = self.netns
+            if netlink.IFLA_NET_NS_FD in peer_attrs:
+                peer_netns = struct.unpack(
+                    "=I", peer_attrs[netlink.IFLA_NET_NS_FD]
+                )[0]
+            peer_name = peer_attrs[netlink.IFLA_IFNAME].rstrip(b"\0")
+            peer = self.backend._add_link(
+                self.backend._netns_model(peer_netns), peer_name.decode(),
+                "veth",
+            )
+            link.peer = (peer_netns, peer.name)
+            peer.peer = (self.netns, link.name)
+        return []
+
+    def _address_or_route(self, ns, kind: int, flags: int, body: bytes):
+        if kind == netlink.RTM_NEWADDR:
+            _, prefixlen, _, _, index = struct.unpack_from(
+                netlink.IFADDRMSG, body
+            )
+            attrs = netlink.parse_attrs(body[8:])
+            address = f"{socket.inet_ntoa(attrs[netlink.IFA_LOCAL])}" \
+                f"/{prefixlen}"
+            link = ns.link(index)
+            if address in link.addresses:
+                raise _sim_error(errno.EEXIST, address)
+            link.addresses.append(address)
+            return []
+        attrs = netlink.parse_attrs(body[12:])
+        oif = struct.unpack("=I", attrs[netlink.RTA_OIF])[0]
+        ns.routes.append(("default",
+                          socket.inet_ntoa(attrs[netlink.RTA_GATEWAY]),
+                          ns.link(oif).name))
+        return []
+
+
+class SimulatedBackend(KernelBackend):
+    """
+    In-memory cgroup v2 hierarchy plus a process table.
+
+    Processes never run code: `clone` registers a process (with an
+    eventfd standing in for its pidfd, which must stay open until the
+    process is reaped) and only ever returns in the "parent". Tests and simulations drive them explicitly:
+
+        pid = ...                   # from a launched Container
+        sim.set_memory(pid, 64 << 20)   # may OOM-kill against memory.max
+        sim.charge_cpu(pid, 1000)
+        sim.exit(pid, 0)            # pidfd becomes readable, wait() reaps
+
+    Modelled: controller delegation via cgroup.subtree_control,
+    memory.max (OOM kill), pids.max (EAGAIN on clone), cgroup.procs
+    moves, cgroup.events, cgroup.kill, cgroup.freeze, the stat files
+    read by telemetry (memory.current/peak, pids.current, cpu.stat),
+    and network namespaces with the links, addresses and routes
+    rtnetlink requests create in them (see links() / routes()).
+    """
+
+    name = "simulated"
+
+    def __init__(self, root: str = "/sys/fs/cgroup",
+                 controllers=SIM_CONTROLLERS):
+        self.root_path = root
+        self.root_controllers = tuple(controllers)
+        self.root = SimCgroup(root)
+        self.hostnames = {}
+        self.mounts = []
+        self._nodes = {root: self.root}
+        self._handles = {}
+        self._stats = {}
+        self._procs = {}
+        # pidfd (or a dup from pidfd_open) -> process
+        self._pidfds = {}
+        self._next_handle = itertools.count(1 << 20)
+        self._next_pid = itertools.count(1000)
+        self._lock = threading.RLock()
+        self._exited = threading.Condition(self._lock)
+        # Network namespaces by handle; None is the host's
+        self._netns = {None: SimNetns()}
+        self._next_ifindex = itertools.count(2)
+
+    def require_privileges(self):
+        pass
+
+    # cgroupfs
+    def cgroup_open(self, path: str) -> int:
+        path = os.path.normpath(path)
+        with self._lock:
+            node = self._mkdir(path)
+            handle = next(self._next_handle)
+            self._handles[handle] = node
+            return handle
+
+    def cgroup_close(self, handle: int):
+        with self._lock:
+            self._handles.pop(handle, None)
+
+    def cgroup_read(self, handle: int, filename: str) -> str:
+        with self._lock:
+            node = self._node(handle)
+            return self._read(node, filename)
+
+    def cgroup_write(self, handle: int, filename: str, value):
+        value = str(value).strip()
+        with self._lock:
+            node = self._node(handle)
+            self._write(node, filename, value)
+
+    def cgroup_remove(self, path: str):
+        path = os.path.normpath(path)
+        with self._lock:
+            node = self._nodes.get(path)
+            if node is None or node is self.root:
+                raise _sim_error(errno.ENOENT, path)
+            if node.children or node.procs:
+                raise _sim_error(errno.EBUSY, path)
+            del node.parent.children[os.path.basename(path)]
+            del self._nodes[path]
+
+    def stat_open(self, handle: int, filename: str) -> int:
+        with self._lock:
+            node = self._node(handle)
+            self._read(node, filename)  # ENOENT if not available
+            stat_handle = next(self._next_handle)
+            self._stats[stat_handle] = (node, filename)
+            return stat_handle
+
+    def stat_read(self, stat_handle: int) -> str:
+        with self._lock:
+            node, filename = self._stats[stat_handle]
+            return self._read(node, filename)
+
+    def stat_close(self, stat_handle: int):
+        with self._lock:
+            self._stats.pop(stat_handle, None)
+
+    def watch_events(self, inotify_fd: int, path: str):
+        # Membership only changes on exit, which already wakes the pidfd
+        return None
+
+    # processes and namespaces
+    def clone(self, flags: int, cgroup: int = None):
+        with self._lock:
+            node = self.root if cgroup is None else self._node(cgroup)
+            self._check_pids(node)
+            pid = next(self._next_pid)
+            proc = SimProcess(pid, flags, node, os.eventfd(0, os.EFD_CLOEXEC))
+            self._procs[pid] = proc
+            self._pidfds[proc.pidfd] = proc
+            node.procs.add(pid)
+            # The caller owns the pidfd and closes it after wait(), as
+            # with a real one; it is written to when the process exits.
+            return pid, proc.pidfd
+
+    def clone_safe(self) -> bool:
+        return True  # simulated children never run
+
+    def fork(self) -> int:
+        return self.clone(0)[0]
+
+    def pidfd_open(self, pid: int) -> int:
+        with self._lock:
+            proc = self._proc(pid)
+            pidfd = os.dup(proc.pidfd)
+            self._pidfds[pidfd] = proc
+            return pidfd
+
+    def pidfd_signal(self, pidfd: int, sig: int):
+        with self._lock:
+            proc = self._pidfds.get(pidfd)
+            if proc is None:
+                raise _sim_error(errno.EBADF, "pidfd")
+            self.kill(proc.pid, sig)
+
+    def start_time(self, pid: int):
+        proc = self._procs.get(pid)
+        if proc is None or proc.status is not None:
+            return None
+        return proc.started
+
+    def wait(self, pid: int, options: int = 0):
+        with self._exited:
+            proc = self._proc(pid, errno.ECHILD)
+            while proc.status is None:
+                if options & os.WNOHANG:
+                    return 0, 0, None
+                self._exited.wait()
+            del self._procs[pid]
+            self._pidfds.pop(proc.pidfd, None)
+            return pid, proc.status, None
+
+    def kill(self, pid: int, sig: int):
+        with self._lock:
+            proc = self._proc(pid, errno.ESRCH)
+            if sig and proc.status is None:
+                self._terminate(proc, sig)
+
+    def unshare(self, flags: int):
+        pass
+
+    def setns(self, pidfd: int, flags: int):
+        pass
+
+    def open_root(self, pid: int):
+        return None
+
+    def sethostname(self, hostname: str):
+        self.hostnames[os.getpid()] = hostname
+
+    # network namespaces
+    def netns_create(self) -> int:
+        with self._lock:
+            # An eventfd stands in for the namespace fd, as for pidfds
+            netns = os.eventfd(0, os.EFD_CLOEXEC)
+            self._netns[netns] = SimNetns()
+            return netns
+
+    def netns_close(self, netns: int):
+        with self._lock:
+            model = self._netns.pop(netns)
+            # Links going away take their veth peers with them
+            for link in list(model.links.values()):
+                if link.peer is not None:
+                    self._remove_link(*link.peer)
+        os.close(netns)
+
+    def netlink_open(self, netns: int = None):
+        self._netns_model(netns)
+        return SimNetlink(self, netns)
+
+    # mounts
+    def mount(self, source, target, fstype=None, flags: int = 0, data=None):
+        self.mounts.append((source, target, fstype, flags, data))
+
+    def chroot(self, path: str):
+        pass
+
+    # simulation controls
+    def exit(self, pid: int, code: int = 0):
+        """
+        Make a simulated process exit with `code`.
+        """
+        with self._lock:
+            proc = self._proc(pid, errno.ESRCH)
+            if proc.status is None:
+                self._finish(proc, (code & 0xff) << 8)
+
+    def set_memory(self, pid: int, nbytes: int):
+        """
+        Set a process's memory use; OOM-kills it if that pushes any
+        ancestor cgroup over memory.max.
+        """
+        with self._lock:
+            proc = self._proc(pid, errno.ESRCH)
+            if proc.status is not None:
+                return
+            proc.memory = nbytes
+            node = proc.cgroup
+            while node is not None:
+                usage = self._memory_current(node)
+                node.memory_peak = max(node.memory_peak, usage)
+                limit = node.limit("memory.max")
+                if limit is not None and usage > limit:
+                    node.oom_kills += 1
+                    self._terminate(proc, signal.SIGKILL)
+                    return
+                node = node.parent
+
+    def charge_cpu(self, pid: int, usec: int):
+        with self._lock:
+            self._proc(pid, errno.ESRCH).cpu_usec += usec
+
+    def processes(self, path: str = None) -> list:
+        """
+        Live pids, optionally only those in `path` and its children.
+        """
+        with self._lock:
+            if path is None:
+                return [p.pid for p in self._procs.values()
+                        if p.status is None]
+            node = self._nodes[os.path.normpath(path)]
+            return sorted(pid for n in node.subtree() for pid in n.procs)
+
+    def links(self, netns: int = None) -> dict:
+        """
+        Link name -> SimLink in `netns` (default: the host's).
+        """
+        with self._lock:
+            return dict(self._netns_model(netns).links)
+
+    def routes(self, netns: int = None) -> list:
+        with self._lock:
+            return list(self._netns_model(netns).routes)
+
+    # internals
+    def _netns_model(self, netns) -> SimNetns:
+        model = self._netns.get(netns)
+        if model is None:
+            raise _sim_error(errno.EBADF, "netns")
+        return model
+
+    def _add_link(self, ns: SimNetns, name: str, kind: str) -> SimLink:
+        link = SimLink(next(self._next_ifindex), name, kind)
+        ns.links[name] = link
+        return link
+
+    def _remove_link(self, netns, name: str):
+        ns = self._netns.get(netns)
+        link = ns.links.pop(name, None) if ns is not None else None
+        if link is not None and link.peer is not None:
+            peer_netns, peer_name = link.peer
+            peer_ns = self._netns.get(peer_netns)
+            if peer_ns is not None:
+                peer_ns.links.pop(peer_name, None)
+
+    def _mkdir(self, path: str) -> SimCgroup:
+        node = self._nodes.get(path)
+        if node is not None:
+            return node
+        if not path.startswith(self.root_path + os.sep):
+            raise _sim_error(errno.ENOENT, path)
+        parent = self._mkdir(os.path.dirname(path))
+        node = SimCgroup(path, parent)
+        parent.children[os.path.basename(path)] = node
+        self._nodes[path] = node
+        return node
+
+    def _node(self, handle: int) -> SimCgroup:
+        node = self._handles.get(handle)
+        if node is None:
+            raise _sim_error(errno.EBADF)
+        if self._nodes.get(node.path) is not node:
+            raise _sim_error(errno.ENOENT, node.path)  # rmdir'd
+        return node
+
+    def _proc(self, pid: int, code: int = errno.ESRCH) -> SimProcess:
+        proc = self._procs.get(pid)
+        if proc is None:
+            raise _sim_error(code)
+        return proc
+
+    def _available(self, node: SimCgroup, filename: str) -> bool:
+        if filename.startswith("cgroup.") or filename.endswith(".pressure"):
+            return True
+        controller = filename.split(".", 1)[0]
+        if controller not in node.controllers(self.root_controllers):
+            return False
+        # Limits live in child cgroups only, like the real root
+        return node is not self.root or filename.endswith((".stat", ".current"))
+
+    def _memory_current(self, node: SimCgroup) -> int:
+        return sum(
+            self._procs[pid].memory for n in node.subtree() for pid in n.procs
+        )
+
+    def _read(self, node: SimCgroup, filename: str) -> str:
+        if not self._available(node, filename):
+            raise _sim_error(errno.ENOENT, os.path.join(node.path, filename))
+        if filename == "cgroup.procs":
+            return "".join(f"{pid}\n" for pid in sorted(node.procs))
+        if filename == "cgroup.events":
+            populated = any(n.procs for n in node.subtree())
+            return f"populated {int(populated)}\nfrozen {int(node.frozen)}\n"
+        if filename == "cgroup.controllers":
+            return " ".join(sorted(node.controllers(self.root_controllers))) + "\n"
+        if filename == "cgroup.subtree_control":
+            return " ".join(sorted(node.subtree_control)) + "\n"
+        if filename == "cgroup.freeze":
+            return f"{int(node.frozen)}\n"
+        if filename == "memory.current":
+            return f"{self._memory_current(node)}\n"
+        if filename == "memory.peak":
+            return f"{node.memory_peak}\n"
+        if filename == "memory.events":
+            return f"low 0\nhigh 0\nmax 0\noom 0\noom_kill {node.oom_kills}\n"
+        if filename == "pids.current":
+            return f"{sum(len(n.procs) for n in node.subtree())}\n"
+        if filename == "cpu.stat":
+            usage = sum(
+                self._procs[pid].cpu_usec
+                for n in node.subtree() for pid in n.procs
+            )
+            return f"usage_usec {usage}\nuser_usec {usage}\nsystem_usec 0\n"
+        if filename.endswith(".pressure"):
+            return _PRESSURE
+        if filename in node.files:
+            return node.files[filename] + "\n"
+        if filename in SIM_DEFAULTS:
+            return SIM_DEFAULTS[filename] + "\n"
+        return ""
+
+    def _write(self, node: SimCgroup, filename: str, value: str):
+        path = os.path.join(node.path, filename)
+        if not self._available(node, filename):
+            raise _sim_error(errno.ENOENT, path)
+        if filename == "cgroup.procs":
+            self._move(node, int(value))
+        elif filename == "cgroup.subtree_control":
+            self._subtree_control(node, value, path)
+        elif filename == "cgroup.kill":
+            if value != "1":
+                raise _sim_error(errno.EINVAL, path)
+            for n in list(node.subtree()):
+                for pid in list(n.procs):
+                    self._terminate(self._procs[pid], signal.SIGKILL)
+        elif filename == "cgroup.freeze":
+            if value not in ("0", "1"):
+                raise _sim_error(errno.EINVAL, path)
+            for n in node.subtree():
+                n.frozen = value == "1"
+        elif filename in ("memory.max", "memory.high", "memory.low",
+                          "memory.min", "memory.swap.max", "pids.max"):
+            if value != "max" and not value.isdigit():
+                raise _sim_error(errno.EINVAL, path)
+            node.files[filename] = value
+        elif filename == "cpu.max":
+            parts = value.split()
+            if len(parts) == 1:
+                parts.append("100000")
+            if len(parts) != 2 or not parts[1].isdigit() \
+                    or not (parts[0] == "max" or parts[0].isdigit()):
+                raise _sim_error(errno.EINVAL, path)
+            node.files[filename] = " ".join(parts)
+        elif filename == "cpu.weight":
+            if not value.isdigit() or not 1 <= int(value) <= 10000:
+                raise _sim_error(errno.EINVAL, path)
+            node.files[filename] = value
+        else:
+            node.files[filename] = value
+
+    def _subtree_control(self, node: SimCgroup, value: str, path: str):
+        available = node.controllers(self.root_controllers)
+        for token in value.split():
+            name = token[1:]
+            if token[0] not in "+-" or name not in available:
+                raise _sim_error(errno.EINVAL, path)
+            if token[0] == "+":
+                node.subtree_control.add(name)
+            else:
+                node.subtree_control.discard(name)
+
+    def _move(self, node: SimCgroup, pid: int):
+        if pid == 0:
+            return  # "the writing process": never a simulated one
+        proc = self._proc(pid, errno.ESRCH)
+        if proc.status is not None:
+            raise _sim_error(errno.ESRCH)
+        self._check_pids(node)
+        proc.cgroup.procs.discard(pid)
+        proc.cgroup = node
+        node.procs.add(pid)
+
+    def _check_pids(self, node: SimCgroup):
+        n = node
+        while n is not None:
+            limit = n.limit("pids.max")
+            if limit is not None and \
+                    sum(len(c.procs) for c in n.subtree()) >= limit:
+                raise _sim_error(errno.EAGAIN)
+            n = n.parent
+
+    def _terminate(self, proc: SimProcess, sig: int):
+        if sig in (signal.SIGCHLD, signal.SIGWINCH, signal.SIGURG):
+            return  # ignored by default
+        if proc.cgroup.frozen and sig != signal.SIGKILL:
+            return  # delivered on thaw in reality; dropped here
+        self._finish(proc, sig)
+
+    def _finish(self, proc: SimProcess, status: int):
+        proc.status = status
+        proc.cgroup.procs.discard(proc.pid)
+        os.eventfd_write(proc.pidfd, 1)
+        self._exited.notify_all()
+
+
+# --------------------------------------------------
+# current backend
+# --------------------------------------------------
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> KernelBackend:
+    """
+    The process-wide backend (a LinuxBackend unless set otherwise).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = LinuxBackend()
+    return _backend
+
+
+def set_backend(backend: KernelBackend) -> KernelBackend:
+    """
+    Route all kernel interaction through `backend`; returns the
+    previous one so callers can restore it.
+    """
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous or LinuxBackend()
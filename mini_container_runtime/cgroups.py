@@ -34,33 +34,522 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import atexit
+import collections
+import errno
 import os
+import threading
+import time
+from config import Config
+from mini_container_runtime import tracing
+from mini_container_runtime.backend import get_backend
 from mini_container_runtime.logger import setup_logger
-from mini_container_runtime.utils import ensure_dir
+from mini_container_runtime.utils import (
+    block_device,
+    generate_id,
+    parse_bytes,
+    parse_cpu,
+)
 
 
 log = setup_logger("Cgroups")
 CGROUP_ROOT = "/sys/fs/cgroup"
+CPU_PERIOD = 100000
+
+# Controllers delegated to container cgroups
+CONTROLLERS = ("cpu", "cpuset", "memory", "pids", "io", "hugetlb")
+
+# Values that put a control file back to "unlimited" for cgroup reuse.
+# io.max is per device: its reset is derived from the lines written.
+RESET_VALUES = {
+    "memory.max": "max",
+    "memory.high": "max",
+    "memory.low": "0",
+    "memory.min": "0",
+    "memory.swap.max": "max",
+    "pids.max": "max",
+    "cpu.max": f"max {CPU_PERIOD}",
+    "cpu.weight": "100",
+    "cpuset.cpus": "",
+    "cpuset.mems": "",
+    "io.weight": "default 100",
+    "io.max": lambda lines: [
+        f"{line.split()[0]} rbps=max wbps=max riops=max wiops=max"
+        for line in lines
+    ],
+}
+
+IO_MAX_KEYS = ("rbps", "wbps", "riops", "wiops")
+
+# History the kernel keeps across reuse and offers no reset for: read
+# at reset so the next container is reported relative to it.
+BASELINE_FILES = ("cpu.stat", "io.stat", "memory.events", "memory.peak")
+
+
+class CgroupError(OSError):
+    """
+    One or more control files could not be written.
+
+    `errors` maps each failing control file name to its OSError.
+    """
+
+    def __init__(self, path: str, errors: dict):
+        self.errors = errors
+        detail = "; ".join(
+            f"{name}: {e.strerror or e}" for name, e in errors.items()
+        )
+        super().__init__(f"Failed to configure cgroup {path}: {detail}")
 
 
 # --------------------------------------------------
 # cgroup
 # --------------------------------------------------
 class Cgroup:
+    """
+    Handle on one cgroup directory.
+
+    The directory is held open as an O_PATH fd and control files are
+    opened relative to it, so no path is re-resolved per write. All
+    access goes through the kernel backend current at creation.
+    """
+
+    @tracing.traced("cgroup.create")
     def __init__(self, name: str):
+        self.name = name
         self.path = os.path.join(CGROUP_ROOT, name)
-        ensure_dir(self.path)
-    
+        self.backend = get_backend()
+        self.fd = self.backend.cgroup_open(self.path)
+        self.limits = {}
+        self.baseline = {}
+        self._controllers = None
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self):
+        if self.fd is not None:
+            self.backend.cgroup_close(self.fd)
+            self.fd = None
+
+    def write(self, filename: str, value):
+        self.backend.cgroup_write(self.fd, filename, value)
+
+    def read(self, filename: str) -> str:
+        return self.backend.cgroup_read(self.fd, filename)
+
+    def controllers(self, refresh: bool = False):
+        """
+        Controllers enabled for this cgroup; none when cgroup.controllers
+        cannot be read. Cached; pass `refresh` after the parent's
+        subtree_control may have changed.
+        """
+        if self._controllers is None or refresh:
+            try:
+                self._controllers = set(
+                    self.read("cgroup.controllers").split()
+                )
+            except OSError:
+                return set()
+        return self._controllers
+
+    def _enabled(self, controller: str) -> bool:
+        if controller == "cgroup":
+            return True  # core interface files
+        if controller in self.controllers():
+            return True
+        return controller in self.controllers(refresh=True)
+
+    def _set(self, filename: str, value):
+        # A list writes one line at a time (io.max: one per device)
+        if isinstance(value, (list, tuple)):
+            for line in value:
+                self.write(filename, line)
+            self.limits.setdefault(filename, []).extend(value)
+            return
+        self.write(filename, value)
+        self.limits[filename] = value
+
+    @tracing.traced("cgroup.apply")
+    def apply(self, limits: dict):
+        """
+        Write every `{control file: value}` pair in one pass.
+
+        Files of controllers not enabled for this cgroup are refused
+        up front. All files are attempted; failures are collected and
+        raised together as a CgroupError naming each file that failed.
+        """
+        log.info(f"Applying limits to {self.name}: {limits}")
+        errors = {}
+        for filename, value in limits.items():
+            controller = filename.split(".", 1)[0]
+            if not self._enabled(controller):
+                errors[filename] = OSError(
+                    errno.EOPNOTSUPP,
+                    f"{controller} controller not enabled",
+                )
+                continue
+            try:
+                self._set(filename, value)
+            except OSError as e:
+                errors[filename] = e
+        if errors:
+            raise CgroupError(self.path, errors)
+
+    @tracing.traced("cgroup.set_memory_limit")
     def set_memory_limit(self, limit_bytes: int):
         log.info(f"Setting memory limit: {limit_bytes}")
-        with open(os.path.join(self.path, "memory.max"), "w") as f:
-            f.write(str(limit_bytes))
+        self._set("memory.max", parse_bytes(limit_bytes))
+
+    def set_memory_high(self, limit_bytes):
+        """Throttle and reclaim above this, without OOM-killing."""
+        self._set("memory.high", parse_bytes(limit_bytes))
+
+    def set_memory_low(self, limit_bytes):
+        """Best-effort protection from reclaim."""
+        self._set("memory.low", parse_bytes(limit_bytes))
+
+    def set_memory_min(self, limit_bytes):
+        """Hard protection from reclaim."""
+        self._set("memory.min", parse_bytes(limit_bytes))
+
+    def set_swap_limit(self, limit_bytes):
+        self._set("memory.swap.max", parse_bytes(limit_bytes))
+
+    def set_pids_limit(self, count):
+        self._set("pids.max", count)
 
-    def set_cpu_limit(self, quota: int, period: int = 100000):
+    @tracing.traced("cgroup.set_cpu_limit")
+    def set_cpu_limit(self, quota: int, period: int = CPU_PERIOD):
+        """
+        Raw cpu.max: `quota` microseconds of CPU time per `period`.
+        """
         log.info(f"Setting CPU limit: quota={quota}")
-        with open(os.path.join(self.path, "cpu.max"), "w") as f:
-            f.write(f"{quota} {period}")
+        self._set("cpu.max", f"{quota} {period}")
+
+    def set_cpu_weight(self, weight: int):
+        self._set("cpu.weight", weight)
+
+    def set_cpuset(self, cpus: str = None, mems: str = None):
+        if cpus is not None:
+            self._set("cpuset.cpus", cpus)
+        if mems is not None:
+            self._set("cpuset.mems", mems)
+
+    def set_io_max(self, device, **limits):
+        """
+        Throttle one device; keys are rbps/wbps (sizes) and riops/wiops.
+        """
+        self._set("io.max", [io_max_line(device, limits)])
+
+    def set_io_weight(self, weight: int, device=None):
+        self._set("io.weight", io_weight_line(weight, device))
+
+    def set_hugetlb_limit(self, page_size: str, limit_bytes):
+        self._set(f"hugetlb.{page_size}.max", parse_bytes(limit_bytes))
         
+    @tracing.traced("cgroup.add_process")
     def add_process(self, pid: int):
-        with open(os.path.join(self.path, "cgroup.procs"), "w") as f:
-            f.write(str(pid))
+        self.write("cgroup.procs", pid)
+
+    def populated(self) -> bool:
+        """
+        True while any process lives in this cgroup or its children.
+        """
+        return "populated 1" in self.read("cgroup.events")
+
+    def freeze(self, timeout: float = None) -> bool:
+        """
+        Freeze every process in this cgroup and its children. Freezing
+        completes asynchronously; with `timeout`, wait up to that many
+        seconds for it. Returns whether the cgroup is frozen.
+        """
+        self.write("cgroup.freeze", 1)
+        if timeout is None:
+            return self.frozen()
+        deadline = time.monotonic() + timeout
+        delay = 0.001
+        while not self.frozen():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return True
+
+    def thaw(self):
+        self.write("cgroup.freeze", 0)
+
+    def frozen(self) -> bool:
+        return "frozen 1" in self.read("cgroup.events")
+
+    def kill(self):
+        """
+        SIGKILL every process in this cgroup and its children, frozen
+        ones included, with one write (cgroup.kill, Linux 5.14+).
+        """
+        self.write("cgroup.kill", 1)
+
+    @tracing.traced("cgroup.reset")
+    def reset(self) -> bool:
+        """
+        Put every limit set through this handle back to unlimited and
+        record the counters in BASELINE_FILES as `baseline`.
+
+        Returns False when a limit has no known reset value, in which
+        case the cgroup must not be reused.
+        """
+        resets = {}
+        for name, value in self.limits.items():
+            reset = _reset_value(name, value)
+            if reset is None:
+                return False
+            resets[name] = reset
+        self.apply(resets)
+        self.limits.clear()
+        self.baseline = {}
+        for filename in BASELINE_FILES:
+            try:
+                self.baseline[filename] = self.read(filename)
+            except OSError:
+                continue  # controller not enabled for this cgroup
+        return True
+
+
+# --------------------------------------------------
+# limit specs
+# --------------------------------------------------
+def io_max_line(device, limits: dict) -> str:
+    unknown = set(limits) - set(IO_MAX_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown io.max keys: {sorted(unknown)}")
+    fields = []
+    for key in IO_MAX_KEYS:
+        if key in limits:
+            value = limits[key]
+            if key.endswith("bps"):
+                value = parse_bytes(value)
+            fields.append(f"{key}={value}")
+    return " ".join([block_device(device)] + fields)
+
+
+def io_weight_line(weight: int, device=None) -> str:
+    if not 1 <= int(weight) <= 10000:
+        raise ValueError(f"io weight out of range 1..10000: {weight}")
+    target = "default" if device is None else block_device(device)
+    return f"{target} {int(weight)}"
+
+
+def build_limits(
+    memory_limit=None,
+    memory_high=None,
+    memory_low=None,
+    memory_min=None,
+    swap_limit=None,
+    pids_limit=None,
+    cpu_quota=None,
+    cpu_weight=None,
+    cpuset_cpus=None,
+    cpuset_mems=None,
+    io_max=None,
+    io_weight=None,
+    hugetlb=None,
+) -> dict:
+    """
+    Translate human-friendly limits into `{control file: value}`.
+
+    Sizes take units ("512M"); cpu_quota takes "50%" or a CPU count;
+    io_max maps a device (path, node or "8:0") to {"rbps", "wbps",
+    "riops", "wiops"}; io_weight is a weight or a {device: weight}
+    dict; hugetlb maps a page size ("2MB") to a limit.
+    """
+    limits = {}
+    for filename, value in (
+        ("memory.max", memory_limit),
+        ("memory.high", memory_high),
+        ("memory.low", memory_low),
+        ("memory.min", memory_min),
+        ("memory.swap.max", swap_limit),
+    ):
+        if value is not None:
+            limits[filename] = parse_bytes(value)
+    if pids_limit is not None:
+        if pids_limit != "max" and int(pids_limit) < 1:
+            raise ValueError(f"Invalid pids limit: {pids_limit}")
+        limits["pids.max"] = pids_limit
+    if cpu_quota is not None:
+        limits["cpu.max"] = f"{parse_cpu(cpu_quota, CPU_PERIOD)} {CPU_PERIOD}"
+    if cpu_weight is not None:
+        if not 1 <= int(cpu_weight) <= 10000:
+            raise ValueError(f"cpu weight out of range 1..10000: {cpu_weight}")
+        limits["cpu.weight"] = int(cpu_weight)
+    if cpuset_cpus is not None:
+        limits["cpuset.cpus"] = cpuset_cpus
+    if cpuset_mems is not None:
+        limits["cpuset.mems"] = cpuset_mems
+    if io_max:
+        limits["io.max"] = [
+            io_max_line(device, spec) for device, spec in io_max.items()
+        ]
+    if isinstance(io_weight, dict):
+        limits["io.weight"] = [
+            io_weight_line(weight, device)
+            for device, weight in io_weight.items()
+        ]
+    elif io_weight is not None:
+        limits["io.weight"] = io_weight_line(io_weight)
+    for page_size, value in (hugetlb or {}).items():
+        limits[f"hugetlb.{page_size}.max"] = parse_bytes(value)
+    return limits
+
+
+def _reset_value(name: str, value):
+    reset = RESET_VALUES.get(name)
+    if callable(reset):
+        return reset(value)
+    if reset is None and name.startswith("hugetlb.") and name.endswith(".max"):
+        return "max"
+    if reset is not None and isinstance(value, list):
+        # e.g. per-device io.weight lines: back to the default weight
+        return [f"{line.split()[0]} {reset.split()[-1]}" for line in value]
+    return reset
+
+
+# --------------------------------------------------
+# cgroup manager
+# --------------------------------------------------
+class CgroupManager:
+    """
+    Owns every container cgroup under one delegated parent.
+
+    Controllers are enabled in `cgroup.subtree_control` once, on first
+    use. Released cgroups are reset and kept on a bounded free-list for
+    reuse; the rest are removed in bulk by `reap()`, which runs every
+    `reap_interval` seconds in the background and again at exit.
+    """
+
+    def __init__(
+        self,
+        parent: str = Config.CGROUP_PARENT,
+        free_list_size: int = Config.CGROUP_FREE_LIST_SIZE,
+        reap_interval: int = Config.CGROUP_REAP_INTERVAL,
+    ):
+        self.parent_name = parent
+        self.free_list_size = free_list_size
+        self.reap_interval = reap_interval
+        self.parent = None
+        self.reused = 0
+        self.reaped = 0
+        self._free = collections.deque()
+        self._dead = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def setup(self):
+        """
+        Create the parent cgroup and delegate controllers to it.
+        """
+        with self._lock:
+            if self.parent is not None:
+                return
+            root = Cgroup("")
+            wanted = _available(root)
+            _enable(root, wanted)
+            self.parent = Cgroup(self.parent_name)
+            _enable(self.parent, wanted & _available(self.parent))
+            root.close()
+
+        atexit.register(self.shutdown)
+        if self.reap_interval > 0:
+            self._thread = threading.Thread(
+                target=self._reap_loop, name="cgroup-reaper", daemon=True
+            )
+            self._thread.start()
+
+    def acquire(self) -> Cgroup:
+        """
+        Get an empty cgroup with no limits, reusing a free one if any.
+        """
+        self.setup()
+        with self._lock:
+            if self._free:
+                self.reused += 1
+                return self._free.popleft()
+        return Cgroup(os.path.join(self.parent_name, f"mini_{generate_id()}"))
+
+    def release(self, cg: Cgroup):
+        """
+        Hand back a cgroup whose container has exited.
+        """
+        try:
+            reusable = not cg.populated() and cg.reset()
+        except OSError:
+            reusable = False
+        with self._lock:
+            if reusable and len(self._free) < self.free_list_size:
+                self._free.append(cg)
+            else:
+                self._dead.append(cg)
+
+    def reap(self) -> int:
+        """
+        Remove every released cgroup that has become empty.
+        """
+        with self._lock:
+            dead, self._dead = self._dead, []
+        kept = []
+        for cg in dead:
+            cg.close()
+            try:
+                cg.backend.cgroup_remove(cg.path)
+            except OSError:
+                # Still populated (orphans exiting); try again next round
+                kept.append(cg)
+        with self._lock:
+            self._dead.extend(kept)
+            self.reaped += len(dead) - len(kept)
+        if len(dead) > len(kept):
+            log.info(f"Reaped {len(dead) - len(kept)} cgroups")
+        return len(dead) - len(kept)
+
+    def shutdown(self):
+        # The exit hook would otherwise keep this manager alive
+        atexit.unregister(self.shutdown)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._dead.extend(self._free)
+            self._free.clear()
+        self.reap()
+
+    def stats(self) -> dict:
+        return {
+            "free": len(self._free),
+            "pending_reap": len(self._dead),
+            "reused": self.reused,
+            "reaped": self.reaped,
+        }
+
+    def _reap_loop(self):
+        while not self._stop.wait(self.reap_interval):
+            self.reap()
+
+
+def _available(cg: Cgroup) -> set:
+    try:
+        return set(cg.read("cgroup.controllers").split()) & set(CONTROLLERS)
+    except OSError:
+        return set()
+
+
+def _enable(cg: Cgroup, controllers: set):
+    if not controllers:
+        return
+    try:
+        cg.write(
+            "cgroup.subtree_control",
+            " ".join(f"+{c}" for c in sorted(controllers)),
+        )
+    except OSError as e:
+        log.error(f"Could not enable controllers in {cg.path}: {e}")
@@ -0,0 +1,256 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# client MODULE
+# --------------------------------------------------
+"""
+Thin client for the runtime daemon (see daemon.py).
+
+Imports nothing from the runtime itself, so `mcr` starts about as fast
+as the interpreter does:
+
+    mcr run [-m MEM] [-c CPU] [-l KEY=VALUE]... [--hostname NAME]
+            [--net MODE] [--capture] ROOTFS COMMAND [ARG...]
+    mcr exec [-t SECONDS] ID COMMAND [ARG...]
+    mcr stop [-t SECONDS] ID
+    mcr stop-all [-t SECONDS]
+    mcr pause ID
+    mcr resume ID
+    mcr wait ID
+    mcr ps [-a] [-l KEY=VALUE]...
+    mcr logs [-n LINES] ID
+    mcr stats [ID]
+    mcr ping
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import json
+import socket
+import sys
+from config import Config
+
+
+class DaemonError(RuntimeError):
+    """
+    The daemon answered a request with an error.
+    """
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+
+# --------------------------------------------------
+# client
+# --------------------------------------------------
+class Client:
+    def __init__(self, path: str = Config.DAEMON_SOCKET):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._lines = self._sock.makefile("rb")
+        self._next_id = 0
+        # Responses that arrived before the caller asked for them
+        self._early = {}
+
+    def send(self, op: str, **args) -> int:
+        """
+        Send a request without waiting; returns its id.
+        """
+        self._next_id += 1
+        request = {"id": self._next_id, "op": op, "args": args}
+        self._sock.sendall(json.dumps(request).encode() + b"\n")
+        return self._next_id
+
+    def receive(self, request_id: int):
+        """
+        Result of request `request_id`; raises DaemonError on error.
+        """
+        response = self._early.pop(request_id, None)
+        while response is None:
+            line = self._lines.readline()
+            if not line:
+                raise ConnectionError("Daemon closed the connection")
+            message = json.loads(line)
+            if message["id"] == request_id:
+                response = message
+            else:
+                self._early[message["id"]] = message
+        if "error" in response:
+            raise DaemonError(response["error"]["type"],
+                              response["error"]["message"])
+        return response["result"]
+
+    def call(self, op: str, **args):
+        return self.receive(self.send(op, **args))
+
+    def pipeline(self, calls) -> list:
+        """
+        Send every (op, args) in `calls` at once, then collect the
+        results in order; failed requests yield their DaemonError.
+        """
+        ids = [self.send(op, **args) for op, args in calls]
+        results = []
+        for request_id in ids:
+            try:
+                results.append(self.receive(request_id))
+            except DaemonError as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        self._lines.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --------------------------------------------------
+# command line
+# --------------------------------------------------
+def _parse(args: list, options: dict):
+    """
+    Leading options of `args` by `options` (flag -> (name, kind), kind
+    being "value", "flag", "float", "int" or "label"), plus what is left.
+    Parsing stops at the first positional so commands keep their flags.
+    """
+    parsed = {name: ({} if kind == "label" else None)
+              for name, kind in options.values()}
+    while args and args[0].startswith("-"):
+        flag = args.pop(0)
+        if flag == "--":
+            break
+        if flag not in options:
+            raise SystemExit(f"mcr: unknown option {flag}")
+        name, kind = options[flag]
+        if kind == "flag":
+            parsed[name] = True
+            continue
+        if not args:
+            raise SystemExit(f"mcr: {flag} needs a value")
+        value = args.pop(0)
+        if kind == "label":
+            key, _, value = value.partition("=")
+            parsed[name][key] = value
+        elif kind == "float":
+            parsed[name] = float(value)
+        elif kind == "int":
+            parsed[name] = int(value)
+        else:
+            parsed[name] = value
+    return {k: v for k, v in parsed.items() if v not in (None, {})}, args
+
+
+def _run(client: Client, args: list) -> int:
+    opts, rest = _parse(args, {
+        "-m": ("memory_limit", "value"), "-c": ("cpu_quota", "value"),
+        "-l": ("labels", "label"), "--hostname": ("hostname", "value"),
+        "--net": ("network", "value"), "--capture": ("capture", "flag"),
+    })
+    if len(rest) < 2:
+        raise SystemExit("mcr: run needs ROOTFS and COMMAND")
+    result = client.call("launch", rootfs=rest[0], command=rest[1:], **opts)
+    print(result["id"])
+    return 0
+
+
+def _exec(client: Client, args: list) -> int:
+    opts, rest = _parse(args, {"-t": ("timeout", "float")})
+    if len(rest) < 2:
+        raise SystemExit("mcr: exec needs ID and COMMAND")
+    result = client.call("exec", container_id=rest[0], command=rest[1:],
+                         **opts)
+    sys.stdout.write(result["stdout"] or "")
+    sys.stderr.write(result["stderr"] or "")
+    return result["exit_code"]
+
+
+def _ps(client: Client, args: list) -> int:
+    opts, _ = _parse(args, {"-a": ("exited", "flag"),
+                            "-l": ("labels", "label")})
+    for c in client.call("ps", **opts):
+        running = c.get("running", c.get("state") == "running")
+        state = "running" if running else f"exited({c['exit_code']})"
+        if c.get("paused"):
+            state = "paused"
+        labels = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+        print(f"{c['id']}  {c['pid'] or '-':>7}  {state:<12}  {labels}")
+    return 0
+
+
+def _simple(op: str, options: dict, positional: tuple):
+    def command(client: Client, args: list) -> int:
+        opts, rest = _parse(args, options)
+        opts.update(zip(positional, rest))
+        result = client.call(op, **opts)
+        if result is None:
+            pass
+        elif isinstance(result, str):
+            sys.stdout.write(result if op == "logs" else result + "\n")
+        else:
+            print(json.dumps(result, indent=2))
+        return 0
+    return command
+
+
+COMMANDS = {
+    "run": _run,
+    "exec": _exec,
+    "ps": _ps,
+    "stop": _simple("stop", {"-t": ("timeout", "float")}, ("container_id",)),
+    "stop-all": _simple("stop_all", {"-t": ("timeout", "float")}, ()),
+    "pause": _simple("pause", {}, ("container_id",)),
+    "resume": _simple("resume", {}, ("container_id",)),
+    "wait": _simple("wait", {}, ("container_id",)),
+    "logs": _simple("logs", {"-n": ("tail", "int")}, ("container_id",)),
+    "stats": _simple("stats", {}, ("container_id",)),
+    "ping": _simple("ping", {}, ()),
+}
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS:
+        sys.stderr.write(__doc__.split("\n\n", 2)[2])
+        return 2
+    try:
+        with Client(Config.DAEMON_SOCKET) as client:
+            return COMMANDS[argv[0]](client, argv[1:])
+    except (DaemonError, OSError) as e:
+        sys.stderr.write(f"mcr: {e}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,11 +35,17 @@
 # imports
 # --------------------------------------------------
 import os
-import subprocess
+import select
+import signal
+import time
+from config import Config
 from mini_container_runtime.logger import setup_logger
-from mini_container_runtime import namespaces
-from mini_container_runtime.filesystem import setup_rootfs
-from mini_container_runtime.cgroups import Cgroup
+from mini_container_runtime import namespaces, tracing
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.filesystem import OverlayRootfs, setup_rootfs
+from mini_container_runtime.init import run_as_init
+from mini_container_runtime.cgroups import Cgroup, build_limits
+from mini_container_runtime.utils import generate_id
 
 
 log = setup_logger("Container")
@@ -56,39 +62,416 @@ class Container:
         hostname="mini_container",
         memory_limit=None,
         cpu_quota=None,
+        cgroups=None,
+        overlay=False,
+        trace=False,
+        init=False,
+        labels=None,
+        **limits,
     ):
+        """
+        `limits` takes the rest of cgroups.build_limits: memory_high,
+        memory_low, memory_min, swap_limit, pids_limit, cpu_weight,
+        cpuset_cpus, cpuset_mems, io_max, io_weight and hugetlb.
+
+        With `init`, PID 1 is a minimal init that reaps orphans and
+        forwards signals to the command instead of the command itself.
+        `labels` are free-form key/value strings for queries (see state).
+        """
+        if not overlay and not isinstance(rootfs, str):
+            # Writes would land in a shared read-only layer
+            raise ValueError("A layer stack rootfs needs overlay=True")
+        self.id = generate_id()
+        self.labels = dict(labels or {})
+        self.created = time.time()
+        self.started = None
         self.command = command
         self.rootfs = rootfs
         self.hostname = hostname
         self.memory_limit = memory_limit
         self.cpu_quota = cpu_quota
-    
-    def run(self):
-        log.info("Starting container")
-
-        namespaces.unshare([
+        # Parsed up front so bad values fail before anything is spawned
+        self.limits = build_limits(
+            memory_limit=memory_limit, cpu_quota=cpu_quota, **limits
+        )
+        self.cgroups = cgroups
+        # Namespaces the container gets (and `exec` joins)
+        self.namespaces = [
             namespaces.CLONE_NEWNS,
             namespaces.CLONE_NEWPID,
             namespaces.CLONE_NEWUTS,
-        ])
+        ]
+        # Pooled network namespace joined at start (see network.py), and
+        # the address it gave the container
+        self.netns = None
+        self.address = None
+        # What the runtime booked for it beyond its limits (placement
+        # request, admission tenant); kept so a restart can rebook it
+        self.reservation = {}
+        # Set by events.ExitMonitor.register
+        self.monitor = None
+        self.overlay = None
+        if overlay:
+            # `rootfs` names the read-only lower layer(s), top-most first
+            self.overlay = OverlayRootfs(rootfs, self.id)
+        self.cgroup = None
+        # (stdout, stderr) write ends set by output.OutputCollector.attach
+        self.stdio = None
+        self.pid = None
+        self.pidfd = None
+        self._root_fd = None
+        self.exit_code = None
+        self.exited = False
+        # Re-attached after a runtime restart: not our child, so no
+        # exit code can be collected (see attach())
+        self.adopted = False
+        self.rusage = None
+        self.trace = tracing.Trace(self.id) if trace else None
+        self.init = init
+
+    def start(self, warm=None) -> int:
+        """
+        Launch the container and return its host PID without waiting.
+
+        With `warm` (a zygote.WarmMember) the already-isolated member is
+        handed the command instead of spawning a new process.
+        """
+        if self.trace is None:
+            return self._start(warm)
+        with tracing.activate(self.trace), tracing.span("start"):
+            return self._start(warm)
+
+    def _start(self, warm) -> int:
+        if warm is not None:
+            try:
+                return self._start_warm(warm)
+            except BrokenPipeError:
+                log.warning(f"Warm member {warm.id} is gone, starting cold")
+
+        log.info(f"Starting container {self.id}")
+
+        create = self.namespaces
+        if self.netns is not None:
+            # Joined below rather than created: the pooled one is ready
+            create = [ns for ns in create if ns != namespaces.CLONE_NEWNET]
+        try:
+            cgroup_fd = self._prepare()
+            with tracing.span("spawn"):
+                pid, pidfd = namespaces.spawn(create, cgroup_fd=cgroup_fd)
+        except Exception:
+            # e.g. a limit the host cannot enforce: hand everything back
+            self._close_stdio()
+            if self.trace is not None:
+                self.trace.close()
+            self.cleanup()
+            raise
 
-        pid = os.fork()
         if pid == 0:
             # Child (Container init)
-            namespaces.set_hostname(self.hostname)
-            setup_rootfs(self.rootfs)
+            try:
+                if self.stdio is not None:
+                    os.dup2(self.stdio[0], 1)
+                    os.dup2(self.stdio[1], 2)
+                if self.netns is not None:
+                    get_backend().setns(self.netns.fd,
+                                        namespaces.CLONE_NEWNET)
+                namespaces.set_hostname(self.hostname)
+                setup_rootfs(self.rootfs, overlay=self.overlay)
+
+                log.info(f"Executing command: {self.command}")
+                send = self.trace.send if self.trace is not None else None
+                if self.init:
+                    # posix_spawnp returns after the exec: mark it then
+                    run_as_init(
+                        self.command,
+                        spawned=None if send is None else (
+                            lambda _: send()
+                        ),
+                    )
+                if send is not None:
+                    send()
+                os.execvp(self.command[0], self.command)
+            except Exception as e:
+                log.error(f"Container setup failed: {e}")
+            finally:
+                os._exit(127)
+
+        # Parent
+        self._close_stdio()
+        self.pid = pid
+        self.pidfd = pidfd
+        self.started = time.time()
+        if self.trace is not None:
+            # Blocks until the child has exec'd, so the trace covers the
+            # whole launch
+            self.trace.collect(pid)
+        return pid
+
+    def _prepare(self):
+        """
+        Set up the cgroup and scratch dirs; returns the cgroup fd.
+        """
+        cgroup_fd = None
+        if self.cgroups is not None:
+            with tracing.span("cgroup.acquire"):
+                self.cgroup = self.cgroups.acquire()
+        elif self.limits:
+            self.cgroup = Cgroup(f"mini_{self.id}")
+        if self.cgroup is not None:
+            self._apply_limits()
+            cgroup_fd = self.cgroup.fileno()
+        if self.overlay is not None:
+            with tracing.span("overlay.prepare"):
+                self.overlay.prepare()
+        if self.trace is not None:
+            self.trace.open_channel()
+        return cgroup_fd
+
+    def _close_stdio(self):
+        if self.stdio is not None:
+            for fd in self.stdio:
+                os.close(fd)
+            self.stdio = None
+
+    def _start_warm(self, member) -> int:
+        log.info(f"Starting container {self.id} on warm member {member.id}")
+        self.cgroup = member.cgroup
+        try:
+            self._apply_limits()
+            with tracing.span("handoff", member=member.id):
+                member.handoff(self.command, self.hostname, init=self.init)
+        except BaseException:
+            # Killing the member hands its cgroup back
+            self.cgroup = None
+            member.kill()
+            raise
+
+        self.pid = member.pid
+        self.pidfd = member.pidfd
+        self.started = time.time()
+        return self.pid
+
+    def _apply_limits(self):
+        if self.limits:
+            self.cgroup.apply(self.limits)
+
+    @property
+    def root(self) -> str:
+        """
+        The container's root directory, as seen in its mount namespace.
+        """
+        return self.overlay.merged if self.overlay else self.rootfs
+
+    def root_fd(self):
+        """
+        Handle on the container's root, opened once and kept; None while
+        the container has not chrooted yet (use `root` instead).
+        """
+        if self._root_fd is None:
+            fd = get_backend().open_root(self.pid)
+            if fd is None:
+                return None
+            host = os.stat("/")
+            st = os.fstat(fd)
+            if (st.st_dev, st.st_ino) == (host.st_dev, host.st_ino):
+                os.close(fd)
+                return None
+            self._root_fd = fd
+        return self._root_fd
+
+    @property
+    def running(self) -> bool:
+        return self.pid is not None and not self.exited
 
-            log.info(f"Executing command: {self.command}")
-            os.execvp(self.command[0], self.command)
+    @property
+    def paused(self) -> bool:
+        return self.running and self.cgroup is not None \
+            and self.cgroup.frozen()
+
+    def pause(self, timeout: float = 1.0) -> bool:
+        """
+        Freeze every process of the container in place (cgroup.freeze);
+        they keep their memory and state and use no CPU until resumed.
+        Returns whether freezing completed within `timeout` seconds.
+        """
+        return self._require_cgroup().freeze(timeout)
+
+    def resume(self):
+        self._require_cgroup().thaw()
+
+    def signal(self, sig: int):
+        """
+        Send `sig` to the container's init through its pidfd, so a
+        recycled PID can never be hit.
+        """
+        if self.running:
+            get_backend().pidfd_signal(self.pidfd, sig)
+
+    def kill(self):
+        """
+        SIGKILL every process of the container with one cgroup.kill,
+        falling back to SIGKILL on init when there is no cgroup or the
+        kernel has no cgroup.kill (before 5.14).
+        """
+        if not self.running:
+            return
+        if self.cgroup is not None:
+            try:
+                self.cgroup.kill()
+                return
+            except OSError as e:
+                log.debug(f"cgroup.kill failed for {self.id}: {e}")
+        self.signal(signal.SIGKILL)
+
+    def stop(self, timeout: float = Config.STOP_TIMEOUT) -> bool:
+        """
+        SIGTERM the container and kill it if it has not exited after
+        `timeout` seconds. Returns True if it exited on its own. Reaping
+        is left to wait() or the exit monitor.
+        """
+        pidfd = self.pidfd
+        if not self.running or pidfd is None:
+            return True
+        # Our own handle: a concurrent wait() may reap and close pidfd
+        pidfd = os.dup(pidfd)
+        try:
+            if self.paused:
+                self.resume()  # frozen processes cannot act on SIGTERM
+            try:
+                self.signal(signal.SIGTERM)
+            except ProcessLookupError:
+                return True
+            if _exited(pidfd, timeout):
+                return True
+            log.info(f"Container {self.id} ignored SIGTERM, killing it")
+            self.kill()
+            _exited(pidfd, None)
+            return False
+        finally:
+            os.close(pidfd)
+
+    def _require_cgroup(self):
+        if self.cgroup is None:
+            raise RuntimeError(f"Container {self.id} has no cgroup")
+        return self.cgroup
+
+    def poll(self):
+        """
+        Reap the container if it has exited; return its exit code or None.
+        """
+        if self.running:
+            try:
+                pid, status, rusage = get_backend().wait(
+                    self.pid, os.WNOHANG
+                )
+            except ChildProcessError:
+                if self.adopted:
+                    self._adopted_exit(0)
+                return self.exit_code  # reaped by another waiter
+            if pid:
+                self._reaped(status, rusage)
+        return self.exit_code
+
+    def wait(self):
+        """
+        Block until the container exits and return its exit code.
+        """
+        if self.running:
+            try:
+                _, status, rusage = get_backend().wait(self.pid, 0)
+            except ChildProcessError:
+                if self.adopted:
+                    self._adopted_exit(None)
+                return self.exit_code  # reaped by another waiter
+            self._reaped_here(status, rusage)
+        return self.exit_code
+
+    def _adopted_exit(self, timeout):
+        # The pidfd still turns readable when the process exits
+        if _exited(self.pidfd, timeout):
+            self._reaped_here(None)
+
+    def _reaped_here(self, status, rusage=None):
+        # Reaped outside the exit monitor: it still has to see the exit
+        if self.monitor is not None:
+            self.monitor.reaped(self, status, rusage)
         else:
-            # Parent
-            if self.memory_limit or self.cpu_quota:
-                cg = Cgroup(f"mini_{pid}")
-                if self.memory_limit:
-                    cg.set_memory_limit(self.memory_limit)
-                if self.cpu_quota:
-                    cg.set_cpu_limit(self.cpu_quota)
-                cg.add_process(pid)
-            
-            os.waitpid(pid, 0)
-            log.info("Container exited")
+            self._reaped(status, rusage)
+
+    def _reaped(self, status, rusage=None, release: bool = True):
+        """
+        `status` is None when the exit code is unknown (adopted).
+        """
+        self.exited = True
+        if status is not None:
+            self.exit_code = os.waitstatus_to_exitcode(status)
+        self.rusage = rusage
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+        if self._root_fd is not None:
+            os.close(self._root_fd)
+            self._root_fd = None
+        if release:
+            self.cleanup()
+        log.info(f"Container {self.id} exited with code {self.exit_code}")
+
+    def cleanup(self):
+        """
+        Release the cgroup and network namespace and remove overlay
+        scratch dirs once the container is gone. Callers that track
+        cgroup emptiness reap with release=False and call this when the
+        last process has left.
+        """
+        if self.cgroup is not None and self.cgroups is not None:
+            self.cgroups.release(self.cgroup)
+        elif self.cgroup is not None:
+            self.cgroup.close()
+        self.cgroup = None
+        if self.overlay is not None:
+            self.overlay.cleanup()
+        if self.netns is not None:
+            self.netns.close()
+            self.netns = None
+
+    @classmethod
+    def attach(cls, container_id: str, pid: int, pidfd: int, command,
+               rootfs, cgroup=None, cgroups=None, overlay=False,
+               **fields):
+        """
+        Re-attach to a container started by an earlier runtime process.
+        `fields` restores hostname, labels, limits, created and started.
+        """
+        container = cls(command, rootfs=rootfs, cgroups=cgroups,
+                        overlay=overlay,
+                        hostname=fields.pop("hostname", "mini"),
+                        labels=fields.pop("labels", None))
+        container.id = container_id
+        if overlay:
+            # Scratch dirs are named after the original id
+            container.overlay = OverlayRootfs(rootfs, container_id)
+        container.cgroup = cgroup
+        container.pid = pid
+        container.pidfd = pidfd
+        container.adopted = True
+        for name, value in fields.items():
+            setattr(container, name, value)
+        return container
+
+    def run(self):
+        if self.trace is None:
+            self.start()
+            return self.wait()
+        with tracing.activate(self.trace), tracing.span("run"):
+            self.start()
+            return self.wait()
+
+
+def _exited(pidfd: int, timeout) -> bool:
+    """
+    Wait up to `timeout` seconds (None: forever) for the process behind
+    `pidfd` to exit, without reaping it.
+    """
+    poller = select.poll()
+    poller.register(pidfd, select.POLLIN)
+    return bool(poller.poll(None if timeout is None else timeout * 1000))
@@ -0,0 +1,324 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# daemon MODULE
+# --------------------------------------------------
+"""
+Resident runtime serving requests over a Unix domain socket.
+
+One process keeps the runtime warm: cgroup handles and free list,
+zygote pool, state store, exit monitor. Clients (see client.py) send
+newline-delimited JSON requests and may pipeline as many as they like
+on one connection:
+
+    {"id": 1, "op": "launch", "args": {"command": [...], "rootfs": ...}}
+    {"id": 1, "result": {...}}            or
+    {"id": 1, "error": {"type": "KeyError", "message": "..."}}
+
+Requests on a connection run concurrently on a worker pool, so
+responses may come back out of order; match them by "id". Ops that can
+block for as long as a container lives (wait, exec, stop, and launch
+behind admission control) get a thread of their own instead, so they
+can never starve the pool.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from mini_container_runtime.logger import log_stats, setup_logger
+from mini_container_runtime.network import MODES
+from mini_container_runtime.runtime import MiniRuntime
+
+
+log = setup_logger("Daemon")
+
+
+def describe(container) -> dict:
+    return {
+        "id": container.id,
+        "pid": container.pid,
+        "running": container.running,
+        "paused": container.paused,
+        "exit_code": container.exit_code,
+        "command": list(container.command),
+        "hostname": container.hostname,
+        "address": container.address,
+        "labels": container.labels,
+        "started": container.started,
+    }
+
+
+# --------------------------------------------------
+# runtime daemon
+# --------------------------------------------------
+class RuntimeDaemon:
+    def __init__(self, runtime: MiniRuntime,
+                 path: str = Config.DAEMON_SOCKET,
+                 workers: int = Config.DAEMON_WORKERS):
+        self.runtime = runtime
+        self.path = path
+        self._pool = ThreadPoolExecutor(workers, "mcrd-worker")
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._ops = {
+            "ping": lambda: "pong",
+            "launch": self._launch,
+            "exec": self._exec,
+            "stop": self.runtime.stop,
+            "stop_all": self._stop_all,
+            "pause": self.runtime.pause,
+            "resume": self.runtime.resume,
+            "wait": self._wait,
+            "ps": self._ps,
+            "logs": self._logs,
+            "stats": self._stats,
+        }
+        self._blocking = {"wait", "exec", "stop", "stop_all"}
+        if runtime.admission is not None:
+            self._blocking.add("launch")
+
+    def start(self):
+        """
+        Listen on the socket and accept clients in the background.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from an unclean exit
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old = os.umask(0o177)
+        try:
+            self._sock.bind(self.path)
+        finally:
+            os.umask(old)
+        self._sock.listen(128)
+        self.runtime.monitor.start()
+        self._thread = threading.Thread(
+            target=self._accept_loop, name="mcrd-accept", daemon=True
+        )
+        self._thread.start()
+        log.info(f"Listening on {self.path}")
+
+    def serve_forever(self):
+        self.start()
+        self._stop.wait()
+
+    def close(self):
+        self._stop.set()
+        if self._sock is not None:
+            # close() alone does not wake a thread blocked in accept()
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pool.shutdown()
+
+    def handle(self, request: dict) -> dict:
+        """
+        Run one request and build its response.
+        """
+        response = {"id": request.get("id")}
+        try:
+            op = self._ops.get(request.get("op"))
+            if op is None:
+                raise ValueError(f"Unknown op: {request.get('op')!r}")
+            response["result"] = op(**request.get("args", {}))
+        except Exception as e:
+            response["error"] = {"type": type(e).__name__, "message": str(e)}
+        return response
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break  # closed
+            threading.Thread(
+                target=self._serve, args=(conn,), name="mcrd-conn",
+                daemon=True,
+            ).start()
+
+    def _serve(self, conn: socket.socket):
+        lock = threading.Lock()
+        # Requests of this connection still running (not a list of
+        # waiters: a long-lived client would grow it without bound)
+        running = [0]
+        idle = threading.Condition()
+
+        def reply(request):
+            try:
+                data = json.dumps(self.handle(request), default=str)
+                with lock:
+                    try:
+                        conn.sendall(data.encode() + b"\n")
+                    except OSError:
+                        pass  # client went away
+            finally:
+                with idle:
+                    running[0] -= 1
+                    idle.notify_all()
+
+        with conn, conn.makefile("rb") as lines:
+            for line in lines:
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    request = {"op": None}
+                    log.error(f"Bad request: {e}")
+                with idle:
+                    running[0] += 1
+                self._dispatch(reply, request)
+            # Client closed its end: finish what it asked for first
+            with idle:
+                idle.wait_for(lambda: not running[0])
+
+    def _dispatch(self, reply, request: dict):
+        """
+        Start one request on a worker thread.
+        """
+        if request.get("op") in self._blocking:
+            threading.Thread(
+                target=reply, args=(request,), name="mcrd-blocking",
+                daemon=True,
+            ).start()
+        else:
+            self._pool.submit(reply, request)
+
+    def _launch(self, **spec) -> dict:
+        return describe(self.runtime.launch(**spec))
+
+    def _exec(self, container_id: str, command, capture=True,
+              timeout=None) -> dict:
+        result = self.runtime.exec(container_id, command, capture, timeout)
+        return {
+            "exit_code": result.exit_code,
+            "stdout": _text(result.stdout),
+            "stderr": _text(result.stderr),
+            "timed_out": result.timed_out,
+        }
+
+    def _stop_all(self, timeout=Config.STOP_TIMEOUT) -> dict:
+        killed = self.runtime.stop_all(timeout=timeout)
+        return {"killed": [c.id for c in killed]}
+
+    def _wait(self, container_id: str, timeout=None):
+        container = self.runtime.containers[container_id]
+        self.runtime.wait_all([container], timeout)
+        return describe(container)
+
+    def _ps(self, exited=False, **filters) -> list:
+        if self.runtime.state is not None:
+            if not exited and "state" not in filters:
+                filters["state"] = "running"
+            return self.runtime.ps(**filters)
+        return [
+            describe(c) for c in self.runtime.containers.values()
+            if exited or c.running
+        ]
+
+    def _logs(self, container_id: str, tail=None) -> str:
+        self.runtime.containers[container_id]  # KeyError if unknown
+        return _text(self.runtime.logs(container_id, tail))
+
+    def _stats(self, container_id: str = None) -> dict:
+        if container_id is not None:
+            return describe(self.runtime.containers[container_id])
+        containers = list(self.runtime.containers.values())
+        return {
+            "containers": len(containers),
+            "running": sum(c.running for c in containers),
+            "cgroups": self.runtime.cgroups.stats(),
+            "pool": self.runtime.pool_stats(),
+            "admission": self.runtime.admission_stats(),
+            "network": self.runtime.network_stats(),
+            "log": log_stats(),
+        }
+
+
+def _text(data):
+    return None if data is None else data.decode(errors="replace")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="mcrd", description="Mini Container Runtime daemon"
+    )
+    parser.add_argument("--socket", default=Config.DAEMON_SOCKET)
+    parser.add_argument("--state", default=Config.STATE_DB,
+                        help='state database, or "none"')
+    parser.add_argument("--zygote", action="store_true")
+    parser.add_argument("--pool-size", type=int,
+                        default=Config.ZYGOTE_POOL_SIZE)
+    parser.add_argument("--init", action="store_true",
+                        default=Config.INIT_ENABLED)
+    parser.add_argument("--admission", action="store_true")
+    parser.add_argument("--scheduler", action="store_true")
+    parser.add_argument("--network", choices=MODES,
+                        default=Config.DEFAULT_NETWORK_NAMESPACE)
+    args = parser.parse_args(argv)
+
+    runtime = MiniRuntime(
+        zygote=args.zygote,
+        pool_size=args.pool_size,
+        init=args.init,
+        admission=args.admission,
+        scheduler=args.scheduler,
+        network=args.network,
+        state=False if args.state == "none" else args.state,
+    )
+    daemon = RuntimeDaemon(runtime, args.socket)
+    # Containers outlive the daemon (their output is left to a drainer
+    # process); a restart re-adopts them
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: daemon._stop.set())
+    try:
+        daemon.serve_forever()
+    finally:
+        daemon.close()
+        runtime.shutdown(detach=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# events MODULE
+# --------------------------------------------------
+"""
+Event-driven container exit tracking.
+
+Every container's pidfd and an inotify watch on its `cgroup.events`
+share one epoll set, so a single thread (or an asyncio loop) can follow
+exits, exit codes and rusage for any number of containers. Two events
+are reported per container:
+
+- ("exit", container)  - the init process exited and was reaped
+- ("empty", container) - the last process in its cgroup is gone too
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import select
+import struct
+import threading
+import time
+from mini_container_runtime import syscalls
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import raise_nofile_limit
+
+
+log = setup_logger("Events")
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+# --------------------------------------------------
+# exit monitor
+# --------------------------------------------------
+class ExitMonitor:
+    def __init__(self):
+        raise_nofile_limit()
+        self._epoll = select.epoll()
+        self._inotify = syscalls.inotify_init1()
+        self._epoll.register(self._inotify, select.EPOLLIN)
+        self._by_pidfd = {}
+        self._by_wd = {}
+        self._wds = {}
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._dispatching = False
+        # Threads between reaping an exit and running its callbacks
+        self._handling = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.callbacks = []
+
+    def fileno(self) -> int:
+        return self._epoll.fileno()
+
+    def register(self, container):
+        """
+        Track a started container until its cgroup is empty.
+        """
+        with self._lock:
+            container.monitor = self
+            self._by_pidfd[container.pidfd] = container
+            self._epoll.register(container.pidfd, select.EPOLLIN)
+            if container.cgroup is None:
+                return
+            try:
+                wd = get_backend().watch_events(
+                    self._inotify, container.cgroup.path
+                )
+            except OSError as e:
+                # e.g. fs.inotify.max_user_watches exhausted: emptiness
+                # is then only checked when the init process exits.
+                log.error(f"inotify watch failed for {container.id}: {e}")
+                return
+            if wd is None:
+                return  # backend reports emptiness through the exit
+            self._by_wd[wd] = container
+            self._wds[container.id] = wd
+
+    def poll(self, timeout: float = None) -> list:
+        """
+        Wait up to `timeout` seconds and handle whatever is ready.
+
+        Returns the (kind, container) events that were dispatched.
+        """
+        events = []
+        ready = self._epoll.poll(-1 if timeout is None else timeout)
+        self._begin()
+        try:
+            with self._lock:
+                for fd, _ in ready:
+                    if fd == self._inotify:
+                        self._read_inotify(events)
+                    else:
+                        self._on_exit(fd, events)
+            self._dispatch(events)
+        finally:
+            self._end()
+        return events
+
+    def reaped(self, container, status, rusage=None):
+        """
+        Handle an exit reaped elsewhere (Container.wait) like one of
+        our own, so callbacks see every exit.
+        """
+        events = []
+        self._begin()
+        try:
+            with self._lock:
+                self._forget(container.pidfd)
+                if container.running:
+                    container._reaped(status, rusage, release=False)
+                    events.append(("exit", container))
+                    self._check_empty(container, events)
+            self._dispatch(events)
+        finally:
+            self._end()
+
+    def wait_for(self, predicate, timeout: float = None) -> bool:
+        """
+        Dispatch events until `predicate()` holds or `timeout` expires.
+
+        Safe to call from several threads: one of them drives poll()
+        while the others sleep until it has dispatched something. An
+        exit counts once its callbacks have run, not when it is reaped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._handling or not predicate():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                if (self._dispatching or self._handling
+                        or self._thread is not None):
+                    self._cond.wait(remaining)
+                    continue
+                self._dispatching = True
+                self._cond.release()
+                try:
+                    self.poll(remaining)
+                finally:
+                    self._cond.acquire()
+                    self._dispatching = False
+            return True
+
+    def start(self):
+        """
+        Dispatch events from a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="exit-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def attach(self, loop):
+        """
+        Dispatch events from an asyncio loop instead of a thread.
+        """
+        loop.add_reader(self.fileno(), self.poll, 0)
+
+    def detach(self, loop):
+        loop.remove_reader(self.fileno())
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._epoll.close()
+        os.close(self._inotify)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll(0.5)
+
+    def _begin(self):
+        with self._cond:
+            self._handling += 1
+
+    def _end(self):
+        with self._cond:
+            self._handling -= 1
+            self._cond.notify_all()
+
+    def _dispatch(self, events: list):
+        for kind, container in events:
+            for callback in self.callbacks:
+                callback(kind, container)
+
+    def _forget(self, pidfd: int):
+        container = self._by_pidfd.pop(pidfd, None)
+        try:
+            self._epoll.unregister(pidfd)
+        except (OSError, TypeError):
+            pass
+        return container
+
+    def _on_exit(self, pidfd: int, events: list):
+        container = self._forget(pidfd)
+        if container is None or not container.running:
+            return
+        try:
+            pid, status, rusage = get_backend().wait(
+                container.pid, os.WNOHANG
+            )
+        except ChildProcessError:
+            if not container.adopted:
+                return  # reaped through Container.wait() meanwhile
+            # Not our child: it is gone, but its exit code is lost
+            pid, status, rusage = container.pid, None, None
+        if not pid:
+            return
+        container._reaped(status, rusage, release=False)
+        events.append(("exit", container))
+        self._check_empty(container, events)
+
+    def _read_inotify(self, events: list):
+        try:
+            data = os.read(self._inotify, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, _, _, size = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size + size
+            container = self._by_wd.get(wd)
+            if container is not None:
+                self._check_empty(container, events)
+
+    def _check_empty(self, container, events: list):
+        # The init process leaves the cgroup before it is reaped, so an
+        # empty cgroup is only final once the exit has been handled.
+        if container.running:
+            return
+        if container.cgroup is not None:
+            try:
+                if container.cgroup.populated():
+                    return
+            except OSError:
+                pass
+        wd = self._wds.pop(container.id, None)
+        if wd is not None:
+            self._by_wd.pop(wd, None)
+            try:
+                syscalls.inotify_rm_watch(self._inotify, wd)
+            except OSError:
+                pass
+        container.cleanup()
+        events.append(("empty", container))
@@ -35,7 +35,10 @@
 # imports
 # --------------------------------------------------
 import os
-import subprocess
+import shutil
+from config import Config
+from mini_container_runtime import syscalls, tracing
+from mini_container_runtime.backend import get_backend
 from mini_container_runtime.logger import setup_logger
 from mini_container_runtime.utils import ensure_dir
 
@@ -43,17 +46,75 @@ from mini_container_runtime.utils import ensure_dir
 log = setup_logger("Filesystem")
 
 
-def setup_rootfs(rootfs: str):
+# --------------------------------------------------
+# overlay rootfs
+# --------------------------------------------------
+class OverlayRootfs:
+    """
+    Copy-on-write rootfs: read-only `lower_dirs` (top-most first) shared
+    by every container, plus a private upper/work dir per container
+    under `scratch_root`.
+    """
+
+    def __init__(
+        self,
+        lower_dirs,
+        container_id: str,
+        scratch_root: str = Config.SCRATCH_DIR,
+    ):
+        if isinstance(lower_dirs, str):
+            lower_dirs = [lower_dirs]
+        self.lower_dirs = [os.path.abspath(d) for d in lower_dirs]
+        self.base = os.path.join(scratch_root, container_id)
+        self.upper = os.path.join(self.base, "upper")
+        self.work = os.path.join(self.base, "work")
+        self.merged = os.path.join(self.base, "merged")
+
+    def prepare(self):
+        for path in (self.upper, self.work, self.merged):
+            ensure_dir(path)
+
+    def options(self) -> str:
+        return (
+            f"lowerdir={':'.join(self.lower_dirs)},"
+            f"upperdir={self.upper},workdir={self.work}"
+        )
+
+    @tracing.traced("overlay.mount")
+    def mount(self):
+        log.info(f"Mounting overlay rootfs: {self.merged}")
+        get_backend().mount(
+            "overlay", self.merged, "overlay", 0, self.options()
+        )
+
+    def cleanup(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+
+@tracing.traced("setup_rootfs")
+def setup_rootfs(rootfs: str, overlay: OverlayRootfs = None):
     """
     Prepare minimal filesystem isolation using chroot + mount namespace.
+
+    With `overlay`, the overlay is mounted first and becomes the root;
+    a layer stack (list) `rootfs` is only valid with one.
     """
+    if overlay is None and not isinstance(rootfs, str):
+        raise ValueError("A layer stack rootfs needs an overlay")
+    backend = get_backend()
+    # Keep our mounts from propagating back to the host namespace
+    backend.mount(None, "/", None, syscalls.MS_REC | syscalls.MS_PRIVATE)
+
+    if overlay is not None:
+        overlay.mount()
+        rootfs = overlay.merged
     ensure_dir(rootfs)
 
     log.info(f"Mounting rootfs: {rootfs}")
-    subprocess.run(["mount", "--bind", rootfs, rootfs], check=True)
+    backend.mount(rootfs, rootfs, None, syscalls.MS_BIND | syscalls.MS_REC)
 
     os.chdir(rootfs)
-    os.chroot(".")
+    backend.chroot(".")
     os.chdir("/")
 
     log.info("Root filesystem isolated")
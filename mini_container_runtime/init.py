@@ -0,0 +1,120 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# init MODULE
+# --------------------------------------------------
+"""
+Minimal init for PID 1 of a container.
+
+Without it the workload itself is PID 1: nothing reaps the orphans its
+helpers leave behind, and signals it has no handler for are dropped
+(the kernel protects PID 1). `run_as_init` instead spawns the workload
+and then, in the already-running interpreter of the container child
+(no extra exec, pages shared copy-on-write), sits in sigwaitinfo():
+
+- SIGCHLD: reap every exited descendant
+- anything else forwardable: pass it on to the workload
+
+When the workload exits, so does init, with the workload's exit code
+(128 + signal number if it was killed); the kernel then kills whatever
+is left in the PID namespace.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import signal
+from mini_container_runtime import syscalls
+
+
+# Signals passed on to the workload
+FORWARDED = frozenset({
+    signal.SIGHUP, signal.SIGINT, signal.SIGQUIT, signal.SIGTERM,
+    signal.SIGUSR1, signal.SIGUSR2, signal.SIGWINCH, signal.SIGCONT,
+    signal.SIGALRM,
+})
+
+
+def run_as_init(command, spawned=None):
+    """
+    Start `command` and supervise it until it exits. `spawned(pid)`
+    runs once the workload has exec'd. Never returns.
+    """
+    signals = FORWARDED | {signal.SIGCHLD}
+    try:
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        # Outside a fresh PID namespace, still collect our orphans
+        if os.getpid() != 1:
+            syscalls.set_child_subreaper()
+        # posix_spawn (vfork) instead of fork: no page tables to copy
+        # for the interpreter, and it only returns once exec is done
+        workload = os.posix_spawnp(
+            command[0], command, os.environ, setsigmask=mask
+        )
+        if spawned is not None:
+            spawned(workload)
+        # Hold nothing open: pipes waiting on the workload's exec (trace
+        # channel) or its output must only see the workload's copies
+        os.closerange(3, os.sysconf("SC_OPEN_MAX"))
+        code = _supervise(workload, signals)
+    except BaseException:
+        code = 127
+    os._exit(code)
+
+
+def _supervise(workload: int, signals) -> int:
+    while True:
+        info = signal.sigwaitinfo(signals)
+        if info.si_signo != signal.SIGCHLD:
+            try:
+                os.kill(workload, info.si_signo)
+            except ProcessLookupError:
+                pass
+            continue
+        status = _reap(workload)
+        if status is not None:
+            code = os.waitstatus_to_exitcode(status)
+            return 128 - code if code < 0 else code
+
+
+def _reap(workload: int):
+    """
+    Reap every exited child; the workload's wait status if it was one.
+    """
+    status = None
+    while True:
+        try:
+            pid, child_status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return status
+        if pid == 0:
+            return status
+        if pid == workload:
+            status = child_status
@@ -0,0 +1,268 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# layers MODULE
+# --------------------------------------------------
+"""
+Content-addressed layer store.
+
+Layers are tar or tar.gz streams imported in a single pass and stored by
+the sha256 digest of the stream. Every regular file is also stored once
+as a blob keyed by its content and mode, and layer trees hardlink to
+those blobs, so identical files across layers share one inode.
+
+    <root>/blobs/<sha256>-<mode>-<uid>-<gid>
+    <root>/layers/<sha256>/...
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import hashlib
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import ensure_dir
+
+
+log = setup_logger("Layers")
+
+CHUNK_SIZE = 1024 * 1024
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+
+class _HashingReader:
+    """
+    File wrapper that hashes every byte read through it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.hash.update(data)
+        return data
+
+    def drain(self):
+        while self.read(CHUNK_SIZE):
+            pass
+
+
+# --------------------------------------------------
+# layer store
+# --------------------------------------------------
+class LayerStore:
+    def __init__(self, root: str = Config.DEFAULT_CONTAINER_ROOT):
+        self.root = root
+        self.blobs = os.path.join(root, "blobs")
+        self.layers = os.path.join(root, "layers")
+        self.tmp = os.path.join(root, "tmp")
+        for path in (self.blobs, self.layers, self.tmp):
+            ensure_dir(path)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.layers, digest.split(":", 1)[-1])
+
+    def has(self, digest: str) -> bool:
+        return os.path.isdir(self.path(digest))
+
+    def import_layer(self, fileobj, digest: str = None) -> str:
+        """
+        Import a tar/tar.gz layer from a stream and return its digest.
+
+        When `digest` is given and already stored, the stream is not read
+        at all; otherwise it is verified against the imported bytes.
+        """
+        if digest is not None and self.has(digest):
+            log.info(f"Layer {digest} already present")
+            return digest
+
+        reader = _HashingReader(fileobj)
+        staging = os.path.realpath(tempfile.mkdtemp(dir=self.tmp))
+        try:
+            with tarfile.open(fileobj=reader, mode="r|*") as tar:
+                for member in tar:
+                    self._extract(tar, member, staging)
+            reader.drain()
+
+            actual = f"sha256:{reader.hash.hexdigest()}"
+            if digest is not None and digest != actual:
+                raise ValueError(
+                    f"Layer digest mismatch: expected {digest}, got {actual}"
+                )
+            if self.has(actual):
+                log.info(f"Layer {actual} already present")
+                return actual
+            os.chmod(staging, 0o755)
+            try:
+                os.rename(staging, self.path(actual))
+            except OSError:
+                if not self.has(actual):
+                    raise
+                # Imported concurrently by someone else
+            log.info(f"Imported layer {actual}")
+            return actual
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def import_file(self, path: str, digest: str = None) -> str:
+        with open(path, "rb") as f:
+            return self.import_layer(f, digest)
+
+    def stack(self, digests) -> list:
+        """
+        Turn image layers (base first) into overlay lower dirs
+        (top-most first) for Container(rootfs=..., overlay=True).
+        """
+        dirs = []
+        for digest in digests:
+            if not self.has(digest):
+                raise FileNotFoundError(f"Layer not found: {digest}")
+            dirs.append(self.path(digest))
+        return dirs[::-1]
+
+    def _extract(self, tar, member, staging: str):
+        name = _safe_name(member.name)
+        if name is None:
+            log.error(f"Skipping unsafe layer path: {member.name}")
+            return
+        dest = os.path.join(staging, name)
+        parent, base = os.path.split(dest)
+        # Resolve before creating anything: a symlink from an earlier
+        # entry must never lead a mkdir or write out of the layer
+        if not _inside(staging, parent):
+            log.error(f"Skipping layer path outside rootfs: {member.name}")
+            return
+        ensure_dir(parent)
+
+        if base == OPAQUE_WHITEOUT:
+            _set_opaque(parent)
+            return
+        # Later entries replace earlier ones; never write through a link
+        _replace(dest, keep_dir=member.isdir())
+        if base.startswith(WHITEOUT_PREFIX):
+            _whiteout(os.path.join(parent, base[len(WHITEOUT_PREFIX):]))
+        elif member.isdir():
+            ensure_dir(dest)
+            fd = os.open(dest, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+            try:
+                os.fchmod(fd, member.mode)
+            finally:
+                os.close(fd)
+        elif member.isfile():
+            os.link(self._store_blob(tar.extractfile(member), member), dest)
+        elif member.issym():
+            os.symlink(member.linkname, dest)
+        elif member.islnk():
+            target = _safe_name(member.linkname)
+            source = target and os.path.join(staging, target)
+            if source and _inside(staging, os.path.dirname(source)):
+                os.link(source, dest, follow_symlinks=False)
+            else:
+                log.error(f"Skipping unsafe hardlink: {member.linkname}")
+        elif os.geteuid() == 0 and (member.ischr() or member.isblk()
+                                    or member.isfifo()):
+            kind = (stat.S_IFCHR if member.ischr() else
+                    stat.S_IFBLK if member.isblk() else stat.S_IFIFO)
+            os.mknod(dest, kind | member.mode,
+                     os.makedev(member.devmajor, member.devminor))
+
+    def _store_blob(self, src, member) -> str:
+        """
+        Copy one file into the blob store unless identical content with
+        the same mode and owner is already there.
+        """
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            key = (f"{digest.hexdigest()}-{member.mode:o}"
+                   f"-{member.uid}-{member.gid}")
+            blob = os.path.join(self.blobs, key)
+            if os.path.exists(blob):
+                os.unlink(tmp)
+                return blob
+            os.chmod(tmp, member.mode)
+            if os.geteuid() == 0:
+                os.chown(tmp, member.uid, member.gid)
+            os.rename(tmp, blob)
+            return blob
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+def _safe_name(name: str):
+    parts = [p for p in name.split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return os.path.join(*parts)
+
+
+def _inside(root: str, path: str) -> bool:
+    real = os.path.realpath(path)
+    return real == root or real.startswith(root + os.sep)
+
+
+def _replace(path: str, keep_dir: bool = False):
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISDIR(st.st_mode):
+        if not keep_dir:
+            shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+def _whiteout(path: str):
+    # overlayfs whiteout: a 0:0 character device (needs CAP_MKNOD)
+    try:
+        os.mknod(path, stat.S_IFCHR | 0o000, os.makedev(0, 0))
+    except OSError as e:
+        log.error(f"Could not create whiteout {path}: {e}")
+
+
+def _set_opaque(path: str):
+    try:
+        os.setxattr(path, "trusted.overlay.opaque", b"y")
+    except OSError as e:
+        log.error(f"Could not mark {path} opaque: {e}")
@@ -34,16 +34,203 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import atexit
+import collections
+import json
 import logging
+import os
+import threading
 from config import Config
 
 
-def setup_logger(name: str):
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        logging.basicConfig(
-            level=logging.INFO,
-            filename=Config.LOG_FILE,
-            format="[%(asctime)s] [%(levelname)s] %(name)s: %(message)s",
+# --------------------------------------------------
+# json formatter
+# --------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, one record per line.
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+# --------------------------------------------------
+# queue file handler
+# --------------------------------------------------
+class QueueFileHandler(logging.Handler):
+    """
+    Non-blocking handler: `emit` only appends the record to a bounded
+    in-memory queue, and a background thread formats and writes batches
+    to `path`. Records arriving while the queue is full are counted in
+    `dropped` and reported in the log once the writer catches up.
+
+    The file is opened O_APPEND, so in a forked child (where the writer
+    thread and the queue's state do not exist) records are written
+    straight to the inherited fd with a single os.write and no locks.
+
+    Nothing is opened or started until the first record: `path` (default:
+    Config.LOG_FILE as it is at that point) is only resolved then.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        maxsize: int = Config.LOG_QUEUE_SIZE,
+        flush_interval: float = Config.LOG_FLUSH_INTERVAL,
+        start: bool = True,
+    ):
+        super().__init__()
+        self.setFormatter(JsonFormatter())
+        self.path = path
+        self.fd = None
+        self.start = start
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._reported = 0
+        self._owner = os.getpid()
+        # deque append/popleft are atomic, so emit never takes a lock
+        # the writer could be holding
+        self._queue = collections.deque()
+        self._open_lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _open(self):
+        path = self.path or Config.LOG_FILE
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return os.open(
+            path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644
+        )
+
+    def _start(self):
+        with self._open_lock:
+            if self.fd is not None or self._stop.is_set():
+                return
+            self.fd = self._open()
+            if self.start:
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def emit(self, record):
+        try:
+            if os.getpid() != self._owner:
+                # No locks here: another thread may have held one at fork
+                if self.fd is None:
+                    self.fd = self._open()
+                self._write([self.format(record)])
+                return
+            if self.fd is None:
+                self._start()
+            if len(self._queue) >= self.maxsize:
+                self.dropped += 1
+                return
+            self._queue.append(record)
+            if len(self._queue) * 2 >= self.maxsize:
+                self._wake.set()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        """
+        Write out everything queued so far (owner process only).
+        """
+        if os.getpid() != self._owner:
+            return
+        if self.fd is None:
+            if not self._queue and self.dropped == self._reported:
+                return
+            self._start()
+            if self.fd is None:
+                return
+        with self._drain_lock:
+            lines = []
+            while self._queue:
+                lines.append(self.format(self._queue.popleft()))
+            if self.dropped > self._reported:
+                lines.append(self._drop_notice(self.dropped - self._reported))
+                self._reported = self.dropped
+            if lines:
+                self._write(lines)
+
+    def close(self):
+        if os.getpid() == self._owner:
+            self.flush()
+            self._stop.set()
+            self._wake.set()
+            if self._thread is not None:
+                self._thread.join()
+                self._thread = None
+            self.flush()
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+        super().close()
+
+    def stats(self) -> dict:
+        return {"queued": len(self._queue), "dropped": self.dropped}
+
+    def _write(self, lines):
+        data = ("\n".join(lines) + "\n").encode()
+        while data:
+            data = data[os.write(self.fd, data):]
+
+    def _drop_notice(self, count: int) -> str:
+        record = logging.LogRecord(
+            "Logger", logging.WARNING, __file__, 0,
+            f"Dropped {count} log records (queue full)", None, None,
         )
-    return logger
+        return self.format(record)
+
+    def _write_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass  # disk full etc.; keep the runtime going
+
+
+_handler = None
+_setup_lock = threading.Lock()
+
+
+def setup_logger(name: str):
+    """
+    Return the named logger, installing the shared queue handler on the
+    root logger (at Config.LOG_LEVEL) the first time. The handler opens
+    Config.LOG_FILE on its first record, not at import.
+    """
+    global _handler
+    with _setup_lock:
+        if _handler is None:
+            _handler = QueueFileHandler()
+            root = logging.getLogger()
+            root.addHandler(_handler)
+            root.setLevel(Config.LOG_LEVEL.upper())
+            atexit.register(_handler.close)
+    return logging.getLogger(name)
+
+
+def log_stats() -> dict:
+    """
+    Queue depth and drop count of the shared handler.
+    """
+    if _handler is None:
+        return {"queued": 0, "dropped": 0}
+    return _handler.stats()
@@ -34,8 +34,11 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import errno
 import os
-import subprocess
+import struct
+from mini_container_runtime import syscalls, tracing
+from mini_container_runtime.backend import get_backend
 from mini_container_runtime.logger import setup_logger
 
 
@@ -49,19 +52,83 @@ CLONE_NEWUTS    = 0x04000000
 CLONE_NEWNET    = 0x40000000
 CLONE_NEWPIC    = 0x08000000
 
+# Pid (or -errno) reported by the spawn helper
+_PID = struct.Struct("i")
 
+
+@tracing.traced("unshare")
 def unshare(namespaces):
     """
-    Unshare namespaces using the `unshare` syscall wrapper.
+    Unshare namespaces using the `unshare` syscall.
     """
     flags = 0
     for ns in namespaces:
         flags |= ns
     
     log.info(f"Unsharing namespaces: {namespaces}")
-    os.unshare(flags)
+    get_backend().unshare(flags)
+
+
+def spawn(namespaces, cgroup_fd: int = None):
+    """
+    Start a child directly inside fresh `namespaces` (and, with
+    `cgroup_fd`, inside that cgroup) with one clone. The calling process
+    never leaves its own namespaces; with CLONE_NEWPID the child is PID
+    1 of its namespace and still our child, so its pid, pidfd and exit
+    status are the container's own.
+
+    Returns (pid, pidfd) in the parent and (0, None) in the child.
+    """
+    flags = 0
+    for ns in namespaces:
+        flags |= ns
+
+    backend = get_backend()
+    if backend.clone_safe():
+        return backend.clone(flags, cgroup_fd)
+    return _helper_spawn(backend, flags, cgroup_fd)
+
+
+def _helper_spawn(backend, flags: int, cgroup_fd: int):
+    # Threads are running, and clone skips the fork handlers that reset
+    # their locks. fork() a helper (single-threaded, locks reset) that
+    # clones the child with CLONE_PARENT, making it our child anyway.
+    r, w = os.pipe2(os.O_CLOEXEC)
+    try:
+        helper = backend.fork()
+    except BaseException:
+        os.close(r)
+        os.close(w)
+        raise
+    if helper == 0:
+        os.close(r)
+        try:
+            pid, _ = backend.clone(flags | syscalls.CLONE_PARENT, cgroup_fd)
+        except OSError as e:
+            pid = -e.errno
+        except BaseException:
+            pid = -errno.EINVAL
+        if pid == 0:
+            os.close(w)
+            return 0, None
+        os.write(w, _PID.pack(pid))
+        os._exit(0)
+
+    os.close(w)
+    try:
+        data = os.read(r, _PID.size)
+    finally:
+        os.close(r)
+        backend.wait(helper, 0)
+    if len(data) < _PID.size:
+        raise ChildProcessError("Spawn helper died before cloning")
+    pid = _PID.unpack(data)[0]
+    if pid < 0:
+        raise OSError(-pid, os.strerror(-pid))
+    return pid, backend.pidfd_open(pid)
 
 
+@tracing.traced("set_hostname")
 def set_hostname(hostname: str):
     log.info(f"Setting hostname: {hostname}")
-    subprocess.run(["hostname", hostname], check=True)
+    get_backend().sethostname(hostname)
@@ -0,0 +1,257 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# netlink MODULE
+# --------------------------------------------------
+"""
+Minimal rtnetlink client: just what network.py needs to create bridges
+and veth pairs, bring links up, and add IPv4 addresses and routes,
+without running `ip`.
+
+Requests are sent with NLM_F_ACK; a negative ack is raised as the
+matching OSError subclass (FileExistsError, ...).
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import errno
+import itertools
+import os
+import socket
+import struct
+
+
+# Message types
+NLMSG_ERROR     = 2
+NLMSG_DONE      = 3
+RTM_NEWLINK     = 16
+RTM_DELLINK     = 17
+RTM_GETLINK     = 18
+RTM_NEWADDR     = 20
+RTM_NEWROUTE    = 24
+
+# Header flags
+NLM_F_REQUEST   = 0x001
+NLM_F_ACK       = 0x004
+NLM_F_EXCL      = 0x200
+NLM_F_CREATE    = 0x400
+
+# Link attributes
+IFLA_IFNAME     = 3
+IFLA_MASTER     = 10
+IFLA_LINKINFO   = 18
+IFLA_NET_NS_FD  = 28
+IFLA_INFO_KIND  = 1
+IFLA_INFO_DATA  = 2
+VETH_INFO_PEER  = 1
+IFF_UP          = 0x1
+
+# Address and route attributes
+IFA_ADDRESS     = 1
+IFA_LOCAL       = 2
+RTA_OIF         = 4
+RTA_GATEWAY     = 5
+RT_TABLE_MAIN   = 254
+RTPROT_BOOT     = 3
+RT_SCOPE_UNIVERSE = 0
+RTN_UNICAST     = 1
+
+NLMSGHDR    = "=IHHII"      # len, type, flags, seq, pid
+IFINFOMSG   = "=BxHiII"     # family, type, index, flags, change
+IFADDRMSG   = "=BBBBI"      # family, prefixlen, flags, scope, index
+RTMSG       = "=BBBBBBBBI"  # family, dst_len, src_len, tos, table,
+                            # protocol, scope, type, flags
+_HDR_SIZE = struct.calcsize(NLMSGHDR)
+
+
+# --------------------------------------------------
+# encoding
+# --------------------------------------------------
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def attr(kind: int, payload: bytes) -> bytes:
+    """
+    One route attribute, padded to 4 bytes.
+    """
+    size = 4 + len(payload)
+    return struct.pack("=HH", size, kind) + payload + \
+        b"\0" * (_align(size) - size)
+
+
+def nested(kind: int, *attrs: bytes) -> bytes:
+    return attr(kind, b"".join(attrs))
+
+
+def message(kind: int, flags: int, seq: int, body: bytes) -> bytes:
+    return struct.pack(NLMSGHDR, _HDR_SIZE + len(body), kind, flags,
+                       seq, 0) + body
+
+
+def parse_attrs(data: bytes) -> dict:
+    """
+    Attribute type -> payload of a packed attribute list.
+    """
+    attrs = {}
+    offset = 0
+    while offset + 4 <= len(data):
+        size, kind = struct.unpack_from("=HH", data, offset)
+        if size < 4:
+            break
+        attrs[kind & 0x3fff] = data[offset + 4:offset + size]
+        offset += _align(size)
+    return attrs
+
+
+def parse_messages(data: bytes):
+    """
+    Yield (type, flags, seq, body) for each message in `data`.
+    """
+    offset = 0
+    while offset + _HDR_SIZE <= len(data):
+        size, kind, flags, seq, _ = struct.unpack_from(NLMSGHDR, data,
+                                                       offset)
+        if size < _HDR_SIZE:
+            break
+        yield kind, flags, seq, data[offset + _HDR_SIZE:offset + size]
+        offset += _align(size)
+
+
+def _name(name: str) -> bytes:
+    return attr(IFLA_IFNAME, name.encode() + b"\0")
+
+
+def _u32(kind: int, value: int) -> bytes:
+    return attr(kind, struct.pack("=I", value))
+
+
+# --------------------------------------------------
+# netlink
+# --------------------------------------------------
+class Netlink:
+    """
+    rtnetlink requests over one NETLINK_ROUTE socket (see
+    KernelBackend.netlink_open); they apply to the network namespace
+    the socket was opened in.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._seq = itertools.count(1)
+
+    def request(self, kind: int, body: bytes, flags: int = 0) -> list:
+        """
+        Send one request and return the bodies of its replies.
+        """
+        seq = next(self._seq)
+        self.sock.send(message(kind, NLM_F_REQUEST | NLM_F_ACK | flags,
+                               seq, body))
+        replies = []
+        while True:
+            data = self.sock.recv(65536)
+            for reply, _, reply_seq, payload in parse_messages(data):
+                if reply_seq != seq:
+                    continue
+                if reply == NLMSG_ERROR:
+                    code = -struct.unpack_from("=i", payload)[0]
+                    if code:
+                        raise OSError(code, os.strerror(code))
+                    return replies
+                if reply == NLMSG_DONE:
+                    return replies
+                replies.append(payload)
+
+    def link_index(self, name: str) -> int:
+        body = struct.pack(IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0)
+        for payload in self.request(RTM_GETLINK, body + _name(name)):
+            return struct.unpack_from(IFINFOMSG, payload)[2]
+        raise OSError(errno.ENODEV, os.strerror(errno.ENODEV), name)
+
+    def add_bridge(self, name: str):
+        self._new_link(name, nested(
+            IFLA_LINKINFO, attr(IFLA_INFO_KIND, b"bridge")
+        ))
+
+    def add_veth(self, name: str, peer: str, peer_netns: int,
+                 master: int = None):
+        """
+        Create veth `name` here and its `peer` directly inside the
+        namespace `peer_netns` (an fd), optionally enslaved to `master`.
+        """
+        peer_msg = struct.pack(IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0) \
+            + _name(peer) + _u32(IFLA_NET_NS_FD, peer_netns)
+        linkinfo = nested(
+            IFLA_LINKINFO,
+            attr(IFLA_INFO_KIND, b"veth"),
+            nested(IFLA_INFO_DATA, attr(VETH_INFO_PEER, peer_msg)),
+        )
+        extra = b"" if master is None else _u32(IFLA_MASTER, master)
+        self._new_link(name, extra + linkinfo)
+
+    def set_up(self, index: int):
+        self.request(RTM_NEWLINK, struct.pack(
+            IFINFOMSG, socket.AF_UNSPEC, 0, index, IFF_UP, IFF_UP
+        ))
+
+    def delete_link(self, index: int):
+        self.request(RTM_DELLINK, struct.pack(
+            IFINFOMSG, socket.AF_UNSPEC, 0, index, 0, 0
+        ))
+
+    def add_address(self, index: int, address):
+        """
+        Add `address` (an ipaddress.IPv4Interface) to link `index`.
+        """
+        packed = address.ip.packed
+        body = struct.pack(IFADDRMSG, socket.AF_INET,
+                           address.network.prefixlen, 0, 0, index)
+        body += attr(IFA_LOCAL, packed) + attr(IFA_ADDRESS, packed)
+        self.request(RTM_NEWADDR, body, NLM_F_CREATE | NLM_F_EXCL)
+
+    def add_default_route(self, gateway, index: int):
+        body = struct.pack(RTMSG, socket.AF_INET, 0, 0, 0, RT_TABLE_MAIN,
+                           RTPROT_BOOT, RT_SCOPE_UNIVERSE, RTN_UNICAST, 0)
+        body += attr(RTA_GATEWAY, gateway.packed) + _u32(RTA_OIF, index)
+        self.request(RTM_NEWROUTE, body, NLM_F_CREATE | NLM_F_EXCL)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_link(self, name: str, attrs: bytes):
+        body = struct.pack(IFINFOMSG, socket.AF_UNSPEC, 0, 0, 0, 0)
+        self.request(RTM_NEWLINK, body + _name(name) + attrs,
+                     NLM_F_CREATE | NLM_F_EXCL)
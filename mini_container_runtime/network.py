@@ -0,0 +1,343 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# network MODULE
+# --------------------------------------------------
+"""
+Container networking.
+
+Modes:
+
+- host      - share the host's network stack (no network namespace)
+- none      - own network namespace, nothing configured
+- loopback  - own namespace with `lo` up
+- bridge    - `lo` plus an `eth0` veth whose host end is on a local
+              bridge, with an address from the bridge subnet and a
+              default route through the bridge
+
+Creating a namespace and wiring its veth is one of the slowest steps of
+container churn, so NetworkManager keeps pools of namespaces that are
+already configured, held open by fd. A container joins one with
+setns() before exec. Namespaces are used once: a container may have
+changed it, and closing the fd lets the kernel tear it (and its veth)
+down in the background.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import collections
+import ipaddress
+import threading
+import time
+from config import Config
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.netlink import Netlink
+from mini_container_runtime.utils import generate_id
+
+
+log = setup_logger("Network")
+
+
+HOST = "host"
+NONE = "none"
+LOOPBACK = "loopback"
+BRIDGE = "bridge"
+MODES = (HOST, NONE, LOOPBACK, BRIDGE)
+
+
+# --------------------------------------------------
+# address allocation
+# --------------------------------------------------
+class Ipam:
+    """
+    Addresses of `subnet`. The first host address belongs to the bridge
+    and is the containers' gateway.
+    """
+
+    def __init__(self, subnet: str = Config.NETWORK_SUBNET):
+        self.network = ipaddress.ip_network(subnet)
+        hosts = self.network.hosts()
+        self.gateway = next(hosts)
+        self._unused = hosts
+        # Released addresses are handed out again oldest first, giving
+        # stale ARP entries for them the longest time to expire
+        self._free = collections.deque()
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def allocate(self):
+        """
+        A free address, as an ipaddress.IPv4Interface.
+        """
+        with self._lock:
+            while True:
+                if self._free:
+                    address = self._free.popleft()
+                else:
+                    address = next(self._unused, None)
+                    if address is None:
+                        raise RuntimeError(
+                            f"No free address left in {self.network}"
+                        )
+                if address not in self._used:
+                    break
+            self._used.add(address)
+        return ipaddress.ip_interface(f"{address}/{self.network.prefixlen}")
+
+    def reserve(self, address):
+        """
+        Mark `address` taken, e.g. by a re-adopted container.
+        """
+        with self._lock:
+            self._used.add(ipaddress.ip_interface(address).ip)
+
+    def release(self, address):
+        ip = ipaddress.ip_interface(address).ip
+        with self._lock:
+            if ip in self._used:
+                self._used.remove(ip)
+                self._free.append(ip)
+
+    @property
+    def in_use(self) -> int:
+        return len(self._used)
+
+
+# --------------------------------------------------
+# network namespace
+# --------------------------------------------------
+class NetworkNamespace:
+    """
+    A configured network namespace, held open by `fd`.
+    """
+
+    def __init__(self, manager, fd: int, mode: str):
+        self.manager = manager
+        self.fd = fd
+        self.mode = mode
+        self.address = None  # bridge mode: ipaddress.IPv4Interface
+        self.veth = None     # bridge mode: host end of the veth pair
+        self.created = time.monotonic()
+
+    def close(self):
+        if self.fd is not None:
+            self.manager.release(self)
+
+
+# --------------------------------------------------
+# network manager
+# --------------------------------------------------
+class NetworkManager:
+    """
+    Per-mode pools of ready network namespaces.
+
+    `pool_size` namespaces are kept ready for every mode that has been
+    used (or passed to `prewarm`); with `refill=True` a background
+    thread tops the pools back up after each take.
+    """
+
+    def __init__(
+        self,
+        bridge: str = Config.NETWORK_BRIDGE,
+        subnet: str = Config.NETWORK_SUBNET,
+        pool_size: int = Config.NETNS_POOL_SIZE,
+        refill: bool = True,
+    ):
+        self.backend = get_backend()
+        self.bridge = bridge
+        self.ipam = Ipam(subnet)
+        self.size = pool_size
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self._pools = {mode: collections.deque() for mode in MODES[1:]}
+        self._wanted = set()
+        # rtnetlink in the host namespace, set up with the bridge
+        self._host = None
+        self._bridge_index = None
+        self._host_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        if refill:
+            self._thread = threading.Thread(
+                target=self._refill_loop, name="netns-refill", daemon=True
+            )
+            self._thread.start()
+
+    def acquire(self, mode: str) -> NetworkNamespace:
+        """
+        A namespace configured for `mode`, from the pool if one is ready.
+        """
+        if mode not in self._pools:
+            raise ValueError(f"Unknown network mode: {mode!r}")
+        with self._lock:
+            self._wanted.add(mode)
+            pool = self._pools[mode]
+            netns = pool.popleft() if pool else None
+            if netns is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wake.set()
+        return netns if netns is not None else self._create(mode)
+
+    def release(self, netns: NetworkNamespace):
+        """
+        Give up `netns`; its address goes back to the pool.
+        """
+        fd, netns.fd = netns.fd, None
+        if fd is not None:
+            self.backend.netns_close(fd)
+        if netns.address is not None:
+            self.ipam.release(netns.address)
+
+    def prewarm(self, mode: str, count: int = None):
+        """
+        Create namespaces for `mode` until `count` (default: the pool
+        size) are ready.
+        """
+        target = self.size if count is None else count
+        while not self._closed:
+            with self._lock:
+                if len(self._pools[mode]) >= target:
+                    return
+            try:
+                netns = self._create(mode)
+            except (OSError, RuntimeError) as e:
+                log.error(f"Could not create {mode} namespace: {e}")
+                return
+            with self._lock:
+                self._pools[mode].append(netns)
+
+    def refill(self):
+        for mode in list(self._wanted):
+            self.prewarm(mode)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "created": self.created,
+            "idle": {mode: len(p) for mode, p in self._pools.items()},
+            "addresses": self.ipam.in_use,
+        }
+
+    def shutdown(self):
+        """
+        Drop the pooled namespaces. The bridge stays: containers still
+        running (and re-adopted later) are attached to it.
+        """
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            idle = [n for p in self._pools.values() for n in p]
+            for pool in self._pools.values():
+                pool.clear()
+        for netns in idle:
+            self.release(netns)
+        with self._host_lock:
+            if self._host is not None:
+                self._host.close()
+                self._host = None
+
+    def _create(self, mode: str) -> NetworkNamespace:
+        netns = NetworkNamespace(self, self.backend.netns_create(), mode)
+        try:
+            if mode != NONE:
+                with Netlink(self.backend.netlink_open(netns.fd)) as inner:
+                    inner.set_up(inner.link_index("lo"))
+                    if mode == BRIDGE:
+                        self._attach(netns, inner)
+        except BaseException:
+            self.release(netns)
+            raise
+        with self._lock:
+            self.created += 1
+        return netns
+
+    def _attach(self, netns: NetworkNamespace, inner: Netlink):
+        """
+        Wire `netns` to the bridge: veth, address and default route.
+        """
+        host = self._host_netlink()
+        netns.address = self.ipam.allocate()
+        netns.veth = f"mcr{generate_id()[:8]}"
+        with self._host_lock:
+            host.add_veth(netns.veth, "eth0", netns.fd,
+                          master=self._bridge_index)
+            host.set_up(host.link_index(netns.veth))
+        eth0 = inner.link_index("eth0")
+        inner.add_address(eth0, netns.address)
+        inner.set_up(eth0)
+        inner.add_default_route(self.ipam.gateway, eth0)
+
+    def _host_netlink(self) -> Netlink:
+        with self._host_lock:
+            if self._host is None:
+                host = Netlink(self.backend.netlink_open())
+                try:
+                    self._bridge_index = self._setup_bridge(host)
+                except BaseException:
+                    host.close()
+                    raise
+                self._host = host
+            return self._host
+
+    def _setup_bridge(self, host: Netlink) -> int:
+        try:
+            host.add_bridge(self.bridge)
+            log.info(f"Created bridge {self.bridge}")
+        except FileExistsError:
+            pass  # from an earlier runtime
+        index = host.link_index(self.bridge)
+        gateway = ipaddress.ip_interface(
+            f"{self.ipam.gateway}/{self.ipam.network.prefixlen}"
+        )
+        try:
+            host.add_address(index, gateway)
+        except FileExistsError:
+            pass
+        host.set_up(index)
+        return index
+
+    def _refill_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            if self._closed:
+                break
+            self.refill()
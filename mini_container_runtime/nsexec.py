@@ -0,0 +1,218 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# nsexec MODULE
+# --------------------------------------------------
+"""
+Run a command inside a running container.
+
+A helper is cloned straight into the container's cgroup. It joins all
+of the container's namespaces with one setns() on the container's pidfd
+and chroots through the container's cached root fd. Then it runs the
+command under init.run_as_init, which places the command in the
+container's PID namespace, reaps it and relays its exit code. Nothing
+under /proc/<pid>/ns is opened and no external nsenter is run.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import select
+import signal
+import struct
+import time
+from mini_container_runtime import namespaces
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.init import run_as_init
+from mini_container_runtime.logger import setup_logger
+
+
+log = setup_logger("Exec")
+
+_PID = struct.Struct("I")
+
+
+class ExecResult:
+    def __init__(self, exit_code: int, stdout: bytes = None,
+                 stderr: bytes = None, timed_out: bool = False):
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+    def __repr__(self):
+        return (f"ExecResult(exit_code={self.exit_code}, "
+                f"timed_out={self.timed_out})")
+
+
+def exec_in(container, command, capture: bool = False,
+            timeout: float = None) -> ExecResult:
+    """
+    Run `command` in `container` and wait for it. With `capture`, its
+    stdout/stderr are returned instead of going to ours. After
+    `timeout` seconds the command is killed.
+    """
+    if not container.running:
+        raise ProcessLookupError(f"Container {container.id} is not running")
+    flags = 0
+    for ns in container.namespaces:
+        flags |= ns
+    root_fd = container.root_fd()
+    cgroup_fd = None
+    if container.cgroup is not None:
+        cgroup_fd = container.cgroup.fileno()
+
+    pipes = [os.pipe2(os.O_CLOEXEC)]
+    if capture:
+        pipes += [os.pipe2(os.O_CLOEXEC), os.pipe2(os.O_CLOEXEC)]
+    try:
+        pid, pidfd = namespaces.spawn([], cgroup_fd=cgroup_fd)
+    except BaseException:
+        for r, w in pipes:
+            os.close(r)
+            os.close(w)
+        raise
+
+    if pid == 0:
+        _enter(container, flags, root_fd, command, [w for _, w in pipes])
+
+    for _, w in pipes:
+        os.close(w)
+    status_r, out_r, err_r = [r for r, _ in pipes] + [None] * (3 - len(pipes))
+    try:
+        workload = _read_pid(status_r)
+        return _collect(pid, pidfd, workload, out_r, err_r, timeout)
+    finally:
+        for r, _ in pipes:
+            os.close(r)
+        os.close(pidfd)
+
+
+def _enter(container, flags: int, root_fd, command, fds):
+    """
+    Helper child: step into the container and run `command`.
+    """
+    backend = get_backend()
+    try:
+        status_w = fds[0]
+        if len(fds) == 3:
+            os.dup2(fds[1], 1)
+            os.dup2(fds[2], 2)
+        if flags:
+            backend.setns(container.pidfd, flags)
+        if root_fd is not None:
+            os.fchdir(root_fd)
+        else:
+            os.chdir(container.root)
+        backend.chroot(".")
+        os.chdir("/")
+        run_as_init(
+            command,
+            spawned=lambda pid: os.write(status_w, _PID.pack(pid)),
+        )
+    except BaseException as e:
+        log.error(f"exec into {container.id} failed: {e}")
+    finally:
+        os._exit(127)
+
+
+def _read_pid(fd: int):
+    # Host PID of the command, or None if the helper died first
+    data = b""
+    while len(data) < _PID.size:
+        chunk = os.read(fd, _PID.size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return _PID.unpack(data)[0]
+
+
+def _collect(pid: int, pidfd: int, workload, out_r, err_r,
+             timeout: float) -> ExecResult:
+    backend = get_backend()
+    workload_fd = None
+    if workload is not None and timeout is not None:
+        try:
+            workload_fd = backend.pidfd_open(workload)
+        except ProcessLookupError:
+            pass  # already gone
+
+    chunks = {fd: [] for fd in (out_r, err_r) if fd is not None}
+    poller = select.poll()
+    poller.register(pidfd, select.POLLIN)
+    for fd in chunks:
+        poller.register(fd, select.POLLIN)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = exited = False
+    try:
+        while not exited:
+            wait = None
+            if deadline is not None and not timed_out:
+                wait = max(0, deadline - time.monotonic())
+                if wait == 0:
+                    timed_out = True
+                    if workload_fd is not None:
+                        backend.pidfd_signal(workload_fd, signal.SIGKILL)
+                    continue
+            for fd, _ in poller.poll(None if wait is None else wait * 1000):
+                if fd == pidfd:
+                    exited = True
+                elif not _read(fd, chunks[fd]):
+                    poller.unregister(fd)
+    finally:
+        if workload_fd is not None:
+            os.close(workload_fd)
+
+    # Whatever the command wrote before exiting; background children it
+    # left behind may hold the pipes open, so read without waiting
+    for fd, parts in chunks.items():
+        os.set_blocking(fd, False)
+        while True:
+            try:
+                if not _read(fd, parts):
+                    break
+            except BlockingIOError:
+                break
+
+    _, status, _ = backend.wait(pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    return ExecResult(
+        code,
+        b"".join(chunks[out_r]) if out_r is not None else None,
+        b"".join(chunks[err_r]) if err_r is not None else None,
+        timed_out,
+    )
+
+
+def _read(fd: int, parts: list) -> bool:
+    chunk = os.read(fd, 65536)
+    if chunk:
+        parts.append(chunk)
+    return bool(chunk)
@@ -0,0 +1,452 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# output MODULE
+# --------------------------------------------------
+"""
+Container stdout/stderr capture.
+
+Each captured container writes into its own pair of pipes. One reader
+thread multiplexes every pipe through epoll, reading a bounded chunk per
+wake-up so no container can starve the others, and appends the output
+to an in-memory ring buffer (for fast tails) and to a size-rotated log
+file. Rotated files are gzipped by a background thread.
+
+stdout and stderr share the ring buffer and the log file: they are
+interleaved in the order chunks arrive, like on a terminal, and cannot
+be told apart afterwards.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import fcntl
+import gzip
+import os
+import queue
+import select
+import shutil
+import threading
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import ensure_dir
+
+
+log = setup_logger("Output")
+
+READ_CHUNK = 64 * 1024
+PIPE_SIZE = 1024 * 1024
+
+
+# --------------------------------------------------
+# ring buffer
+# --------------------------------------------------
+class RingBuffer:
+    """
+    Keeps the last `capacity` bytes written to it.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray()
+
+    def write(self, data: bytes):
+        self._buf += data
+        # Trim lazily so the copy is amortised over `capacity` bytes
+        if len(self._buf) > 2 * self.capacity:
+            del self._buf[:-self.capacity]
+
+    def tail(self, lines: int = None) -> bytes:
+        data = bytes(self._buf[-self.capacity:])
+        if lines is None:
+            return data
+        if lines <= 0:
+            return b""
+        end = len(data) - 1 if data.endswith(b"\n") else len(data)
+        start = end
+        for _ in range(lines):
+            start = data.rfind(b"\n", 0, start)
+            if start < 0:
+                return data
+        return data[start + 1:]
+
+
+# --------------------------------------------------
+# rotating log
+# --------------------------------------------------
+class RotatingLog:
+    """
+    Append-only file rotated once it reaches `max_bytes`.
+
+    The full file is renamed aside and handed to `compressor`, which
+    shifts older `<path>.N.gz` backups up and gzips it to `<path>.1.gz`,
+    keeping at most `backups` of them.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backups: int, compressor):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compressor = compressor
+        self._rotations = 0
+        self._open()
+
+    def _open(self):
+        self.fd = os.open(
+            self.path,
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC,
+            0o640,
+        )
+        self.size = os.fstat(self.fd).st_size
+
+    def write(self, data: bytes):
+        if self.size and self.size + len(data) > self.max_bytes:
+            self.rotate()
+        while data:
+            written = os.write(self.fd, data)
+            self.size += written
+            data = data[written:]
+
+    def rotate(self):
+        os.close(self.fd)
+        self._rotations += 1
+        pending = f"{self.path}.{self._rotations}.pending"
+        os.rename(self.path, pending)
+        self._open()
+        self.compressor.submit(pending, self.path, self.backups)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class Compressor:
+    """
+    Background gzip of rotated logs, one job at a time and in order.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="log-compressor", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, pending: str, path: str, backups: int):
+        self._jobs.put((pending, path, backups))
+
+    def close(self):
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                _compress(*job)
+            except OSError as e:
+                log.error(f"Compressing {job[0]} failed: {e}")
+
+
+class _InlineCompressor:
+    """
+    Compressor for a process that has no thread to spare.
+    """
+
+    @staticmethod
+    def submit(pending: str, path: str, backups: int):
+        _compress(pending, path, backups)
+
+
+def _compress(pending: str, path: str, backups: int):
+    for n in range(backups, 0, -1):
+        src = f"{path}.{n}.gz"
+        if not os.path.exists(src):
+            continue
+        if n == backups:
+            os.unlink(src)
+        else:
+            os.rename(src, f"{path}.{n + 1}.gz")
+    if backups <= 0:
+        os.unlink(pending)
+        return
+    tmp = f"{path}.1.gz.tmp"
+    with open(pending, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.rename(tmp, f"{path}.1.gz")
+    os.unlink(pending)
+
+
+# --------------------------------------------------
+# output collector
+# --------------------------------------------------
+class _Stream:
+    def __init__(self, container_id: str, ring: RingBuffer, logfile):
+        self.container_id = container_id
+        self.ring = ring
+        self.logfile = logfile
+        self.open_fds = 2
+
+
+class OutputCollector:
+    """
+    Captures stdout/stderr of any number of containers.
+
+    `attach(container)` creates the pipes before the container starts;
+    the child dup2()s the write ends onto fds 1 and 2 and the parent
+    closes its copies. Output (stdout and stderr merged) is available
+    from `tail()` and in `<root>/<container id>/container.log`.
+    """
+
+    def __init__(
+        self,
+        root: str = Config.CONTAINER_LOG_DIR,
+        ring_size: int = Config.OUTPUT_RING_KB * 1024,
+        max_bytes: int = Config.OUTPUT_MAX_BYTES,
+        backups: int = Config.OUTPUT_BACKUPS,
+    ):
+        self.root = root
+        self.ring_size = ring_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compressor = Compressor()
+        self._epoll = select.epoll()
+        self._by_fd = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="output-reader", daemon=True
+        )
+        self._thread.start()
+
+    def attach(self, container):
+        """
+        Create the output pipes for a container that has not started.
+        """
+        directory = os.path.join(self.root, container.id)
+        ensure_dir(directory)
+        stream = _Stream(
+            container.id,
+            RingBuffer(self.ring_size),
+            RotatingLog(
+                os.path.join(directory, "container.log"),
+                self.max_bytes,
+                self.backups,
+                self.compressor,
+            ),
+        )
+        write_fds = []
+        with self._lock:
+            self._streams[container.id] = stream
+            for _ in range(2):
+                r, w = os.pipe2(os.O_CLOEXEC)
+                try:
+                    fcntl.fcntl(w, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+                except OSError:
+                    pass  # above /proc/sys/fs/pipe-max-size; keep default
+                os.set_blocking(r, False)
+                self._by_fd[r] = stream
+                self._epoll.register(r, select.EPOLLIN)
+                write_fds.append(w)
+        container.stdio = tuple(write_fds)
+
+    def tail(self, container_id: str, lines: int = None) -> bytes:
+        """
+        Most recent output of a container (at most the ring size).
+        """
+        with self._lock:
+            stream = self._streams.get(container_id)
+            return stream.ring.tail(lines) if stream else b""
+
+    def forget(self, container_id: str):
+        """
+        Drop the ring buffer of a container whose output is no longer
+        needed (its log file stays on disk).
+        """
+        with self._lock:
+            self._streams.pop(container_id, None)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            for fd in list(self._by_fd):
+                self._flush(fd)
+                self._close_log(self._finish(fd))
+        self._epoll.close()
+        self.compressor.close()
+
+    def detach(self):
+        """
+        Stop collecting without cutting off containers that are still
+        running: a forked drainer keeps appending their output to the
+        log files until they close it. Returns the drainer pid, or None
+        when nothing was left open.
+
+        The drainer is forked from a threaded process, so it only makes
+        syscalls: it keeps no fd but the pipes and log files, and never
+        logs (other threads may have held the logging locks).
+        """
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            for fd in list(self._by_fd):
+                if self._flush(fd) == b"":
+                    self._close_log(self._finish(fd))
+            left = dict(self._by_fd)
+            self._by_fd.clear()
+        pid = os.fork() if left else None
+        if pid == 0:
+            code = 1
+            try:
+                _keep_only(list(left) + [
+                    stream.logfile.fd for stream in left.values()
+                    if stream.logfile.fd is not None
+                ])
+                _drain(left)
+                code = 0
+            finally:
+                os._exit(code)
+        for fd, stream in left.items():
+            os.close(fd)
+            if stream.logfile.fd is not None:
+                stream.logfile.close()
+        self._epoll.close()
+        self.compressor.close()
+        if pid:
+            log.info(f"Output of {len(left)} pipes left to drainer {pid}")
+        return pid
+
+    def _run(self):
+        while not self._stop.is_set():
+            ready = self._epoll.poll(0.5)
+            chunks, finished = [], []
+            with self._lock:
+                for fd, _ in ready:
+                    stream = self._by_fd.get(fd)
+                    if stream is None:
+                        continue
+                    data = self._read(fd)
+                    if data:
+                        chunks.append((stream, data))
+                    elif data == b"":
+                        finished.append(self._finish(fd))
+            # Only this thread writes log files; tail() and attach()
+            # need not wait for the disk
+            for stream, data in chunks:
+                self._write(stream, data)
+            for stream in finished:
+                self._close_log(stream)
+
+    def _read(self, fd: int):
+        """
+        One bounded read into the ring buffer; returns the data, b""
+        at EOF or None if empty.
+        """
+        # A single chunk per wake-up keeps a chatty container from
+        # starving the others; epoll reports it again if more is left.
+        try:
+            data = os.read(fd, READ_CHUNK)
+        except BlockingIOError:
+            return None
+        if data:
+            self._by_fd[fd].ring.write(data)
+        return data
+
+    def _flush(self, fd: int):
+        """
+        Copy everything buffered in `fd` right away (reader stopped).
+        """
+        data = self._read(fd)
+        while data:
+            self._write(self._by_fd[fd], data)
+            data = self._read(fd)
+        return data
+
+    def _write(self, stream: _Stream, data: bytes):
+        try:
+            stream.logfile.write(data)
+        except OSError as e:
+            log.error(f"Writing output of {stream.container_id} failed: {e}")
+
+    def _finish(self, fd: int) -> _Stream:
+        """
+        Stop watching `fd`; returns its stream.
+        """
+        stream = self._by_fd.pop(fd)
+        self._epoll.unregister(fd)
+        os.close(fd)
+        stream.open_fds -= 1
+        return stream
+
+    def _close_log(self, stream: _Stream):
+        if stream.open_fds == 0:
+            stream.logfile.close()
+
+
+def _keep_only(fds):
+    """
+    Close every fd except `fds`.
+    """
+    low = 0
+    for fd in sorted(fds):
+        os.closerange(low, fd)
+        low = fd + 1
+    os.closerange(low, os.sysconf("SC_OPEN_MAX"))
+
+
+def _drain(by_fd: dict):
+    """
+    Drainer body: copy every pipe into its log file until EOF.
+    """
+    os.setsid()  # out of the daemon's process group and its signals
+    epoll = select.epoll()
+    for fd, stream in by_fd.items():
+        stream.logfile.compressor = _InlineCompressor
+        epoll.register(fd, select.EPOLLIN)
+    while by_fd:
+        for fd, _ in epoll.poll():
+            try:
+                data = os.read(fd, READ_CHUNK)
+            except BlockingIOError:
+                continue
+            stream = by_fd[fd]
+            if data:
+                stream.logfile.write(data)
+                continue
+            epoll.unregister(fd)
+            os.close(fd)
+            del by_fd[fd]
+            stream.open_fds -= 1
+            if stream.open_fds == 0:
+                stream.logfile.close()
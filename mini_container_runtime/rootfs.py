@@ -0,0 +1,323 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# rootfs MODULE
+# --------------------------------------------------
+"""
+Minimal rootfs builder.
+
+Resolves the shared-library closure of a set of binaries by reading
+their ELF PT_INTERP and DT_NEEDED entries directly (no `ldd`), and
+copies binaries, libraries and the dynamic loader into a rootfs usable
+by `setup_rootfs`. Closures are cached by binary content hash, and files
+already present in the target rootfs are not copied again.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import glob
+import hashlib
+import json
+import os
+import shutil
+import struct
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import ensure_dir
+
+
+log = setup_logger("Rootfs")
+
+PT_LOAD     = 1
+PT_DYNAMIC  = 2
+PT_INTERP   = 3
+
+DT_NULL     = 0
+DT_NEEDED   = 1
+DT_STRTAB   = 5
+DT_RPATH    = 15
+DT_RUNPATH  = 29
+
+DEFAULT_LIB_DIRS = ["/lib64", "/usr/lib64", "/lib", "/usr/lib"]
+ROOTFS_DIRS = ["bin", "dev", "etc", "proc", "sys", "tmp"]
+MANIFEST = ".mcr-manifest.json"
+
+
+# --------------------------------------------------
+# ELF parsing
+# --------------------------------------------------
+def read_elf(path: str) -> dict:
+    """
+    Read the dynamic-linking facts of an ELF file: class, machine,
+    interpreter, DT_NEEDED names and RPATH/RUNPATH entries.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"\x7fELF":
+        raise ValueError(f"Not an ELF file: {path}")
+
+    is64 = data[4] == 2
+    end = "<" if data[5] == 1 else ">"
+    if is64:
+        machine, = struct.unpack_from(end + "H", data, 18)
+        phoff, = struct.unpack_from(end + "Q", data, 32)
+        phentsize, phnum = struct.unpack_from(end + "HH", data, 54)
+        ph_fmt, dyn_fmt = end + "IIQQQQQQ", end + "qQ"
+    else:
+        machine, = struct.unpack_from(end + "H", data, 18)
+        phoff, = struct.unpack_from(end + "I", data, 28)
+        phentsize, phnum = struct.unpack_from(end + "HH", data, 42)
+        ph_fmt, dyn_fmt = end + "IIIIIIII", end + "iI"
+
+    loads, dynamic, interp = [], None, None
+    for i in range(phnum):
+        fields = struct.unpack_from(ph_fmt, data, phoff + i * phentsize)
+        if is64:
+            p_type, _, p_offset, p_vaddr, _, p_filesz = fields[:6]
+        else:
+            p_type, p_offset, p_vaddr, _, p_filesz = fields[:5]
+        if p_type == PT_LOAD:
+            loads.append((p_vaddr, p_offset, p_filesz))
+        elif p_type == PT_DYNAMIC:
+            dynamic = (p_offset, p_filesz)
+        elif p_type == PT_INTERP:
+            interp = data[p_offset:p_offset + p_filesz].split(b"\0")[0].decode()
+
+    info = {
+        "class": data[4],
+        "machine": machine,
+        "interp": interp,
+        "needed": [],
+        "rpath": [],
+        "runpath": [],
+    }
+    if dynamic is None:
+        return info  # statically linked
+
+    entries = []
+    offset, size = dynamic
+    for pos in range(offset, offset + size, struct.calcsize(dyn_fmt)):
+        tag, val = struct.unpack_from(dyn_fmt, data, pos)
+        if tag == DT_NULL:
+            break
+        entries.append((tag, val))
+
+    strtab = next((v for t, v in entries if t == DT_STRTAB), None)
+    strtab = _vaddr_to_offset(loads, strtab)
+
+    def string(off):
+        start = strtab + off
+        return data[start:data.index(b"\0", start)].decode()
+
+    for tag, val in entries:
+        if tag == DT_NEEDED:
+            info["needed"].append(string(val))
+        elif tag == DT_RPATH:
+            info["rpath"].extend(string(val).split(":"))
+        elif tag == DT_RUNPATH:
+            info["runpath"].extend(string(val).split(":"))
+    return info
+
+
+def _vaddr_to_offset(loads, vaddr: int) -> int:
+    for start, offset, size in loads:
+        if start <= vaddr < start + size:
+            return vaddr - start + offset
+    raise ValueError(f"Address {vaddr:#x} is not in a loadable segment")
+
+
+def system_lib_dirs(conf: str = "/etc/ld.so.conf") -> list:
+    """
+    Library directories from ld.so.conf (following `include`), then
+    the built-in defaults.
+    """
+    dirs = []
+
+    def parse(path):
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.split("#", 1)[0].strip()
+            if line.startswith("include "):
+                pattern = line.split(None, 1)[1]
+                if not os.path.isabs(pattern):
+                    pattern = os.path.join(os.path.dirname(path), pattern)
+                for included in sorted(glob.glob(pattern)):
+                    parse(included)
+            elif line:
+                dirs.append(line)
+
+    parse(conf)
+    return [d for d in dict.fromkeys(dirs + DEFAULT_LIB_DIRS)]
+
+
+def resolve_closure(binary: str, lib_dirs: list = None) -> list:
+    """
+    Host paths of `binary`, its dynamic loader and every shared library
+    it needs, directly or transitively.
+    """
+    lib_dirs = system_lib_dirs() if lib_dirs is None else lib_dirs
+    root = read_elf(binary)
+    closure = [binary]
+    if root["interp"]:
+        closure.append(root["interp"])
+
+    seen = set()
+    real = {os.path.realpath(p) for p in closure}
+    queue = [(binary, root)]
+    while queue:
+        path, info = queue.pop(0)
+        origin = os.path.dirname(os.path.realpath(path))
+        # DT_RPATH is ignored when DT_RUNPATH is present
+        search = info["runpath"] or info["rpath"]
+        search = [d.replace("$ORIGIN", origin) for d in search] + lib_dirs
+        for name in info["needed"]:
+            if name in seen:
+                continue
+            seen.add(name)
+            found = _find_library(name, search, root)
+            if found is None:
+                raise FileNotFoundError(f"{path}: cannot find {name}")
+            if os.path.realpath(found[0]) not in real:
+                real.add(os.path.realpath(found[0]))
+                closure.append(found[0])
+            queue.append(found)
+    return closure
+
+
+def _find_library(name: str, search: list, want: dict):
+    candidates = [name] if "/" in name else [
+        os.path.join(d, name) for d in search
+    ]
+    for path in candidates:
+        try:
+            info = read_elf(path)
+        except (OSError, ValueError):
+            continue
+        if info["class"] == want["class"] and \
+                info["machine"] == want["machine"]:
+            return path, info
+    return None
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --------------------------------------------------
+# rootfs builder
+# --------------------------------------------------
+class RootfsBuilder:
+    def __init__(
+        self,
+        cache_dir: str = os.path.join(
+            Config.DEFAULT_CONTAINER_ROOT, "rootfs-cache"
+        ),
+    ):
+        ensure_dir(cache_dir)
+        self.cache_file = os.path.join(cache_dir, "closures.json")
+        self._cache = {"hashes": {}, "closures": {}}
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file) as f:
+                self._cache = json.load(f)
+        self._lib_dirs = None
+
+    def closure(self, binary: str) -> list:
+        """
+        Cached resolve_closure, keyed by the binary's content hash.
+        """
+        digest = self._hash(binary)
+        closures = self._cache["closures"]
+        if digest not in closures:
+            if self._lib_dirs is None:
+                self._lib_dirs = system_lib_dirs()
+            log.info(f"Resolving shared-library closure of {binary}")
+            closures[digest] = resolve_closure(binary, self._lib_dirs)
+            self._save()
+        return closures[digest]
+
+    def build(self, binaries, dest: str) -> int:
+        """
+        Assemble a minimal rootfs in `dest` holding `binaries` and their
+        closures at their host paths. Returns the number of files copied.
+        """
+        for d in ROOTFS_DIRS:
+            ensure_dir(os.path.join(dest, d))
+
+        manifest_path = os.path.join(dest, MANIFEST)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+
+        copied = 0
+        for binary in binaries:
+            for path in self.closure(os.path.abspath(binary)):
+                target = os.path.join(dest, path.lstrip("/"))
+                key = self._stat_key(path)
+                if manifest.get(path) == key and os.path.exists(target):
+                    continue
+                ensure_dir(os.path.dirname(target))
+                shutil.copy2(path, target)
+                manifest[path] = key
+                copied += 1
+
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+        log.info(f"Built rootfs {dest} ({copied} files copied)")
+        return copied
+
+    def _hash(self, path: str) -> str:
+        # Re-hash only when size/mtime/inode changed since last time
+        key = self._stat_key(path)
+        known = self._cache["hashes"].get(path)
+        if known and known[0] == key:
+            return known[1]
+        digest = file_hash(path)
+        self._cache["hashes"][path] = [key, digest]
+        self._save()
+        return digest
+
+    def _stat_key(self, path: str) -> str:
+        st = os.stat(path)
+        return f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+    def _save(self):
+        tmp = self.cache_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._cache, f)
+        os.replace(tmp, self.cache_file)
@@ -34,13 +34,36 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import signal
+import threading
+import time
+import weakref
+from collections import deque
+from config import Config
+from mini_container_runtime.admission import AdmissionController, Ticket, \
+    request_size
+from mini_container_runtime.backend import get_backend, set_backend
+from mini_container_runtime.cgroups import Cgroup, CgroupManager
 from mini_container_runtime.container import Container
-from mini_container_runtime.utils import require_root
+from mini_container_runtime.events import ExitMonitor
+from mini_container_runtime.namespaces import CLONE_NEWNET
+from mini_container_runtime.network import HOST, MODES, NetworkManager
+from mini_container_runtime.nsexec import ExecResult, exec_in
+from mini_container_runtime.output import OutputCollector
+from mini_container_runtime.scheduler import Scheduler, parse_cpulist
+from mini_container_runtime.state import RUNNING, StateStore
+from mini_container_runtime.telemetry import Sampler
+from mini_container_runtime.zygote import ZygotePool
 from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import parse_bytes
 
 
 log = setup_logger("Runtime")
 
+# Runtimes not yet shut down, all of which share the process-wide backend
+_live = weakref.WeakSet()
+_live_lock = threading.Lock()
+
 
 # --------------------------------------------------
 # mini runtime
@@ -50,8 +73,73 @@ class MiniRuntime:
     Entry point for running containers.
     """
 
-    def __init__(self):
-        require_root()
+    def __init__(
+            self,
+            zygote=False,
+            pool_size=Config.ZYGOTE_POOL_SIZE,
+            pool_max_idle=Config.ZYGOTE_MAX_IDLE_SECONDS,
+            pool_refill=True,
+            telemetry=False,
+            trace=Config.TRACE_ENABLED,
+            init=Config.INIT_ENABLED,
+            backend=None,
+            scheduler=False,
+            admission=False,
+            state=False,
+            network=Config.DEFAULT_NETWORK_NAMESPACE,
+            netns_pool=Config.NETNS_POOL_SIZE,
+    ):
+        if network not in MODES:
+            raise ValueError(f"Unknown network mode: {network!r}")
+        # The backend is process-wide: passing one installs it, which is
+        # refused while another runtime still runs on a different one
+        with _live_lock:
+            if backend is not None and backend is not get_backend():
+                if _live:
+                    raise ValueError(
+                        f"Backend {backend.name!r} conflicts with "
+                        f"{get_backend().name!r}, in use by "
+                        f"{len(_live)} other runtime(s)"
+                    )
+                set_backend(backend)
+            self.backend = get_backend()
+            self.backend.require_privileges()
+            _live.add(self)
+        self.trace = trace
+        self.init = init
+        self.containers = {}
+        # Exited containers are forgotten `retention` seconds later
+        self.retention = Config.EXITED_RETENTION
+        self._exited = deque()
+        # launch() and the exit monitor both evict
+        self._lock = threading.Lock()
+        self.cgroups = CgroupManager()
+        self.monitor = ExitMonitor()
+        self.sampler = Sampler() if telemetry else None
+        self.output = None
+        self.scheduler = Scheduler() if scheduler else None
+        self.admission = AdmissionController() if admission else None
+        # container id -> admission ticket holding its reservation
+        self._tickets = {}
+        self.network_mode = network
+        # NetworkManager, created on the first container that needs it
+        self.network = None
+        self._netns_pool = netns_pool
+        self._network_lock = threading.Lock()
+        self.monitor.callbacks.append(self._on_event)
+        # True for the default database, or a path to use another one
+        self.state = None
+        if state:
+            self.state = StateStore() if state is True else StateStore(state)
+            self.adopt()
+        self.pool = None
+        if zygote:
+            self.pool = ZygotePool(
+                size=pool_size,
+                max_idle=pool_max_idle,
+                refill=pool_refill,
+                cgroups=self.cgroups,
+            )
     
     def run_container(
             self,
@@ -60,12 +148,489 @@ class MiniRuntime:
             hostname="mini",
             memory_limit=None,
             cpu_quota=None,
+            overlay=False,
+            **limits,
     ):
+        """
+        Run a container in the foreground. Extra keyword arguments are
+        further cgroup limits (see Container).
+        """
         container = Container(
             command=command,
             rootfs=rootfs,
             hostname=hostname,
             memory_limit=memory_limit,
             cpu_quota=cpu_quota,
+            overlay=overlay,
+            trace=self.trace,
+            init=self.init,
+            **limits,
         )
         container.run()
+
+    def launch(
+            self,
+            command,
+            rootfs,
+            hostname="mini",
+            memory_limit=None,
+            cpu_quota=None,
+            overlay=False,
+            capture=False,
+            cpus=None,
+            exclusive=False,
+            tenant="default",
+            priority=0,
+            network=None,
+            **limits,
+    ) -> Container:
+        """
+        Start a container and return its handle without waiting for it.
+
+        With `capture`, stdout/stderr go to the runtime's output
+        collector instead of the runtime's own stdio (see `logs()`).
+        With the scheduler on, `cpus` (optionally `exclusive`) places
+        the container on a NUMA node and sets its cpuset; without
+        `cpus` it runs on the shared pools of every node.
+        With admission control on, this blocks until the launch fits
+        the host budget; `tenant` and `priority` decide its turn.
+        `network` overrides the runtime's network mode (see network.py).
+        """
+        spec = dict(
+            command=command, rootfs=rootfs, hostname=hostname,
+            memory_limit=memory_limit, cpu_quota=cpu_quota,
+            overlay=overlay, capture=capture, cpus=cpus,
+            exclusive=exclusive, network=network, **limits,
+        )
+        if self.admission is None:
+            return self._launch(**spec)
+        ticket = self.submit(tenant=tenant, priority=priority, **spec)
+        self.monitor.wait_for(lambda: ticket.done)
+        return ticket.result()
+
+    def submit(self, tenant="default", priority=0, **spec) -> Ticket:
+        """
+        Queue a launch with admission control and return its ticket
+        without waiting; `ticket.container` is set once admitted.
+        """
+        if self.admission is None:
+            raise RuntimeError("Admission control is off")
+        self._check_placement(spec.get("cpus"), spec.get("exclusive"))
+        memory, cpus = request_size(
+            spec.get("memory_limit"), spec.get("cpu_quota")
+        )
+        ticket = self.admission.submit(
+            tenant, priority, memory, cpus, dict(spec, tenant=tenant)
+        )
+        self._admit()
+        return ticket
+
+    def _launch(
+            self,
+            command,
+            rootfs,
+            hostname="mini",
+            memory_limit=None,
+            cpu_quota=None,
+            overlay=False,
+            capture=False,
+            cpus=None,
+            exclusive=False,
+            network=None,
+            tenant=None,
+            **limits,
+    ) -> Container:
+        self._check_placement(cpus, exclusive)
+        network = network or self.network_mode
+        container = Container(
+            command=command,
+            rootfs=rootfs,
+            hostname=hostname,
+            memory_limit=memory_limit,
+            cpu_quota=cpu_quota,
+            cgroups=self.cgroups,
+            overlay=overlay,
+            trace=self.trace,
+            init=self.init,
+            **limits,
+        )
+        if self.scheduler is not None:
+            self._place(container, cpus, exclusive)
+            container.reservation.update(cpus=cpus or 0, exclusive=exclusive)
+        if tenant is not None:
+            container.reservation["tenant"] = tenant
+        if capture:
+            if self.output is None:
+                self.output = OutputCollector()
+            self.output.attach(container)
+        # Warm members are pre-chrooted into a plain rootfs, keep the
+        # stdio they were forked with and share the host's network
+        warm = None
+        if self.pool and not overlay and not capture and network == HOST:
+            warm = self.pool.acquire(rootfs)
+        try:
+            if network != HOST:
+                container.netns = self._network().acquire(network)
+                container.namespaces.append(CLONE_NEWNET)
+                if container.netns.address is not None:
+                    container.address = str(container.netns.address)
+            container.start(warm=warm)
+        except Exception:
+            if self.scheduler is not None:
+                self.scheduler.release(container.id)
+                self._apply_placements()
+            raise
+        self._evict()
+        self.containers[container.id] = container
+        if self.state is not None:
+            self.state.started(
+                container, self.backend.start_time(container.pid)
+            )
+        self.monitor.register(container)
+        if self.sampler:
+            self.sampler.watch(container)
+            self.sampler.start()
+        return container
+
+    def run_many(self, specs, wait=False):
+        """
+        Launch a batch of containers, one per keyword-argument dict in
+        `specs`. All containers run concurrently; with `wait=True` the
+        call returns only once every one of them has exited.
+        """
+        containers = [self.launch(**spec) for spec in specs]
+        log.info(f"Launched {len(containers)} containers")
+        if wait:
+            self.wait_all(containers)
+        return containers
+
+    def wait_any(self, containers=None, timeout=None):
+        """
+        Wait until one of `containers` (default: all running ones) exits.
+
+        Returns the exited container, or None on timeout.
+        """
+        pending = self._pending(containers)
+        if not pending:
+            return None
+
+        def exited():
+            return next((c for c in pending if not c.running), None)
+
+        self.monitor.wait_for(lambda: exited() is not None, timeout)
+        return exited()
+
+    def wait_all(self, containers=None, timeout=None):
+        """
+        Wait until every container in `containers` has exited.
+
+        Returns the containers still running when `timeout` expired
+        (an empty list when all of them finished).
+        """
+        pending = self._pending(containers)
+        self.monitor.wait_for(
+            lambda: not any(c.running for c in pending), timeout
+        )
+        return [c for c in pending if c.running]
+
+    def exec(self, container_id: str, command, capture=False,
+             timeout=None) -> ExecResult:
+        """
+        Run `command` inside a running container (its namespaces,
+        cgroup and root) and wait for it; see nsexec.exec_in.
+        """
+        return exec_in(
+            self.containers[container_id], command,
+            capture=capture, timeout=timeout,
+        )
+
+    def ps(self, state=None, labels=None, older_than=None, newer_than=None,
+           limit=None) -> list:
+        """
+        Recorded containers by state ("running"/"exited"), labels and
+        age in seconds, newest first (needs the state store).
+        """
+        if self.state is None:
+            raise RuntimeError("State store is off")
+        return self.state.query(state, labels, older_than, newer_than, limit)
+
+    def adopt(self) -> list:
+        """
+        Re-attach to the containers an earlier runtime left running;
+        the ones that are gone meanwhile are marked exited.
+        """
+        adopted = []
+        for record in self.state.query(state=RUNNING, full=True):
+            cid = record["id"]
+            if cid in self.containers:
+                continue
+            pid = record["pid"]
+            pidfd = None
+            if self.backend.start_time(pid) == record["start_time"]:
+                try:
+                    pidfd = self.backend.pidfd_open(pid)
+                except ProcessLookupError:
+                    pass
+            if pidfd is None:
+                self.state.lost(cid)
+                continue
+            cgroup = Cgroup(record["cgroup"]) if record["cgroup"] else None
+            if record["address"]:
+                self._network().ipam.reserve(record["address"])
+            container = Container.attach(
+                cid, pid, pidfd, record["command"], record["rootfs"],
+                cgroup=cgroup, cgroups=self.cgroups,
+                overlay=record["overlay"], hostname=record["hostname"],
+                labels=record["labels"], limits=record["limits"],
+                created=record["created"], started=record["started"],
+                address=record["address"], init=self.init,
+                reservation=record["reservation"],
+            )
+            self._rebook(container)
+            self.containers[cid] = container
+            self.monitor.register(container)
+            adopted.append(container)
+        if adopted:
+            if self.scheduler is not None:
+                self._apply_placements()
+            log.info(f"Adopted {len(adopted)} running containers")
+        return adopted
+
+    def _rebook(self, container: Container):
+        """
+        Give an adopted container back what it held in the scheduler and
+        the admission budget, rebuilt from its recorded limits.
+        """
+        limits = container.limits
+        memory = limits.get("memory.max", "max")
+        memory = 0 if memory == "max" else int(memory)
+        quota, _, period = limits.get("cpu.max", "max").partition(" ")
+        cpu_quota = 0.0 if quota == "max" else int(quota) / int(period)
+        reservation = container.reservation
+        if self.scheduler is not None and "cpuset.cpus" in limits:
+            cpus = parse_cpulist(limits["cpuset.cpus"])
+            self.scheduler.restore(
+                container.id, cpus,
+                parse_cpulist(limits.get("cpuset.mems", "")),
+                reservation.get("cpus", cpu_quota or len(cpus)),
+                memory, reservation.get("exclusive", False),
+            )
+        if self.admission is not None:
+            self._tickets[container.id] = self.admission.restore(
+                reservation.get("tenant", "default"), memory, cpu_quota
+            )
+
+    def pause(self, container_id: str, timeout: float = 1.0) -> bool:
+        """
+        Freeze a container in place (see Container.pause).
+        """
+        return self.containers[container_id].pause(timeout)
+
+    def resume(self, container_id: str):
+        self.containers[container_id].resume()
+
+    def stop(self, container_id: str, timeout=Config.STOP_TIMEOUT):
+        """
+        SIGTERM the container, kill it if it is still running after
+        `timeout` seconds; returns its exit code once reaped.
+        """
+        container = self.containers[container_id]
+        container.stop(timeout)
+        self.monitor.wait_for(lambda: not container.running)
+        return container.exit_code
+
+    def stop_all(self, containers=None, timeout=Config.STOP_TIMEOUT):
+        """
+        Stop many containers (default: all running ones) at once.
+
+        Every one gets SIGTERM right away and they share one `timeout`.
+        Stragglers are then killed through their own cgroup.kill; the
+        parent slice is shared with other runtimes and is never killed
+        as a whole. Returns the containers that had to be killed.
+        """
+        pending = self._pending(containers)
+        for container in pending:
+            try:
+                if container.paused:
+                    container.resume()
+                container.signal(signal.SIGTERM)
+            except OSError:
+                pass  # exited meanwhile; the monitor reaps it
+        self.monitor.wait_for(
+            lambda: not any(c.running for c in pending), timeout
+        )
+        killed = [c for c in pending if c.running]
+        if killed:
+            for container in killed:
+                try:
+                    container.kill()
+                except OSError:
+                    pass  # exited meanwhile
+            self.monitor.wait_for(
+                lambda: not any(c.running for c in killed)
+            )
+        log.info(f"Stopped {len(pending)} containers "
+                 f"({len(killed)} killed)")
+        return killed
+
+    def logs(self, container_id: str, tail: int = None) -> bytes:
+        """
+        Recent captured output of a container (stdout and stderr
+        merged), optionally the last `tail` lines only. Older output is
+        in the container's log file.
+        """
+        if self.output is None:
+            return b""
+        return self.output.tail(container_id, tail)
+
+    def export_trace(self, container_id: str, path: str, fmt="json"):
+        """
+        Write a traced container's launch spans as "json" or "chrome".
+        """
+        trace = self.containers[container_id].trace
+        if trace is None:
+            raise ValueError(f"Container {container_id} was not traced")
+        trace.export(path, fmt)
+
+    def admission_stats(self) -> dict:
+        """
+        Reserved vs budgeted capacity, queue depth and wait times
+        (empty when admission control is off).
+        """
+        return self.admission.stats() if self.admission else {}
+
+    def network_stats(self) -> dict:
+        """
+        Network namespace pool metrics (empty until one was needed).
+        """
+        return self.network.stats() if self.network else {}
+
+    def pool_stats(self) -> dict:
+        """
+        Zygote pool hit/miss metrics (empty when zygote mode is off).
+        """
+        return self.pool.stats() if self.pool else {}
+
+    def shutdown(self, detach: bool = False):
+        """
+        Stop the runtime's threads and pools. With `detach`, containers
+        still running keep their output pipes and log files.
+        """
+        if self.sampler:
+            self.sampler.stop()
+        if self.pool:
+            self.pool.shutdown()
+        if self.network:
+            self.network.shutdown()
+        self.monitor.close()
+        if self.output:
+            if detach:
+                self.output.detach()
+            else:
+                self.output.close()
+        if self.state is not None:
+            self.state.close()
+        self.cgroups.shutdown()
+        with _live_lock:
+            _live.discard(self)
+
+    def _network(self) -> NetworkManager:
+        with self._network_lock:
+            if self.network is None:
+                self.network = NetworkManager(pool_size=self._netns_pool)
+            return self.network
+
+    def _check_placement(self, cpus, exclusive: bool):
+        if cpus is not None and self.scheduler is None:
+            raise RuntimeError(f"Scheduler is off: cannot place cpus={cpus}")
+        if exclusive and cpus is None:
+            raise ValueError("Exclusive placement needs cpus")
+
+    def _place(self, container: Container, cpus, exclusive: bool):
+        if cpus is None:
+            # Kept off exclusive CPUs, without reserving anything
+            placement = self.scheduler.place_unbound(container.id)
+        else:
+            memory = 0
+            if container.memory_limit is not None:
+                size = parse_bytes(container.memory_limit)
+                memory = 0 if size == "max" else size
+            placement = self.scheduler.place(
+                container.id, cpus=cpus, memory=memory, exclusive=exclusive
+            )
+        container.limits["cpuset.cpus"] = placement.cpuset_cpus
+        container.limits["cpuset.mems"] = placement.cpuset_mems
+        # An exclusive placement shrinks the shared pool of its node(s)
+        self._apply_placements()
+
+    def _on_event(self, kind, container):
+        if kind != "exit":
+            return
+        with self._lock:
+            self._exited.append((time.monotonic(), container.id))
+        self._evict()
+        if self.state is not None:
+            self.state.exited(container)
+        if container.adopted and container.address and self.network:
+            # Not ours to close, but its address is free again
+            self.network.ipam.release(container.address)
+        if self.scheduler is not None and self.scheduler.get(container.id):
+            self.scheduler.release(container.id)
+            self._apply_placements()
+        ticket = self._tickets.pop(container.id, None)
+        if ticket is not None:
+            self.admission.release(ticket)
+            self._admit()
+
+    def _evict(self):
+        """
+        Drop containers that exited more than `retention` seconds ago,
+        with their output tail; state records and log files stay.
+        """
+        cutoff = time.monotonic() - self.retention
+        with self._lock:
+            while self._exited and self._exited[0][0] <= cutoff:
+                _, cid = self._exited.popleft()
+                self.containers.pop(cid, None)
+                if self.output is not None:
+                    self.output.forget(cid)
+
+    def _admit(self):
+        """
+        Launch every queued request that fits the budget now.
+        """
+        while True:
+            tickets = self.admission.admissible()
+            if not tickets:
+                return
+            for ticket in tickets:
+                try:
+                    container = self._launch(**ticket.spec)
+                except Exception as e:
+                    log.error(f"Admitted launch for {ticket.tenant} "
+                              f"failed: {e}")
+                    self.admission.release(ticket)
+                    ticket.finish(error=e)
+                    continue
+                self._tickets[container.id] = ticket
+                ticket.finish(container)
+
+    def _apply_placements(self):
+        """
+        Rewrite the cpusets of running containers whose placement moved.
+        """
+        for cid, placement in self.scheduler.updates().items():
+            container = self.containers.get(cid)
+            if container is None or container.cgroup is None:
+                continue
+            try:
+                container.cgroup.set_cpuset(
+                    placement.cpuset_cpus, placement.cpuset_mems
+                )
+            except OSError as e:
+                log.error(f"Cannot move {cid} to its new cpuset: {e}")
+
+    def _pending(self, containers):
+        if containers is None:
+            containers = list(self.containers.values())
+        return [c for c in containers if c.running]
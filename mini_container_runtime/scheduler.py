@@ -0,0 +1,542 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# scheduler MODULE
+# --------------------------------------------------
+"""
+Topology-aware CPU and memory placement.
+
+The CPU/NUMA layout is read from sysfs once. Containers asking for
+`cpus` (and optionally memory) are bin-packed onto NUMA nodes and get
+matching `cpuset.cpus` / `cpuset.mems`:
+
+- exclusive: whole CPUs (whole cores first) on one node where possible,
+  taken out of the shared pool
+- shared: the node's shared pool, with requests summed against its size
+  (times the overcommit ratio)
+- unbound: no request at all; the shared pools of every node, or the
+  reserved CPUs once exclusive containers hold every other one
+
+When containers come and go the shared pools grow and shrink, and
+shared containers that had to spill across nodes are moved back onto
+a single node once one has room. Nothing is migrated otherwise, so a
+container keeps its cache and memory locality.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import re
+import threading
+from config import Config
+from mini_container_runtime.logger import setup_logger
+
+
+log = setup_logger("Scheduler")
+
+
+class PlacementError(RuntimeError):
+    """
+    No node (or set of nodes) can satisfy the request.
+    """
+
+
+# --------------------------------------------------
+# cpu lists
+# --------------------------------------------------
+def parse_cpulist(text: str) -> list:
+    """
+    "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    """
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return sorted(set(cpus))
+
+
+def format_cpulist(cpus) -> str:
+    """
+    [0, 1, 2, 3, 8] -> "0-3,8"
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(a) if a == b else f"{a}-{b}" for a, b in ranges
+    )
+
+
+# --------------------------------------------------
+# topology
+# --------------------------------------------------
+class NumaNode:
+    def __init__(self, node_id: int, cpus, memory: int, cores=None):
+        self.id = node_id
+        self.cpus = sorted(cpus)
+        self.memory = memory
+        # Hyperthread sibling groups; every CPU its own core if unknown
+        self.cores = cores or [[cpu] for cpu in self.cpus]
+
+
+class Topology:
+    def __init__(self, nodes):
+        self.nodes = {node.id: node for node in nodes}
+
+    @property
+    def cpus(self) -> list:
+        return sorted(c for node in self.nodes.values() for c in node.cpus)
+
+    @classmethod
+    def from_sysfs(cls, root: str = "/sys/devices/system",
+                   meminfo: str = "/proc/meminfo"):
+        """
+        Read nodes, their online CPUs, memory and core siblings.
+        Kernels without NUMA support yield a single node 0.
+        """
+        cpu_dir = os.path.join(root, "cpu")
+        online = set(parse_cpulist(_read(os.path.join(cpu_dir, "online"))))
+        siblings = {}
+        for cpu in online:
+            path = os.path.join(
+                cpu_dir, f"cpu{cpu}", "topology", "thread_siblings_list"
+            )
+            try:
+                group = parse_cpulist(_read(path))
+            except OSError:
+                group = [cpu]
+            siblings[cpu] = [c for c in group if c in online]
+
+        nodes = []
+        node_dir = os.path.join(root, "node")
+        names = os.listdir(node_dir) if os.path.isdir(node_dir) else []
+        for name in sorted(names, key=lambda n: (len(n), n)):
+            if not re.fullmatch(r"node\d+", name):
+                continue
+            path = os.path.join(node_dir, name)
+            cpus = [
+                c for c in parse_cpulist(_read(os.path.join(path, "cpulist")))
+                if c in online
+            ]
+            memory = _mem_total(os.path.join(path, "meminfo"))
+            if cpus:
+                nodes.append(NumaNode(
+                    int(name[4:]), cpus, memory, _cores(cpus, siblings)
+                ))
+        if not nodes:
+            cpus = sorted(online)
+            nodes.append(NumaNode(0, cpus, _mem_total(meminfo),
+                                  _cores(cpus, siblings)))
+        return cls(nodes)
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _mem_total(path: str) -> int:
+    # "Node 0 MemTotal:  4292344 kB" or "MemTotal:  4292344 kB"
+    try:
+        for line in _read(path).splitlines():
+            fields = line.split()
+            if "MemTotal:" in fields:
+                return int(fields[fields.index("MemTotal:") + 1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _cores(cpus, siblings: dict) -> list:
+    cores, seen = [], set()
+    for cpu in cpus:
+        if cpu in seen:
+            continue
+        group = [c for c in siblings.get(cpu, [cpu]) if c in cpus] or [cpu]
+        seen.update(group)
+        cores.append(sorted(group))
+    return cores
+
+
+_topology = None
+
+
+def get_topology() -> Topology:
+    """
+    Host topology, read from sysfs on first use.
+    """
+    global _topology
+    if _topology is None:
+        _topology = Topology.from_sysfs()
+    return _topology
+
+
+# --------------------------------------------------
+# placement
+# --------------------------------------------------
+class Placement:
+    def __init__(self, container_id: str, cpus, mems, exclusive: bool,
+                 cpu_request: float, memory: int):
+        self.container_id = container_id
+        self.cpus = sorted(cpus)
+        self.mems = sorted(mems)
+        self.exclusive = exclusive
+        self.cpu_request = cpu_request
+        self.memory = memory
+        # memory reserved per node id
+        self.reserved = {}
+        # shared, but no single node had room when it was placed
+        self.spilled = False
+
+    @property
+    def cpuset_cpus(self) -> str:
+        return format_cpulist(self.cpus)
+
+    @property
+    def cpuset_mems(self) -> str:
+        return format_cpulist(self.mems)
+
+
+class _NodeState:
+    def __init__(self, node: NumaNode, reserved: set):
+        self.node = node
+        self.free = [c for c in node.cpus if c not in reserved]
+        self.exclusive = set()
+        self.shared_load = 0.0
+        self.memory_free = node.memory
+        self.shared = set()  # ids of shared containers homed here
+
+    def shared_pool(self) -> list:
+        return [c for c in self.free if c not in self.exclusive]
+
+
+# --------------------------------------------------
+# scheduler
+# --------------------------------------------------
+class Scheduler:
+    """
+    Bin-packs containers onto NUMA nodes (see module docstring).
+
+    `place()` and `release()` may change the cpusets of other shared
+    containers; `updates()` hands back every placement that changed so
+    the caller can rewrite those cgroups.
+    """
+
+    def __init__(
+        self,
+        topology: Topology = None,
+        reserved_cpus: str = Config.RESERVED_CPUS,
+        overcommit: float = Config.CPU_OVERCOMMIT,
+    ):
+        self.topology = topology or get_topology()
+        self.overcommit = overcommit
+        reserved = set(parse_cpulist(reserved_cpus))
+        self._reserved = sorted(reserved & set(self.topology.cpus))
+        self._nodes = {
+            nid: _NodeState(node, reserved)
+            for nid, node in self.topology.nodes.items()
+        }
+        self._placements = {}
+        self._spilled = set()
+        self._unbound = set()
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def place(self, container_id: str, cpus: float = 1, memory: int = 0,
+              exclusive: bool = False) -> Placement:
+        if cpus <= 0:
+            raise ValueError(f"Invalid CPU request: {cpus}")
+        if exclusive and cpus != int(cpus):
+            raise ValueError("Exclusive placement needs whole CPUs")
+        with self._lock:
+            if exclusive:
+                placement = self._place_exclusive(container_id, int(cpus),
+                                                  memory)
+                self._refresh(placement.mems)
+            else:
+                placement = self._place_shared(container_id, cpus, memory)
+            self._placements[container_id] = placement
+        log.info(
+            f"Placed {container_id}: cpus={placement.cpuset_cpus} "
+            f"mems={placement.cpuset_mems} exclusive={exclusive}"
+        )
+        return placement
+
+    def place_unbound(self, container_id: str) -> Placement:
+        """
+        Place a container that asked for no CPUs: it shares every
+        node's shared pool and reserves nothing.
+        """
+        with self._lock:
+            cpus = self._anywhere()
+            if not cpus:
+                raise PlacementError("No shared CPUs left to run on")
+            placement = Placement(container_id, cpus, list(self._nodes),
+                                  False, 0.0, 0)
+            self._unbound.add(container_id)
+            self._placements[container_id] = placement
+        return placement
+
+    def restore(self, container_id: str, cpus, mems, cpu_request: float,
+                memory: int = 0, exclusive: bool = False) -> Placement:
+        """
+        Re-register a placement made before a runtime restart, as it
+        was: nothing is moved except shared cpusets catching up.
+        """
+        with self._lock:
+            states = [self._nodes[nid] for nid in mems if nid in self._nodes]
+            placement = Placement(container_id, cpus,
+                                  [s.node.id for s in states], exclusive,
+                                  cpu_request, memory)
+            if exclusive:
+                for state in states:
+                    state.exclusive.update(
+                        c for c in cpus if c in state.node.cpus
+                    )
+            elif not cpu_request:
+                self._unbound.add(container_id)
+            elif len(states) == 1:
+                states[0].shared_load += cpu_request
+                states[0].shared.add(container_id)
+            else:
+                placement.spilled = True
+                self._spilled.add(container_id)
+            self._reserve(placement, states, memory)
+            self._placements[container_id] = placement
+            self._refresh(list(self._nodes))
+        return placement
+
+    def release(self, container_id: str):
+        with self._lock:
+            placement = self._placements.pop(container_id, None)
+            if placement is None:
+                return
+            self._dirty.discard(container_id)
+            for nid, amount in placement.reserved.items():
+                self._nodes[nid].memory_free += amount
+            if placement.exclusive:
+                for nid in placement.mems:
+                    self._nodes[nid].exclusive.difference_update(
+                        placement.cpus
+                    )
+                self._refresh(placement.mems)
+            elif placement.spilled:
+                self._spilled.discard(container_id)
+            elif container_id in self._unbound:
+                self._unbound.discard(container_id)
+            else:
+                state = self._nodes[placement.mems[0]]
+                state.shared_load -= placement.cpu_request
+                state.shared.discard(container_id)
+            self._rehome_spilled()
+
+    def updates(self) -> dict:
+        """
+        Placements changed since the last call, keyed by container id.
+        """
+        with self._lock:
+            changed = {
+                cid: self._placements[cid]
+                for cid in self._dirty if cid in self._placements
+            }
+            self._dirty.clear()
+        return changed
+
+    def get(self, container_id: str) -> Placement:
+        return self._placements.get(container_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nodes": {
+                    nid: {
+                        "cpus": len(state.free),
+                        "exclusive": len(state.exclusive),
+                        "shared_pool": len(state.shared_pool()),
+                        "shared_load": round(state.shared_load, 3),
+                        "memory_free": state.memory_free,
+                    }
+                    for nid, state in self._nodes.items()
+                },
+                "placed": len(self._placements),
+                "spilled": len(self._spilled),
+                "unbound": len(self._unbound),
+            }
+
+    # exclusive
+    def _place_exclusive(self, cid: str, count: int, memory: int):
+        fits = [
+            s for s in self._nodes.values()
+            if self._exclusive_room(s) >= count and s.memory_free >= memory
+        ]
+        if fits:
+            # Best fit: the fullest node that still has room
+            state = min(
+                fits, key=lambda s: (self._exclusive_room(s), s.node.id)
+            )
+            cpus = self._take_cores(state, count)
+            placement = Placement(cid, cpus, [state.node.id], True, count,
+                                  memory)
+            self._reserve(placement, [state], memory)
+            return placement
+
+        # Span the fewest nodes, largest first
+        chosen, cpus = [], []
+        for state in sorted(self._nodes.values(),
+                            key=lambda s: -self._exclusive_room(s)):
+            if len(cpus) >= count:
+                break
+            take = min(count - len(cpus), self._exclusive_room(state))
+            if take > 0:
+                chosen.append(state)
+                cpus.extend(self._take_cores(state, take))
+        if len(cpus) < count or \
+                sum(s.memory_free for s in chosen) < memory:
+            for state in chosen:
+                state.exclusive.difference_update(cpus)
+            raise PlacementError(
+                f"No room for {count} exclusive CPUs and {memory} bytes"
+            )
+        placement = Placement(cid, cpus, [s.node.id for s in chosen], True,
+                              count, memory)
+        self._reserve(placement, chosen, memory)
+        return placement
+
+    def _exclusive_room(self, state: _NodeState) -> int:
+        # Leave enough shared CPUs for the shared containers already here
+        pool = len(state.shared_pool())
+        needed = -(-state.shared_load // self.overcommit)  # ceil
+        if self._unbound and not self._reserved:
+            needed = max(needed, 1)  # and somewhere for unbound ones
+        return max(0, pool - int(needed))
+
+    def _take_cores(self, state: _NodeState, count: int) -> list:
+        free = set(state.shared_pool())
+        taken = []
+        # Whole free cores first, so no sibling is shared with others
+        cores = sorted(state.node.cores,
+                       key=lambda core: not set(core) <= free)
+        for core in cores:
+            for cpu in core:
+                if cpu in free and len(taken) < count:
+                    taken.append(cpu)
+        state.exclusive.update(taken)
+        return taken
+
+    # shared
+    def _place_shared(self, cid: str, cpus: float, memory: int):
+        fits = [
+            s for s in self._nodes.values()
+            if self._shared_room(s) >= cpus and s.memory_free >= memory
+        ]
+        if fits:
+            state = min(fits, key=lambda s: (self._shared_room(s), s.node.id))
+            state.shared_load += cpus
+            state.shared.add(cid)
+            placement = Placement(cid, state.shared_pool(), [state.node.id],
+                                  False, cpus, memory)
+            self._reserve(placement, [state], memory)
+            return placement
+        if sum(s.memory_free for s in self._nodes.values()) < memory:
+            raise PlacementError(f"No room for {memory} bytes of memory")
+        # Spill over every node until one frees up (see _rehome_spilled)
+        log.info(f"Spilling {cid} across all nodes")
+        states = list(self._nodes.values())
+        placement = Placement(
+            cid, [c for s in states for c in s.shared_pool()],
+            [s.node.id for s in states], False, cpus, memory,
+        )
+        placement.spilled = True
+        self._spilled.add(cid)
+        self._reserve(placement, states, memory)
+        return placement
+
+    def _shared_room(self, state: _NodeState) -> float:
+        return len(state.shared_pool()) * self.overcommit - state.shared_load
+
+    def _reserve(self, placement: Placement, states, memory: int):
+        for state in sorted(states, key=lambda s: -s.memory_free):
+            amount = min(memory, state.memory_free)
+            if amount:
+                state.memory_free -= amount
+                placement.reserved[state.node.id] = amount
+                memory -= amount
+
+    def _refresh(self, node_ids):
+        """
+        Shared pools of `node_ids` changed: update who uses them.
+        """
+        for nid in node_ids:
+            pool = self._nodes[nid].shared_pool()
+            for cid in self._nodes[nid].shared:
+                self._set_cpus(self._placements[cid], pool)
+        for cid in self._spilled | self._unbound:
+            self._set_cpus(self._placements[cid], self._anywhere())
+
+    def _anywhere(self) -> list:
+        # An empty cpuset would inherit the parent's, exclusive CPUs too
+        pool = [c for s in self._nodes.values() for c in s.shared_pool()]
+        return pool or self._reserved
+
+    def _set_cpus(self, placement: Placement, cpus):
+        if sorted(cpus) != placement.cpus:
+            placement.cpus = sorted(cpus)
+            self._dirty.add(placement.container_id)
+
+    def _rehome_spilled(self):
+        for cid in list(self._spilled):
+            placement = self._placements[cid]
+            for nid, amount in placement.reserved.items():
+                self._nodes[nid].memory_free += amount
+            fits = [
+                s for s in self._nodes.values()
+                if self._shared_room(s) >= placement.cpu_request
+                and s.memory_free >= placement.memory
+            ]
+            if not fits:
+                for nid, amount in placement.reserved.items():
+                    self._nodes[nid].memory_free -= amount
+                continue
+            state = min(fits, key=lambda s: (self._shared_room(s), s.node.id))
+            state.shared_load += placement.cpu_request
+            state.shared.add(cid)
+            self._spilled.discard(cid)
+            placement.spilled = False
+            placement.mems = [state.node.id]
+            placement.reserved = {}
+            self._reserve(placement, [state], placement.memory)
+            self._set_cpus(placement, state.shared_pool())
+            self._dirty.add(cid)
+            log.info(f"Re-homed {cid} on node {state.node.id}")
@@ -0,0 +1,276 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# state MODULE
+# --------------------------------------------------
+"""
+Persistent container registry.
+
+One SQLite database in WAL mode: every state change is its own small
+transaction, so a crash loses at most the change in flight and readers
+never block the writer. Indexes on state, creation time and labels keep
+`ps`-style queries fast with tens of thousands of rows. Containers
+recorded as running are re-attached by the next runtime (see
+MiniRuntime.adopt).
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import ensure_dir
+
+
+log = setup_logger("State")
+
+RUNNING = "running"
+EXITED = "exited"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    id          TEXT PRIMARY KEY,
+    state       TEXT NOT NULL,
+    pid         INTEGER,
+    start_time  INTEGER,
+    command     TEXT NOT NULL,
+    rootfs      TEXT NOT NULL,
+    hostname    TEXT,
+    overlay     INTEGER NOT NULL DEFAULT 0,
+    cgroup      TEXT,
+    limits      TEXT NOT NULL DEFAULT '{}',
+    labels      TEXT NOT NULL DEFAULT '{}',
+    created     REAL NOT NULL,
+    started     REAL,
+    finished    REAL,
+    exit_code   INTEGER,
+    address     TEXT,
+    reservation TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS containers_state
+    ON containers (state, created);
+CREATE INDEX IF NOT EXISTS containers_created ON containers (created);
+CREATE TABLE IF NOT EXISTS labels (
+    container_id TEXT NOT NULL
+        REFERENCES containers (id) ON DELETE CASCADE,
+    key          TEXT NOT NULL,
+    value        TEXT NOT NULL,
+    PRIMARY KEY (container_id, key)
+);
+CREATE INDEX IF NOT EXISTS labels_key_value
+    ON labels (key, value, container_id);
+"""
+
+_JSON_FIELDS = ("command", "rootfs", "limits", "labels", "reservation")
+
+# What `ps` shows; query(full=True) adds command, rootfs, limits, ...
+_SUMMARY = ("id", "state", "pid", "hostname", "address", "labels",
+            "created", "started", "finished", "exit_code")
+
+
+# --------------------------------------------------
+# state store
+# --------------------------------------------------
+class StateStore:
+    def __init__(self, path: str = Config.STATE_DB):
+        self.path = path
+        if path != ":memory:":
+            ensure_dir(os.path.dirname(os.path.abspath(path)))
+        # Autocommit; writes from the exit-monitor thread share it
+        self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(_SCHEMA)
+        columns = [row[1] for row in
+                   self._db.execute("PRAGMA table_info(containers)")]
+        if "address" not in columns:  # database from before networking
+            self._db.execute("ALTER TABLE containers ADD COLUMN address TEXT")
+        if "reservation" not in columns:
+            self._db.execute("ALTER TABLE containers ADD COLUMN reservation"
+                             " TEXT NOT NULL DEFAULT '{}'")
+        self._lock = threading.Lock()
+
+    def started(self, container, start_time: int = None):
+        """
+        Record a container that is now running. `start_time` (see
+        KernelBackend.start_time) lets a later runtime spot PID reuse.
+        """
+        self.started_many([(container, start_time)])
+
+    def started_many(self, entries):
+        """
+        Record many (container, start_time) pairs in one transaction.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for container, start_time in entries:
+                    self._write_started(container, start_time)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _write_started(self, container, start_time):
+        cgroup = container.cgroup.name if container.cgroup else None
+        self._db.execute(
+            "INSERT OR REPLACE INTO containers (id, state, pid,"
+            " start_time, command, rootfs, hostname, overlay, cgroup,"
+            " limits, labels, created, started, address, reservation)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                container.id, RUNNING, container.pid, start_time,
+                json.dumps(list(container.command)),
+                json.dumps(container.rootfs), container.hostname,
+                container.overlay is not None, cgroup,
+                json.dumps(container.limits), json.dumps(container.labels),
+                container.created, container.started, container.address,
+                json.dumps(container.reservation),
+            ),
+        )
+        self._db.execute(
+            "DELETE FROM labels WHERE container_id = ?", (container.id,)
+        )
+        self._db.executemany(
+            "INSERT INTO labels (container_id, key, value) VALUES (?, ?, ?)",
+            [(container.id, str(k), str(v))
+             for k, v in container.labels.items()],
+        )
+
+    def exited(self, container):
+        with self._lock:
+            self._db.execute(
+                "UPDATE containers SET state = ?, finished = ?,"
+                " exit_code = ? WHERE id = ?",
+                (EXITED, time.time(), container.exit_code, container.id),
+            )
+
+    def lost(self, container_id: str):
+        """
+        A running container that vanished while no runtime watched it.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE containers SET state = ?, finished = ?"
+                " WHERE id = ?",
+                (EXITED, time.time(), container_id),
+            )
+
+    def remove(self, container_id: str):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM containers WHERE id = ?", (container_id,)
+            )
+
+    def get(self, container_id: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM containers WHERE id = ?", (container_id,)
+            ).fetchone()
+        return _record(row) if row else None
+
+    def query(self, state: str = None, labels: dict = None,
+              older_than: float = None, newer_than: float = None,
+              limit: int = None, full: bool = False) -> list:
+        """
+        Containers matching every given filter, newest first. Ages are
+        seconds since creation; `labels` must all match. Only the
+        summary columns are returned unless `full` is set.
+        """
+        where, args = [], []
+        if state is not None:
+            where.append("state = ?")
+            args.append(state)
+        now = time.time()
+        if older_than is not None:
+            where.append("created <= ?")
+            args.append(now - older_than)
+        if newer_than is not None:
+            where.append("created >= ?")
+            args.append(now - newer_than)
+        for key, value in (labels or {}).items():
+            where.append(
+                "id IN (SELECT container_id FROM labels"
+                " WHERE key = ? AND value = ?)"
+            )
+            args += [str(key), str(value)]
+        columns = "*" if full else ", ".join(_SUMMARY)
+        sql = f"SELECT {columns} FROM containers"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [_record(row) for row in rows]
+
+    def count(self, state: str = None) -> int:
+        sql, args = "SELECT COUNT(*) FROM containers", ()
+        if state is not None:
+            sql, args = sql + " WHERE state = ?", (state,)
+        with self._lock:
+            return self._db.execute(sql, args).fetchone()[0]
+
+    def prune(self, older_than: float) -> int:
+        """
+        Forget exited containers that finished `older_than` seconds ago.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM containers WHERE state = ? AND finished <= ?",
+                (EXITED, time.time() - older_than),
+            )
+        if cursor.rowcount:
+            log.info(f"Pruned {cursor.rowcount} exited containers")
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _record(row: sqlite3.Row) -> dict:
+    record = dict(row)
+    for field in _JSON_FIELDS:
+        if field in record:
+            record[field] = json.loads(record[field])
+    if "overlay" in record:
+        record["overlay"] = bool(record["overlay"])
+    return record
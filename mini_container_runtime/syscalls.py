@@ -0,0 +1,257 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# syscalls MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import ctypes
+import errno
+import os
+import platform
+import signal
+
+
+# Generic syscall numbers (shared by x86_64 and aarch64 for new syscalls)
+SYS_clone3 = 435
+
+# pivot_root has no glibc wrapper and an arch-specific number
+SYS_pivot_root = {
+    "x86_64": 155,
+    "aarch64": 41,
+}.get(platform.machine())
+
+# Raw clone, for a fork-like call with namespace flags
+SYS_clone = {
+    "x86_64": 56,
+    "aarch64": 220,
+}.get(platform.machine())
+
+# clone3() flags
+CLONE_PIDFD         = 0x00001000
+CLONE_PARENT        = 0x00008000
+CLONE_INTO_CGROUP   = 0x200000000
+
+# unshare()/setns() namespace types
+CLONE_NEWNET        = 0x40000000
+
+# mount() flags
+MS_RDONLY   = 0x1
+MS_NOSUID   = 0x2
+MS_NODEV    = 0x4
+MS_NOEXEC   = 0x8
+MS_REMOUNT  = 0x20
+MS_BIND     = 0x1000
+MS_MOVE     = 0x2000
+MS_REC      = 0x4000
+MS_PRIVATE  = 0x40000
+MS_SLAVE    = 0x80000
+
+# inotify
+IN_MODIFY   = 0x00000002
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC  = os.O_CLOEXEC
+
+# umount2() flags
+MNT_FORCE   = 0x1
+MNT_DETACH  = 0x2
+
+# prctl() options
+PR_SET_CHILD_SUBREAPER = 36
+
+# CDLL drops the GIL around the call; PyDLL keeps it held, which clone3
+# needs so the child starts with a consistent interpreter state.
+_libc = ctypes.CDLL(None, use_errno=True)
+_pylibc = ctypes.PyDLL(None, use_errno=True)
+_libc.syscall.restype = ctypes.c_long
+_pylibc.syscall.restype = ctypes.c_long
+
+
+def _check(ret: int, *paths):
+    """
+    Map a failed libc return value to the matching OSError subclass
+    (PermissionError, FileNotFoundError, ...) using errno.
+    """
+    if ret < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), *paths[:1])
+    return ret
+
+
+def _path(p):
+    return None if p is None else os.fsencode(p)
+
+
+def unshare(flags: int):
+    _check(_libc.unshare(ctypes.c_int(flags)))
+
+
+def setns(fd: int, nstype: int = 0):
+    """
+    Join the namespace referred to by `fd`. With a pidfd, `nstype` may
+    combine several CLONE_NEW* flags to join them all at once.
+    """
+    _check(_libc.setns(ctypes.c_int(fd), ctypes.c_int(nstype)))
+
+
+def set_child_subreaper(enabled: bool = True):
+    """
+    Have orphaned descendants reparented to (and reaped by) us.
+    """
+    _check(_libc.prctl(ctypes.c_int(PR_SET_CHILD_SUBREAPER),
+                       ctypes.c_ulong(int(enabled)), ctypes.c_ulong(0),
+                       ctypes.c_ulong(0), ctypes.c_ulong(0)))
+
+
+def sethostname(hostname: str):
+    name = hostname.encode()
+    _check(_libc.sethostname(name, ctypes.c_size_t(len(name))))
+
+
+def mount(source, target, fstype=None, flags: int = 0, data=None):
+    _check(_libc.mount(
+        _path(source),
+        _path(target),
+        None if fstype is None else fstype.encode(),
+        ctypes.c_ulong(flags),
+        None if data is None else data.encode(),
+    ), target)
+
+
+def umount2(target, flags: int = 0):
+    _check(_libc.umount2(_path(target), ctypes.c_int(flags)), target)
+
+
+def pivot_root(new_root, put_old):
+    if SYS_pivot_root is None:
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+    _check(_libc.syscall(
+        ctypes.c_long(SYS_pivot_root), _path(new_root), _path(put_old),
+    ), new_root)
+
+
+class CloneArgs(ctypes.Structure):
+    """
+    struct clone_args (CLONE_ARGS_SIZE_VER2)
+    """
+    _fields_ = [
+        ("flags", ctypes.c_uint64),
+        ("pidfd", ctypes.c_uint64),
+        ("child_tid", ctypes.c_uint64),
+        ("parent_tid", ctypes.c_uint64),
+        ("exit_signal", ctypes.c_uint64),
+        ("stack", ctypes.c_uint64),
+        ("stack_size", ctypes.c_uint64),
+        ("tls", ctypes.c_uint64),
+        ("set_tid", ctypes.c_uint64),
+        ("set_tid_size", ctypes.c_uint64),
+        ("cgroup", ctypes.c_uint64),
+    ]
+
+
+def inotify_init1(flags: int = IN_NONBLOCK | IN_CLOEXEC) -> int:
+    return _check(_libc.inotify_init1(ctypes.c_int(flags)))
+
+
+def inotify_add_watch(fd: int, path, mask: int) -> int:
+    return _check(_libc.inotify_add_watch(
+        ctypes.c_int(fd), _path(path), ctypes.c_uint32(mask),
+    ), path)
+
+
+def inotify_rm_watch(fd: int, wd: int):
+    _check(_libc.inotify_rm_watch(ctypes.c_int(fd), ctypes.c_int(wd)))
+
+
+def clone3(flags: int, cgroup_fd: int = None):
+    """
+    Fork via clone3(2), always requesting a pidfd for the child.
+
+    With `cgroup_fd` the child is created directly inside that cgroup
+    (CLONE_INTO_CGROUP). Returns (pid, pidfd) in the parent and
+    (0, None) in the child, like os.fork().
+
+    Unlike fork(3) this bypasses libc's atfork handlers, so it is only
+    safe while the process is single-threaded (see clone_safe()).
+    """
+    pidfd = ctypes.c_int(-1)
+    args = CloneArgs(
+        flags=flags | CLONE_PIDFD,
+        pidfd=ctypes.addressof(pidfd),
+        # CLONE_PARENT children signal our parent as we would
+        exit_signal=0 if flags & CLONE_PARENT else signal.SIGCHLD,
+    )
+    if cgroup_fd is not None:
+        args.flags |= CLONE_INTO_CGROUP
+        args.cgroup = cgroup_fd
+
+    ctypes.pythonapi.PyOS_BeforeFork()
+    pid = _pylibc.syscall(
+        ctypes.c_long(SYS_clone3),
+        ctypes.byref(args),
+        ctypes.c_size_t(ctypes.sizeof(args)),
+    )
+    if pid == 0:
+        ctypes.pythonapi.PyOS_AfterFork_Child()
+        return 0, None
+
+    err = ctypes.get_errno()
+    ctypes.pythonapi.PyOS_AfterFork_Parent()
+    if pid < 0:
+        raise OSError(err, os.strerror(err))
+    return pid, pidfd.value
+
+
+def clone(flags: int) -> int:
+    """
+    Fork via the legacy clone(2), for kernels or seccomp profiles
+    without clone3. Returns the pid in the parent and 0 in the child,
+    like os.fork(); the same single-thread caveat as clone3() applies.
+    """
+    if SYS_clone is None:
+        raise OSError(errno.ENOSYS, "clone: unknown syscall number")
+    ctypes.pythonapi.PyOS_BeforeFork()
+    # No new stack: the child runs on a copy of ours, as after fork()
+    pid = _pylibc.syscall(
+        ctypes.c_long(SYS_clone), ctypes.c_ulong(flags | signal.SIGCHLD),
+        ctypes.c_ulong(0), ctypes.c_ulong(0), ctypes.c_ulong(0),
+        ctypes.c_ulong(0),
+    )
+    if pid == 0:
+        ctypes.pythonapi.PyOS_AfterFork_Child()
+        return 0
+
+    err = ctypes.get_errno()
+    ctypes.pythonapi.PyOS_AfterFork_Parent()
+    if pid < 0:
+        raise OSError(err, os.strerror(err))
+    return pid
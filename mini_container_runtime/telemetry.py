@@ -0,0 +1,320 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# telemetry MODULE
+# --------------------------------------------------
+"""
+Per-container resource telemetry.
+
+One sampler thread reads the cgroup stat and pressure files of every
+watched container each `Config.HEARTBEAT_INTERVAL` seconds. Files are
+opened once per container and re-read with pread, and samples are fanned
+out to any number of subscribers (plain generators or asyncio).
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import asyncio
+import queue
+import threading
+import time
+from config import Config
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import raise_nofile_limit
+
+
+log = setup_logger("Telemetry")
+
+STAT_FILES = (
+    "memory.current",
+    "memory.peak",
+    "cpu.stat",
+    "pids.current",
+    "io.stat",
+    "cpu.pressure",
+    "memory.pressure",
+    "io.pressure",
+)
+
+
+# --------------------------------------------------
+# parsing
+# --------------------------------------------------
+def _number(value: str):
+    return None if value == "max" else int(value)
+
+
+def parse(filename: str, text: str):
+    """
+    Turn the contents of a cgroup file into Python values.
+    """
+    text = text.strip()
+    if filename.endswith(".pressure"):
+        # some avg10=0.00 avg60=0.00 avg300=0.00 total=0
+        return {
+            kind: {k: float(v) for k, v in (f.split("=") for f in fields)}
+            for kind, *fields in (line.split() for line in text.splitlines())
+        }
+    if filename == "io.stat":
+        # 8:0 rbytes=1 wbytes=2 rios=3 wios=4 dbytes=0 dios=0
+        return {
+            dev: {k: int(v) for k, v in (f.split("=") for f in fields)}
+            for dev, *fields in (line.split() for line in text.splitlines())
+        }
+    if filename.endswith(".stat"):
+        return {
+            k: int(v) for k, v in (line.split() for line in text.splitlines())
+        }
+    return _number(text)
+
+
+def since(current, baseline):
+    """
+    Subtract a baseline from a parsed cumulative counter, field by field.
+    """
+    if isinstance(current, dict):
+        baseline = baseline if isinstance(baseline, dict) else {}
+        return {k: since(v, baseline.get(k, 0)) for k, v in current.items()}
+    return current - baseline
+
+
+# --------------------------------------------------
+# sampler
+# --------------------------------------------------
+class Sampler:
+    """
+    Streams resource samples for every watched container.
+
+    Each sample is a dict with the container id, a monotonic timestamp
+    and one parsed entry per available stat file. On a reused cgroup the
+    counters are relative to its reset baseline, and memory.peak falls
+    back to the highest memory.current seen while the kernel peak is
+    still the previous container's.
+    """
+
+    def __init__(self, interval: float = Config.HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self._watched = {}
+        # Unwatched, but their fds may be mid-read: closed between rounds
+        self._retired = []
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        raise_nofile_limit()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            for container_id in list(self._watched):
+                self._retire(container_id)
+            self._close_retired()
+            sinks = list(self._sinks)
+        for sink in sinks:
+            sink(None)
+
+    def watch(self, container):
+        """
+        Start sampling a running container's cgroup.
+        """
+        cgroup = container.cgroup
+        if cgroup is None:
+            return
+        fds = {}
+        for filename in STAT_FILES:
+            try:
+                fds[filename] = cgroup.backend.stat_open(
+                    cgroup.fileno(), filename
+                )
+            except OSError:
+                continue  # controller not enabled for this cgroup
+        baseline = {}
+        for filename, text in cgroup.baseline.items():
+            try:
+                baseline[filename] = parse(filename, text)
+            except ValueError:
+                continue
+        with self._lock:
+            self._watched[container.id] = (
+                container, fds, cgroup.backend, baseline
+            )
+
+    def unwatch(self, container_id: str):
+        with self._lock:
+            self._retire(container_id)
+            if self._thread is None:
+                self._close_retired()
+
+    def sample(self, container, fds: dict, backend, baseline=None) -> dict:
+        baseline = {} if baseline is None else baseline
+        sample = {"container": container.id, "time": time.monotonic()}
+        for filename, fd in fds.items():
+            try:
+                value = parse(filename, backend.stat_read(fd))
+                if filename in baseline and filename != "memory.peak":
+                    value = since(value, baseline[filename])
+                sample[filename] = value
+            except (OSError, ValueError, TypeError):
+                sample[filename] = None
+        peak = sample.get("memory.peak")
+        if peak is not None and peak <= baseline.get("memory.peak", -1):
+            # Not ours yet: the highest usage seen is the best estimate
+            current = sample.get("memory.current") or 0
+            seen = max(baseline.get("seen", 0), current)
+            sample["memory.peak"] = baseline["seen"] = seen
+        return sample
+
+    def subscribe(self, maxsize: int = 1024):
+        """
+        Return a generator of samples. When the consumer falls behind
+        the oldest queued samples are dropped, never the sampler.
+        """
+        q = queue.Queue(maxsize)
+
+        def sink(sample):
+            while True:
+                try:
+                    q.put_nowait(sample)
+                    return
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+        self._add_sink(sink)
+
+        def samples():
+            try:
+                while True:
+                    sample = q.get()
+                    if sample is None:
+                        return
+                    yield sample
+            finally:
+                self._remove_sink(sink)
+
+        return samples()
+
+    async def stream(self, maxsize: int = 1024):
+        """
+        Async generator of samples for use inside an asyncio loop.
+        """
+        loop = asyncio.get_running_loop()
+        q = asyncio.Queue(maxsize)
+
+        def offer(sample):
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(sample)
+
+        def sink(sample):
+            try:
+                loop.call_soon_threadsafe(offer, sample)
+            except RuntimeError:
+                pass  # loop already closed
+
+        self._add_sink(sink)
+        try:
+            while True:
+                sample = await q.get()
+                if sample is None:
+                    return
+                yield sample
+        finally:
+            self._remove_sink(sink)
+
+    def _add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def _remove_sink(self, sink):
+        with self._lock:
+            if sink in self._sinks:
+                self._sinks.remove(sink)
+
+    def _retire(self, container_id: str):
+        entry = self._watched.pop(container_id, None)
+        if entry is not None:
+            self._retired.append(entry)
+
+    def _close_retired(self):
+        for _, fds, backend, _ in self._retired:
+            for fd in fds.values():
+                backend.stat_close(fd)
+        self._retired.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            # Read without the lock so watch() and unwatch() never wait
+            # on a round; only this thread closes what it may be reading
+            with self._lock:
+                self._close_retired()
+                watched = list(self._watched.values())
+                sinks = list(self._sinks)
+
+            samples = []
+            exited = []
+            for container, fds, backend, baseline in watched:
+                if not container.running:
+                    exited.append(container.id)
+                    continue
+                sample = self.sample(container, fds, backend, baseline)
+                # The cgroup is released only after the exit is
+                # recorded, so still running means the read was ours.
+                if not container.running:
+                    exited.append(container.id)
+                    continue
+                samples.append(sample)
+            if exited:
+                with self._lock:
+                    for container_id in exited:
+                        self._retire(container_id)
+                    self._close_retired()
+
+            for sample in samples:
+                for sink in sinks:
+                    sink(sample)
+
+            elapsed = time.monotonic() - started
+            self._stop.wait(max(0.0, self.interval - elapsed))
@@ -0,0 +1,229 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# tracing MODULE
+# --------------------------------------------------
+"""
+Phase-level launch tracing.
+
+A Trace collects monotonic-clock spans for one container. While a trace
+is active on the current thread, `span()` blocks and `@traced` functions
+record into it; otherwise they cost one attribute lookup and return a
+shared no-op. The container child records its own spans (hostname,
+rootfs, ...) and sends them to the parent over a close-on-exec pipe just
+before exec; the pipe reaching EOF marks the end of the exec span.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+
+_local = threading.local()
+
+
+# --------------------------------------------------
+# trace
+# --------------------------------------------------
+class Trace:
+    def __init__(self, container_id: str):
+        self.container_id = container_id
+        self.spans = []
+        self._fork_index = None
+        self._r = None
+        self._w = None
+
+    def record(self, name: str, start_ns: int, end_ns: int, **args):
+        self.spans.append({
+            "name": name,
+            "start_ns": start_ns,
+            "end_ns": end_ns,
+            "pid": os.getpid(),
+            "args": args,
+        })
+
+    def open_channel(self):
+        """
+        Parent, before spawning: create the pipe the child reports on.
+        """
+        self._r, self._w = os.pipe2(os.O_CLOEXEC)
+        self._fork_index = len(self.spans)
+
+    def send(self):
+        """
+        Child, at exec (after the workload's spawn under init): ship
+        the spans recorded since fork.
+        """
+        if self._w is None:
+            return
+        self.record("exec", time.monotonic_ns(), None)
+        data = json.dumps(self.spans[self._fork_index:]).encode() + b"\n"
+        while data:
+            data = data[os.write(self._w, data):]
+
+    def collect(self, pid: int):
+        """
+        Parent: read the child's spans and wait for its exec (or exit).
+
+        Child spans are re-labelled with the host `pid`, since inside
+        its PID namespace the child sees itself as PID 1.
+        """
+        if self._r is None:
+            return
+        os.close(self._w)
+        chunks = []
+        while True:
+            chunk = os.read(self._r, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        eof_ns = time.monotonic_ns()
+        os.close(self._r)
+        self._r = self._w = None
+
+        data = b"".join(chunks)
+        if not data:
+            return  # child failed before exec
+        for span in json.loads(data):
+            span["pid"] = pid
+            if span["end_ns"] is None:
+                span["end_ns"] = eof_ns
+            self.spans.append(span)
+
+    def close(self):
+        """
+        Parent: drop the channel of a child that was never spawned.
+        """
+        for fd in (self._r, self._w):
+            if fd is not None:
+                os.close(fd)
+        self._r = self._w = None
+
+    def to_json(self) -> dict:
+        spans = sorted(self.spans, key=lambda s: s["start_ns"])
+        return {"container": self.container_id, "spans": spans}
+
+    def to_chrome(self) -> dict:
+        """
+        Chrome trace-event format (chrome://tracing, Perfetto).
+        """
+        events = [
+            {
+                "name": span["name"],
+                "ph": "X",
+                "ts": span["start_ns"] / 1000,
+                "dur": (span["end_ns"] - span["start_ns"]) / 1000,
+                "pid": span["pid"],
+                "tid": span["pid"],
+                "args": dict(span["args"], container=self.container_id),
+            }
+            for span in sorted(self.spans, key=lambda s: s["start_ns"])
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str, fmt: str = "json"):
+        if fmt not in ("json", "chrome"):
+            raise ValueError(f"Unknown trace format: {fmt}")
+        data = self.to_chrome() if fmt == "chrome" else self.to_json()
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+# --------------------------------------------------
+# spans
+# --------------------------------------------------
+class _Span:
+    __slots__ = ("trace", "name", "args", "start_ns")
+
+    def __init__(self, trace: Trace, name: str, args: dict):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.monotonic_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.record(
+            self.name, self.start_ns, time.monotonic_ns(), **self.args
+        )
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+
+def current() -> Trace:
+    return getattr(_local, "trace", None)
+
+
+def span(name: str, **args):
+    """
+    Context manager timing a block into the active trace, if any.
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, args)
+
+
+def traced(name: str):
+    """
+    Decorator: time every call of the function as span `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = getattr(_local, "trace", None)
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def activate(trace: Trace):
+    """
+    Make `trace` the active trace of this thread (None disables).
+    """
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
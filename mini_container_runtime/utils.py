@@ -35,6 +35,9 @@
 # imports
 # --------------------------------------------------
 import os
+import resource
+import stat
+import uuid
 
 
 def ensure_dir(path: str):
@@ -47,3 +50,103 @@ def require_root():
         raise PermissionError(
             "Mini Container Runtime must be run as root"
         )
+
+
+def generate_id() -> str:
+    """
+    Short unique container ID (first 12 hex chars of a UUID4).
+    """
+    return uuid.uuid4().hex[:12]
+
+
+def raise_nofile_limit():
+    """
+    Lift the soft RLIMIT_NOFILE to the hard limit; tracking many
+    containers keeps several fds open per container.
+    """
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    # An unlimited hard limit is refused above fs.nr_open
+    target = hard
+    try:
+        with open("/proc/sys/fs/nr_open") as f:
+            nr_open = int(f.read())
+        if target == resource.RLIM_INFINITY or target > nr_open:
+            target = nr_open
+    except (OSError, ValueError):
+        if target == resource.RLIM_INFINITY:
+            return
+    if soft == resource.RLIM_INFINITY or soft >= target:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (OSError, ValueError):
+        pass  # best effort: keep the current limit
+
+
+_SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_bytes(value):
+    """
+    Size such as 4096, "512M", "1.5G" or "2GiB" in bytes; "max" is
+    returned unchanged. Units are binary (K = 1024).
+    """
+    if isinstance(value, int):
+        if value < 0:
+            raise ValueError(f"Invalid size: {value!r}")
+        return value
+    text = str(value).strip().upper()
+    if text == "MAX":
+        return "max"
+    text = text.removesuffix("IB").removesuffix("B")
+    scale = 1
+    if text[-1:] in _SIZE_UNITS:
+        text, scale = text[:-1], _SIZE_UNITS[text[-1]]
+    try:
+        size = float(text)
+    except ValueError:
+        raise ValueError(f"Invalid size: {value!r}") from None
+    if size < 0:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(size * scale)
+
+
+def parse_cpu(value, period: int = 100000):
+    """
+    CPU limit as a cpu.max quota for `period`: "50%" of one CPU or a
+    number of CPUs, given as a number or a string alike (2, 0.5, "1.5").
+    "max" is returned unchanged.
+    """
+    text = str(value).strip().lower()
+    if text == "max":
+        return "max"
+    try:
+        if text.endswith("%"):
+            quota = float(text[:-1]) / 100 * period
+        else:
+            quota = float(text) * period
+    except ValueError:
+        raise ValueError(f"Invalid CPU limit: {value!r}") from None
+    # The kernel rejects quotas below 1ms
+    if quota < 1000:
+        raise ValueError(f"CPU limit too small: {value!r}")
+    return int(quota)
+
+
+def block_device(device) -> str:
+    """
+    "major:minor" of the whole disk behind `device`, which may already
+    be "8:0", a block device node ("/dev/sda1") or any path on the
+    filesystem to throttle. Partitions resolve to their disk, since
+    the io controller only accepts whole devices.
+    """
+    if isinstance(device, str) and ":" in device and not device.startswith("/"):
+        return device
+    st = os.stat(device)
+    dev = st.st_rdev if stat.S_ISBLK(st.st_mode) else st.st_dev
+    numbers = f"{os.major(dev)}:{os.minor(dev)}"
+    sys_dev = f"/sys/dev/block/{numbers}"
+    if os.path.exists(os.path.join(sys_dev, "partition")):
+        with open(os.path.join(os.path.realpath(sys_dev), "..", "dev")) as f:
+            numbers = f.read().strip()
+    return numbers
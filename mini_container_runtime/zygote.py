@@ -0,0 +1,307 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# zygote MODULE
+# --------------------------------------------------
+"""
+Warm pool of pre-isolated container init processes ("zygote mode").
+
+Each pool member is spawned ahead of time into its own namespaces and
+`mini_*` cgroup, with its rootfs already mounted and chrooted. It then
+sits blocked on a pipe; launching a container only has to write the
+command down that pipe, after which the member sets the hostname and
+execs it.
+"""
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import collections
+import json
+import os
+import select
+import signal
+import struct
+import threading
+import time
+from config import Config
+from mini_container_runtime import namespaces
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.cgroups import CgroupManager
+from mini_container_runtime.filesystem import setup_rootfs
+from mini_container_runtime.init import run_as_init
+from mini_container_runtime.logger import setup_logger
+from mini_container_runtime.utils import generate_id
+
+
+log = setup_logger("Zygote")
+
+_HEADER = struct.Struct("!I")
+
+
+# --------------------------------------------------
+# warm member
+# --------------------------------------------------
+class WarmMember:
+    """
+    A paused, pre-isolated init process waiting for a command.
+    """
+
+    def __init__(self, rootfs: str, write_fds, cgroups):
+        self.id = generate_id()
+        self.rootfs = rootfs
+        self.cgroups = cgroups
+        self.cgroup = cgroups.acquire()
+        self.created = time.monotonic()
+
+        cmd_r, self.cmd_w = os.pipe()
+        write_fds.add(self.cmd_w)
+        try:
+            self.pid, self.pidfd = namespaces.spawn([
+                namespaces.CLONE_NEWNS,
+                namespaces.CLONE_NEWPID,
+                namespaces.CLONE_NEWUTS,
+            ], cgroup_fd=self.cgroup.fileno())
+        except BaseException:
+            write_fds.discard(self.cmd_w)
+            os.close(cmd_r)
+            os.close(self.cmd_w)
+            cgroups.release(self.cgroup)
+            raise
+
+        if self.pid == 0:
+            # Child: drop every pool write end so no member keeps another
+            # alive, then park until a command arrives.
+            _member_main(rootfs, cmd_r, write_fds)
+
+        os.close(cmd_r)
+
+    def handoff(self, command, hostname: str, init: bool = False):
+        """
+        Send the command to the member, which execs it immediately
+        (or, with `init`, runs it under a minimal init).
+
+        BrokenPipeError if the member has died; it is left to kill().
+        """
+        if self.exited():
+            raise BrokenPipeError(f"Warm member {self.id} has exited")
+        payload = json.dumps({
+            "command": list(command),
+            "hostname": hostname,
+            "init": init,
+        }).encode()
+        os.write(self.cmd_w, _HEADER.pack(len(payload)) + payload)
+        os.close(self.cmd_w)
+
+    def exited(self) -> bool:
+        poller = select.poll()
+        poller.register(self.pidfd, select.POLLIN)
+        return bool(poller.poll(0))
+
+    def kill(self):
+        backend = get_backend()
+        backend.kill(self.pid, signal.SIGKILL)
+        backend.wait(self.pid, 0)
+        os.close(self.pidfd)
+        os.close(self.cmd_w)
+        self.cgroups.release(self.cgroup)
+
+
+def _read_exact(fd: int, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = os.read(fd, size - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def _member_main(rootfs: str, cmd_r: int, write_fds):
+    try:
+        for fd in write_fds:
+            os.close(fd)
+        setup_rootfs(rootfs)
+
+        header = _read_exact(cmd_r, _HEADER.size)
+        if len(header) < _HEADER.size:
+            os._exit(0)
+        (size,) = _HEADER.unpack(header)
+        msg = json.loads(_read_exact(cmd_r, size))
+
+        namespaces.set_hostname(msg["hostname"])
+        log.info(f"Executing command: {msg['command']}")
+        if msg.get("init"):
+            run_as_init(msg["command"])
+        os.execvp(msg["command"][0], msg["command"])
+    except Exception as e:
+        log.error(f"Warm member failed: {e}")
+    finally:
+        os._exit(127)
+
+
+# --------------------------------------------------
+# zygote pool
+# --------------------------------------------------
+class ZygotePool:
+    """
+    Per-rootfs pools of warm members.
+
+    `size` members are kept ready for every rootfs that has been used
+    (or passed to `prewarm`). Members idle for longer than `max_idle`
+    seconds are evicted. With `refill=True` a background thread tops
+    pools back up after each take; otherwise call `refill()` yourself.
+    """
+
+    def __init__(
+        self,
+        size: int = Config.ZYGOTE_POOL_SIZE,
+        max_idle: float = Config.ZYGOTE_MAX_IDLE_SECONDS,
+        refill: bool = True,
+        cgroups: CgroupManager = None,
+    ):
+        self.cgroups = cgroups or CgroupManager()
+        self.size = size
+        self.max_idle = max_idle
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.evicted = 0
+        self._members = collections.defaultdict(collections.deque)
+        self._spawning = collections.Counter()
+        self._write_fds = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        if refill:
+            self._thread = threading.Thread(
+                target=self._refill_loop, name="zygote-refill", daemon=True
+            )
+            self._thread.start()
+
+    def prewarm(self, rootfs: str, count: int = None):
+        """
+        Create warm members for `rootfs` until `count` (default: the
+        pool size) are idle.
+        """
+        target = self.size if count is None else count
+        # Spawning takes a fork each; acquire() must not wait behind it,
+        # so members in flight are counted instead of holding the lock
+        while True:
+            with self._lock:
+                have = len(self._members[rootfs]) + self._spawning[rootfs]
+                if self._closed or have >= target:
+                    return
+                self._spawning[rootfs] += 1
+            member = None
+            try:
+                member = WarmMember(rootfs, self._write_fds, self.cgroups)
+            except OSError as e:
+                log.error(f"Could not create warm member: {e}")
+            with self._lock:
+                self._spawning[rootfs] -= 1
+                if member is None:
+                    return
+                if not self._closed:
+                    self._members[rootfs].append(member)
+                    self.created += 1
+                    continue
+            self._write_fds.discard(member.cmd_w)
+            member.kill()
+            return
+
+    def acquire(self, rootfs: str):
+        """
+        Take a warm member for `rootfs`, or None on a miss.
+        """
+        with self._lock:
+            pool = self._members[rootfs]
+            member = pool.popleft() if pool else None
+            if member is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._write_fds.discard(member.cmd_w)
+        self._wake.set()
+        return member
+
+    def refill(self):
+        for rootfs in list(self._members):
+            self.prewarm(rootfs)
+
+    def evict(self, max_idle: float = None):
+        """
+        Kill members that have been idle longer than `max_idle` seconds.
+        """
+        max_idle = self.max_idle if max_idle is None else max_idle
+        cutoff = time.monotonic() - max_idle
+        stale = []
+        with self._lock:
+            for pool in self._members.values():
+                while pool and pool[0].created <= cutoff:
+                    stale.append(pool.popleft())
+            for member in stale:
+                self._write_fds.discard(member.cmd_w)
+                self.evicted += 1
+        for member in stale:
+            member.kill()
+        return len(stale)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "created": self.created,
+            "evicted": self.evicted,
+            "idle": sum(len(p) for p in self._members.values()),
+        }
+
+    def shutdown(self):
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            members = [m for p in self._members.values() for m in p]
+            self._members.clear()
+            self._write_fds.clear()
+        for member in members:
+            member.kill()
+
+    def _refill_loop(self):
+        while not self._closed:
+            self._wake.wait(timeout=max(self.max_idle, 1.0))
+            self._wake.clear()
+            if self._closed:
+                break
+            self.evict()
+            self.refill()
@@ -58,7 +58,9 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "mcr_run=mini_container_runtime.runtime:main",
+            "mcr=mini_container_runtime.client:main",
+            "mcrd=mini_container_runtime.daemon:main",
+            "mcr_run=mini_container_runtime.client:main",
         ]
     },
     classifiers=[
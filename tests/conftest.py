@@ -0,0 +1,112 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# conftest MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import pytest
+from config import Config
+from mini_container_runtime.backend import LinuxBackend
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_file(tmp_path_factory):
+    # The shared log handler opens Config.LOG_FILE on its first record;
+    # keep test runs out of the project's logs/ directory
+    path = tmp_path_factory.mktemp("logs") / "mini_container.log"
+    previous, Config.LOG_FILE = Config.LOG_FILE, str(path)
+    yield path
+    Config.LOG_FILE = previous
+
+
+# Control files a new cgroup comes with, and what they start out holding
+CONTROL_FILES = {
+    "cgroup.procs": "",
+    "cgroup.events": "populated 0\nfrozen 0\n",
+    "cgroup.controllers": "cpuset cpu io memory hugetlb pids\n",
+    "cgroup.subtree_control": "",
+    "cgroup.freeze": "0\n",
+    "cgroup.kill": "",
+    "cpu.max": "max 100000\n",
+    "cpu.weight": "100\n",
+    "cpu.stat": "",
+    "cpuset.cpus": "",
+    "cpuset.mems": "",
+    "memory.max": "max\n",
+    "memory.high": "max\n",
+    "memory.low": "0\n",
+    "memory.min": "0\n",
+    "memory.swap.max": "max\n",
+    "memory.current": "0\n",
+    "memory.peak": "0\n",
+    "memory.events": "",
+    "memory.pressure": "",
+    "pids.max": "max\n",
+    "pids.current": "0\n",
+    "io.max": "",
+    "io.weight": "default 100\n",
+    "hugetlb.2MB.max": "max\n",
+    "hugetlb.1GB.max": "max\n",
+}
+
+
+@pytest.fixture
+def cgroupfs(tmp_path, monkeypatch):
+    """
+    Plain directories under tmp_path standing in for cgroupfs: like
+    the kernel, every new cgroup comes with its control files, and a
+    write replaces a file's contents.
+    """
+    root = tmp_path / "cgroup"
+    monkeypatch.setattr("mini_container_runtime.cgroups.CGROUP_ROOT",
+                        str(root))
+    cgroup_open = LinuxBackend.cgroup_open
+    cgroup_write = LinuxBackend.cgroup_write
+
+    def open_with_files(self, path):
+        handle = cgroup_open(self, path)
+        for name, content in CONTROL_FILES.items():
+            if not os.path.exists(os.path.join(path, name)):
+                with open(os.path.join(path, name), "w") as f:
+                    f.write(content)
+        return handle
+
+    def replace(self, handle, filename, value):
+        # Still refuses files the "kernel" does not provide
+        os.close(os.open(filename, os.O_WRONLY | os.O_TRUNC, dir_fd=handle))
+        cgroup_write(self, handle, filename, value)
+
+    monkeypatch.setattr(LinuxBackend, "cgroup_open", open_with_files)
+    monkeypatch.setattr(LinuxBackend, "cgroup_write", replace)
+    return root
@@ -0,0 +1,137 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_admission MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import pytest
+from mini_container_runtime import cgroups
+from mini_container_runtime.admission import (
+    AdmissionController, request_size,
+)
+from mini_container_runtime.backend import SimulatedBackend, set_backend
+from mini_container_runtime.runtime import MiniRuntime
+
+
+MiB = 1024 * 1024
+
+
+def test_request_size():
+    assert request_size() == (0, 0.0)
+    assert request_size("512M", "50%") == (512 * MiB, 0.5)
+    assert request_size("max", "max") == (0, 0.0)
+
+
+def test_queues_until_capacity_frees():
+    ac = AdmissionController(memory_budget="1G", cpu_budget=2)
+    a = ac.submit(memory=600 * MiB, cpus=1)
+    b = ac.submit(memory=600 * MiB, cpus=1)
+    assert ac.admissible() == [a]
+    assert ac.admissible() == []
+    stats = ac.stats()
+    assert stats["queued"] == 1 and stats["memory_used"] == 600 * MiB
+
+    ac.release(a)
+    assert ac.admissible() == [b]
+    assert b.admitted >= a.admitted and b.wait_time > 0
+    assert ac.stats()["admitted"] == 2
+    with pytest.raises(ValueError):
+        ac.submit(memory=2048 * MiB)
+
+
+def test_priority_then_tenant_fairness():
+    ac = AdmissionController(memory_budget="1G", cpu_budget=100)
+    hog = ac.submit(tenant="a", memory=1024 * MiB)
+    assert ac.admissible() == [hog]
+
+    queued = [ac.submit(tenant="a", cpus=1) for _ in range(3)]
+    queued += [ac.submit(tenant="b", cpus=1) for _ in range(3)]
+    urgent = ac.submit(tenant="a", priority=10, cpus=1)
+    ac.release(hog)
+    order = ac.admissible()
+    assert order[0] is urgent
+    # "a" already used a whole host's memory: "b" goes first, then turns
+    assert [t.tenant for t in order[1:]] == ["b", "b", "b", "a", "a", "a"]
+    assert ac.stats()["queued_by_tenant"] == {}
+
+
+def test_head_of_line_is_not_skipped():
+    ac = AdmissionController(memory_budget="1G", cpu_budget=4)
+    first = ac.submit(memory=512 * MiB)
+    assert ac.admissible() == [first]
+    big = ac.submit(memory=768 * MiB)
+    small = ac.submit(memory=64 * MiB)
+    assert ac.admissible() == []
+    assert ac.stats()["queued_by_tenant"] == {"default": 2}
+    ac.release(first)
+    assert ac.admissible() == [big, small]
+
+
+def test_runtime_admits_as_containers_exit(monkeypatch):
+    sim = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(sim)
+    monkeypatch.setattr(
+        "mini_container_runtime.runtime.AdmissionController",
+        lambda: AdmissionController(memory_budget="1G", cpu_budget=1),
+    )
+    runtime = MiniRuntime(backend=sim, admission=True)
+    try:
+        first = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                               memory_limit="768M")
+        ticket = runtime.submit(command=["/bin/true"], rootfs="/tmp/rootfs",
+                                tenant="t2", memory_limit="512M")
+        assert not ticket.done
+        assert runtime.admission_stats()["queued"] == 1
+
+        sim.exit(first.pid, 0)
+        runtime.monitor.wait_for(lambda: ticket.done, timeout=5)
+        second = ticket.result()
+        assert second.running and second.limits["memory.max"] == 512 * MiB
+        assert runtime.admission_stats()["memory_used"] == 512 * MiB
+
+        # Reaped by Container.wait(): the exit still frees its budget
+        sim.exit(second.pid, 0)
+        second.wait()
+        assert runtime.admission_stats()["memory_used"] == 0
+        third = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                               memory_limit="768M")
+        assert third.running
+
+        bad = runtime.submit(command=["/bin/true"], rootfs="/tmp/rootfs",
+                             memory_limit="64M", pids_limit="lots")
+        with pytest.raises(ValueError):
+            bad.result(timeout=1)
+        assert runtime.admission_stats()["memory_used"] == 768 * MiB
+    finally:
+        runtime.shutdown()
+        set_backend(previous)
@@ -0,0 +1,173 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_backend MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import errno
+import os
+import signal
+import pytest
+from mini_container_runtime import cgroups, namespaces
+from mini_container_runtime.backend import (
+    KernelBackend,
+    SimulatedBackend,
+    get_backend,
+    set_backend,
+)
+from mini_container_runtime.cgroups import Cgroup, CgroupError
+from mini_container_runtime.runtime import MiniRuntime
+from mini_container_runtime.telemetry import Sampler
+
+
+@pytest.fixture
+def sim():
+    backend = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(backend)
+    yield backend
+    set_backend(previous)
+
+
+def test_controllers_must_be_delegated(sim):
+    parent = Cgroup("test.slice")
+    child = Cgroup("test.slice/c1")
+    with pytest.raises(CgroupError) as e:
+        child.apply({"memory.max": 1024})
+    assert e.value.errors["memory.max"].errno == errno.EOPNOTSUPP
+
+    with pytest.raises(OSError):
+        parent.write("cgroup.subtree_control", "+memory")  # root hasn't
+    Cgroup("").write("cgroup.subtree_control", "+memory +pids")
+    parent.write("cgroup.subtree_control", "+memory +pids")
+    assert child.read("cgroup.controllers").split() == ["memory", "pids"]
+    child.apply({"memory.max": 1024})
+    assert child.read("memory.max") == "1024\n"
+    with pytest.raises(CgroupError):
+        child.apply({"memory.max": "lots"})
+
+
+def test_membership_oom_and_pids_limit(sim):
+    Cgroup("").write("cgroup.subtree_control", "+memory +pids")
+    cg = Cgroup("c1")
+    cg.apply({"memory.max": 1000, "pids.max": 2})
+
+    pid, pidfd = namespaces.spawn([namespaces.CLONE_NEWPID], cg.fileno())
+    other, other_fd = namespaces.spawn([], cg.fileno())
+    assert cg.populated()
+    assert cg.read("pids.current") == "2\n"
+    with pytest.raises(OSError) as e:
+        namespaces.spawn([], cg.fileno())
+    assert e.value.errno == errno.EAGAIN
+
+    sim.set_memory(pid, 600)
+    sim.set_memory(other, 600)  # 1200 > memory.max
+    assert sim.wait(other)[1] == signal.SIGKILL
+    assert "oom_kill 1" in cg.read("memory.events")
+    assert cg.read("memory.current") == "600\n"
+
+    with pytest.raises(OSError) as e:
+        cg.backend.cgroup_remove(cg.path)
+    assert e.value.errno == errno.EBUSY
+    sim.exit(pid, 3)
+    _, status, _ = sim.wait(pid)
+    assert os.waitstatus_to_exitcode(status) == 3
+    assert not cg.populated()
+    for fd in (pidfd, other_fd):
+        os.close(fd)
+
+
+def test_pidfd_signal_finds_every_pidfd_of_a_process(sim):
+    pid, pidfd = sim.clone(0)
+    other, other_fd = sim.clone(0)
+    dup = sim.pidfd_open(pid)
+    sim.pidfd_signal(dup, signal.SIGTERM)
+    assert sim.wait(pid)[1] == signal.SIGTERM
+    assert sim.start_time(other) is not None  # left alone
+
+    with pytest.raises(OSError) as e:
+        sim.pidfd_signal(pidfd, signal.SIGTERM)  # reaped
+    assert e.value.errno == errno.EBADF
+    sim.pidfd_signal(other_fd, signal.SIGKILL)
+    assert sim.wait(other)[1] == signal.SIGKILL
+    for fd in (pidfd, other_fd, dup):
+        os.close(fd)
+
+
+def test_runtime_at_scale_without_root(sim, monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 1000)
+    runtime = MiniRuntime(backend=sim)
+    containers = [
+        runtime.launch(["/bin/true"], rootfs="/tmp/rootfs")
+        for _ in range(10000)
+    ]
+    assert len(sim.processes()) == 10000
+
+    sampler = Sampler()
+    sim.set_memory(containers[0].pid, 4096)
+    sampler.watch(containers[0])
+    _, fds, backend, _ = sampler._watched[containers[0].id]
+    assert sampler.sample(containers[0], fds, backend)["memory.current"] == 4096
+    sampler.stop()
+
+    for i, c in enumerate(containers):
+        sim.exit(c.pid, i % 2)
+    assert runtime.wait_all(timeout=30) == []
+    assert sum(c.exit_code for c in containers) == 5000
+
+    runtime.cgroups.reap()
+    stats = runtime.cgroups.stats()
+    assert stats["free"] + stats["reaped"] == 10000
+    assert sim.processes(cgroups.CGROUP_ROOT) == []
+    runtime.shutdown()
+
+
+def test_backend_is_complete_and_not_switched_under_a_runtime(sim):
+    class Partial(KernelBackend):
+        name = "partial"
+
+        def require_privileges(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+    runtime = MiniRuntime(backend=sim)
+    other = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    with pytest.raises(ValueError):
+        MiniRuntime(backend=other)
+    assert get_backend() is sim
+    neighbour = MiniRuntime(backend=sim)
+    assert neighbour.backend is sim
+
+    neighbour.shutdown()
+    runtime.shutdown()
@@ -0,0 +1,88 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_benchmarks MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import functools
+import json
+import os
+import pytest
+from benchmarks import launch_bench
+from mini_container_runtime.backend import get_backend
+from mini_container_runtime.runtime import MiniRuntime
+
+
+def test_percentiles_nearest_rank():
+    samples = [i * 1_000_000 for i in range(1, 101)]  # 1..100 ms
+    result = launch_bench.percentiles(samples)
+    assert (result["p50_ms"], result["p95_ms"], result["p99_ms"]) == (
+        50.0, 95.0, 99.0
+    )
+
+
+def test_mock_run_writes_comparable_results(tmp_path):
+    backend = get_backend()
+    output = tmp_path / "bench.json"
+    launch_bench.main([
+        "--mock", "--iterations", "3", "--max-concurrency", "2",
+        "--launches", "4", "--density", "2", "--output", str(output),
+    ])
+    assert get_backend() is backend  # mock backend is uninstalled
+
+    results = json.loads(output.read_text())
+    assert results["meta"]["mode"] == "mock"
+    assert results["latency"]["cold"]["samples"] == 3
+    assert results["latency"]["warm"]["failures"] == 0
+    assert [r["concurrency"] for r in results["throughput"]] == [1, 2]
+    assert results["memory"]["containers"] == 2
+    assert launch_bench.compare(results, results)
+
+
+def test_wait_exec_fails_loudly_on_timeout():
+    # This interpreter never execs: a timeout, not a sample
+    with pytest.raises(TimeoutError):
+        launch_bench.wait_exec(os.getpid(), timeout=0.01)
+
+
+def test_mock_run_under_init_times_the_workload(tmp_path, monkeypatch):
+    monkeypatch.setattr(launch_bench, "MiniRuntime",
+                        functools.partial(MiniRuntime, init=True))
+    output = tmp_path / "bench.json"
+    launch_bench.main([
+        "--mock", "--iterations", "2", "--max-concurrency", "1",
+        "--launches", "1", "--density", "2", "--output", str(output),
+    ])
+    results = json.loads(output.read_text())
+    assert results["latency"]["cold"]["samples"] == 2
+    assert results["memory"]["container_rss_kb_per_container"] > 0
@@ -34,27 +34,33 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import errno
+import gc
 import os
-from mini_container_runtime.cgroups import Cgroup
+import resource
+import weakref
+import pytest
+from mini_container_runtime.cgroups import (
+    Cgroup,
+    CgroupError,
+    CgroupManager,
+    build_limits,
+)
+from mini_container_runtime.utils import (
+    block_device,
+    parse_bytes,
+    parse_cpu,
+    raise_nofile_limit,
+)
 
 
-def test_cgroup_path_created(tmp_path, monkeypatch):
-    fake_root = tmp_path / "cgroup"
-    monkeypatch.setattr(
-        "mini_container_runtime.cgroups.CGROUP_ROOT",
-        str(fake_root)
-    )
+def test_cgroup_path_created(cgroupfs):
 
     cg = Cgroup("testgroup")
     assert os.path.isdir(cg.path)
 
 
-def test_cgroup_add_process(tmp_path, monkeypatch):
-    fake_root = tmp_path / "cgroup"
-    monkeypatch.setattr(
-        "mini_container_runtime.cgroups.CGROUP_ROOT",
-        str(fake_root)
-    )
+def test_cgroup_add_process(cgroupfs):
 
     cg = Cgroup("testgroup")
     procs = os.path.join(cg.path, "cgroup.procs")
@@ -63,3 +69,192 @@ def test_cgroup_add_process(tmp_path, monkeypatch):
     
     with open(procs) as f:
         assert f.read().strip() == "1234"
+
+
+def test_cgroup_apply_writes_all_files(cgroupfs):
+
+    cg = Cgroup("testgroup")
+    cg.apply({"memory.max": 1024, "cpu.max": "50000 100000"})
+
+    assert cg.read("memory.max") == "1024"
+    assert cg.read("cpu.max") == "50000 100000"
+
+
+def test_cgroup_apply_reports_each_failure(cgroupfs):
+
+    cg = Cgroup("testgroup")
+    os.unlink(os.path.join(cg.path, "memory.max"))
+    os.mkdir(os.path.join(cg.path, "memory.max"))
+
+    with pytest.raises(CgroupError) as exc:
+        cg.apply({"memory.max": 1024, "cpu.max": "max 100000"})
+
+    assert list(exc.value.errors) == ["memory.max"]
+    assert "memory.max" in str(exc.value)
+    assert cg.read("cpu.max") == "max 100000"
+
+
+def _empty(cg):
+    cg.write("cgroup.events", "populated 0\nfrozen 0\n")
+
+
+def test_manager_reuses_reset_cgroups(cgroupfs):
+
+    manager = CgroupManager(parent="mini.slice", free_list_size=1,
+                            reap_interval=0)
+    first = manager.acquire()
+    assert os.path.dirname(first.path).endswith("mini.slice")
+
+    first.apply({"memory.max": 1024})
+    _empty(first)
+    manager.release(first)
+
+    again = manager.acquire()
+    assert again is first
+    assert again.read("memory.max") == "max"
+    assert manager.stats()["reused"] == 1
+
+
+def test_shut_down_manager_is_not_kept_alive(cgroupfs):
+    manager = CgroupManager(parent="mini.slice", reap_interval=0)
+    manager.setup()
+    manager.shutdown()
+    ref = weakref.ref(manager)
+    del manager
+    gc.collect()
+    assert ref() is None
+
+
+def test_manager_reaps_overflow_and_busy(cgroupfs, monkeypatch):
+    manager = CgroupManager(parent="mini.slice", free_list_size=0,
+                            reap_interval=0)
+    idle, busy = manager.acquire(), manager.acquire()
+    _empty(idle)
+    busy.write("cgroup.events", "populated 1\nfrozen 0\n")
+    manager.release(idle)
+    manager.release(busy)
+
+    # The busy cgroup's last orphan is still exiting on the first pass
+    attempts = []
+    rmdir = os.rmdir
+
+    def remove(path):
+        attempts.append(path)
+        if path == busy.path and attempts.count(path) == 1:
+            raise OSError(errno.EBUSY, os.strerror(errno.EBUSY), path)
+        for name in os.listdir(path):
+            os.unlink(os.path.join(path, name))
+        rmdir(path)
+
+    monkeypatch.setattr("os.rmdir", remove)
+
+    assert manager.reap() == 1
+    assert manager.stats()["pending_reap"] == 1
+    assert os.path.isdir(busy.path)
+
+    assert manager.reap() == 1
+    assert attempts == [idle.path, busy.path, busy.path]
+    assert not os.path.exists(idle.path) and not os.path.exists(busy.path)
+    assert manager.stats() == {
+        "free": 0, "pending_reap": 0, "reused": 0, "reaped": 2,
+    }
+
+
+def test_reset_records_a_baseline(cgroupfs):
+    cg = Cgroup("reused")
+    cg.write("cpu.stat", "usage_usec 900\n")
+    cg.write("memory.peak", "8192\n")
+    cg.apply({"memory.max": 1024})
+    assert cg.reset()
+    assert cg.baseline["cpu.stat"] == "usage_usec 900\n"
+    assert cg.baseline["memory.peak"] == "8192\n"
+    assert "io.stat" not in cg.baseline  # io controller not enabled
+
+
+def test_unit_parsing():
+    assert parse_bytes("512M") == 512 * 1024 * 1024
+    assert parse_bytes("1.5GiB") == 3 * 512 * 1024 * 1024
+    assert parse_bytes(4096) == 4096
+    assert parse_bytes("max") == "max"
+    assert parse_cpu("100%") == 100000
+    assert parse_cpu("1.5") == 150000
+    assert parse_cpu(2) == parse_cpu("2") == 200000
+    assert parse_cpu(0.5) == 50000
+    with pytest.raises(ValueError):
+        parse_bytes("lots")
+    with pytest.raises(ValueError):
+        parse_cpu("0%")
+
+
+def test_build_limits_covers_controllers(tmp_path):
+    dev = block_device(str(tmp_path))
+    limits = build_limits(
+        memory_limit="512M",
+        memory_high="384M",
+        swap_limit=0,
+        pids_limit=64,
+        cpu_quota="50%",
+        cpu_weight=200,
+        cpuset_cpus="0-1",
+        io_max={"8:16": {"rbps": "10M", "wiops": 100}},
+        io_weight={str(tmp_path): 50},
+        hugetlb={"2MB": "64M"},
+    )
+    assert limits["memory.max"] == 512 << 20
+    assert limits["memory.swap.max"] == 0
+    assert limits["cpu.max"] == "50000 100000"
+    assert limits["io.max"] == ["8:16 rbps=10485760 wiops=100"]
+    assert limits["io.weight"] == [f"{dev} 50"]
+    assert limits["hugetlb.2MB.max"] == 64 << 20
+    with pytest.raises(ValueError):
+        build_limits(io_max={"8:0": {"bogus": 1}})
+
+
+def test_apply_refuses_disabled_controllers(cgroupfs):
+    cg = Cgroup("testgroup")
+    cg.write("cgroup.controllers", "cpu memory pids\n")
+
+    with pytest.raises(CgroupError) as exc:
+        cg.apply({"pids.max": 10, "io.weight": "default 50"})
+    assert list(exc.value.errors) == ["io.weight"]
+    assert cg.read("pids.max") == "10"
+
+    # Unreadable cgroup.controllers fails closed
+    os.unlink(os.path.join(cg.path, "cgroup.controllers"))
+    os.mkdir(os.path.join(cg.path, "cgroup.controllers"))
+    blind = Cgroup("testgroup")
+    with pytest.raises(CgroupError) as exc:
+        blind.apply({"pids.max": 20})
+    assert list(exc.value.errors) == ["pids.max"]
+    assert cg.read("pids.max") == "10"
+
+
+def test_reset_restores_every_controller(cgroupfs):
+    cg = Cgroup("testgroup")
+    cg.apply(build_limits(
+        memory_low="1G", pids_limit=5, io_max={"8:0": {"wbps": "1M"}},
+        hugetlb={"1GB": "2G"},
+    ))
+    assert cg.reset()
+    assert cg.read("memory.low") == "0"
+    assert cg.read("pids.max") == "max"
+    assert cg.read("io.max") == "8:0 rbps=max wbps=max riops=max wiops=max"
+    assert cg.read("hugetlb.1GB.max") == "max"
+    assert cg.limits == {}
+
+
+def test_nofile_limit_is_clamped_to_nr_open(monkeypatch):
+    with open("/proc/sys/fs/nr_open") as f:
+        nr_open = int(f.read())
+    limits = []
+    monkeypatch.setattr(resource, "getrlimit",
+                        lambda _: (1024, resource.RLIM_INFINITY))
+    monkeypatch.setattr(resource, "setrlimit",
+                        lambda _, limit: limits.append(limit))
+    raise_nofile_limit()
+    assert limits == [(nr_open, resource.RLIM_INFINITY)]
+
+    def refuse(_, limit):
+        raise ValueError("not allowed to raise maximum limit")
+    monkeypatch.setattr(resource, "setrlimit", refuse)
+    raise_nofile_limit()  # best effort, never fatal
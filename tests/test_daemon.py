@@ -0,0 +1,157 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_daemon MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import json
+import socket
+import subprocess
+import sys
+import pytest
+from mini_container_runtime import cgroups
+from mini_container_runtime.backend import SimulatedBackend, set_backend
+from mini_container_runtime.client import Client, DaemonError, main
+from mini_container_runtime.daemon import RuntimeDaemon
+from mini_container_runtime.runtime import MiniRuntime
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 1000)
+    sim = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(sim)
+    runtime = MiniRuntime(backend=sim, state=str(tmp_path / "state.db"))
+    server = RuntimeDaemon(runtime, str(tmp_path / "mcr.sock"), workers=4)
+    server.start()
+    yield server
+    server.close()
+    runtime.shutdown()
+    set_backend(previous)
+
+
+def test_launch_ps_stop_over_socket(daemon):
+    sim = daemon.runtime.backend
+    with Client(daemon.path) as client:
+        assert client.call("ping") == "pong"
+        launched = client.call("launch", command=["/bin/sh"],
+                               rootfs="/tmp/rootfs", labels={"app": "web"})
+        assert launched["running"] and launched["labels"] == {"app": "web"}
+        [row] = client.call("ps", labels={"app": "web"})
+        assert row["id"] == launched["id"] and row["state"] == "running"
+
+        other = client.call("launch", command=["/bin/true"],
+                            rootfs="/tmp/rootfs")
+        sim.exit(other["pid"], 4)
+        assert client.call("wait", container_id=other["id"])["exit_code"] == 4
+
+        client.call("stop", container_id=launched["id"], timeout=1)
+        assert client.call("ps") == []
+        assert len(client.call("ps", exited=True)) == 2
+        assert client.call("stats")["running"] == 0
+
+        with pytest.raises(DaemonError) as e:
+            client.call("stop", container_id="nope")
+        assert e.value.kind == "KeyError"
+        with pytest.raises(DaemonError):
+            client.call("reboot")
+
+
+def test_pipelined_requests_keep_their_order(daemon):
+    with Client(daemon.path) as client:
+        calls = [("launch", {"command": ["/bin/true"], "rootfs": "/tmp/rootfs"})
+                 for _ in range(50)]
+        calls.insert(10, ("logs", {"container_id": "nope"}))
+        results = client.pipeline(calls)
+    assert isinstance(results[10], DaemonError)
+    launched = [r["id"] for r in results if not isinstance(r, DaemonError)]
+    assert len(set(launched)) == 50
+    assert set(launched) == set(daemon.runtime.containers)
+
+
+def test_cli(daemon, capsys, monkeypatch):
+    monkeypatch.setattr("config.Config.DAEMON_SOCKET", daemon.path)
+    assert main(["run", "-l", "app=db", "/tmp/rootfs", "/bin/sh", "-c",
+                 "true"]) == 0
+    container_id = capsys.readouterr().out.strip()
+    assert main(["ps"]) == 0
+    out = capsys.readouterr().out
+    assert container_id in out and "app=db" in out
+    assert main(["stop", "-t", "0", container_id]) == 0
+    assert main(["ps", "-a"]) == 0
+    assert "exited" in capsys.readouterr().out
+    assert main(["logs", "nope"]) == 1
+    assert main([]) == 2
+
+
+def test_client_import_is_light():
+    # The thin client must not drag the runtime in at startup
+    code = ("import sys, mini_container_runtime.client; "
+            "print('mini_container_runtime.runtime' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == "False"
+
+
+def test_blocking_ops_do_not_starve_the_pool(daemon):
+    sim = daemon.runtime.backend
+    with Client(daemon.path) as client:
+        launched = [client.call("launch", command=["/bin/sh"],
+                                rootfs="/tmp/rootfs") for _ in range(8)]
+        # Twice as many open-ended waits as the daemon has workers
+        waits = [client.send("wait", container_id=c["id"])
+                 for c in launched]
+        assert client.call("ping") == "pong"
+        assert client.call("ps")[0]["state"] == "running"
+        for c in launched:
+            sim.exit(c["pid"], 0)
+        for request_id in waits:
+            assert client.receive(request_id)["exit_code"] == 0
+
+
+def test_half_closed_client_still_gets_every_reply(daemon):
+    sim = daemon.runtime.backend
+    launched = daemon.runtime.launch(command=["/bin/sh"], rootfs="/tmp/rootfs")
+    requests = [{"id": 0, "op": "wait",
+                 "args": {"container_id": launched.id}}]
+    requests += [{"id": i, "op": "ping", "args": {}} for i in range(1, 50)]
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(daemon.path)
+        sock.sendall(b"".join(json.dumps(r).encode() + b"\n"
+                              for r in requests))
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile("rb") as lines:
+            got = [json.loads(lines.readline()) for _ in range(49)]
+            sim.exit(launched.pid, 0)
+            got += [json.loads(line) for line in lines]
+    assert sorted(r["id"] for r in got) == list(range(50))
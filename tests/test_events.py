@@ -0,0 +1,118 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_events MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import asyncio
+import os
+import threading
+import time
+from mini_container_runtime.cgroups import Cgroup
+from mini_container_runtime.container import Container
+from mini_container_runtime.events import ExitMonitor
+
+
+def _started(code, cgroup=None):
+    c = Container(command=["exit", str(code)])
+    pid = os.fork()
+    if pid == 0:
+        os._exit(code)
+    c.pid = pid
+    c.pidfd = os.pidfd_open(pid)
+    c.cgroup = cgroup
+    return c
+
+
+def test_exit_then_empty_cgroup(cgroupfs):
+    cg = Cgroup("mini_events")
+    cg.write("cgroup.events", "populated 1\nfrozen 0\n")
+
+    monitor = ExitMonitor()
+    c = _started(4, cg)
+    monitor.register(c)
+
+    seen = []
+    monitor.callbacks.append(lambda kind, c: seen.append(kind))
+
+    # An orphan still holds the cgroup: exit only
+    assert monitor.wait_for(lambda: not c.running, timeout=5)
+    assert c.exit_code == 4
+    assert c.rusage is not None
+    assert seen == ["exit"]
+
+    cg.write("cgroup.events", "populated 0\nfrozen 0\n")
+    assert monitor.wait_for(lambda: "empty" in seen, timeout=5)
+    assert c.cgroup is None
+    monitor.close()
+
+
+def test_wait_for_covers_the_callbacks_of_an_exit():
+    monitor = ExitMonitor()
+    started = threading.Event()
+    seen = []
+
+    def slow(kind, c):
+        started.set()
+        time.sleep(0.2)  # e.g. writing the exit to the state store
+        seen.append(kind)
+
+    monitor.callbacks.append(slow)
+    monitor.start()
+    c = _started(0)
+    monitor.register(c)
+    assert started.wait(5)  # reaped, callbacks still running
+    assert monitor.wait_for(lambda: not c.running, timeout=5)
+    assert "exit" in seen
+    monitor.close()
+
+
+def test_asyncio_integration():
+    monitor = ExitMonitor()
+    c = _started(2)
+    monitor.register(c)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        monitor.callbacks.append(
+            lambda kind, c: kind == "empty" and done.set_result(c)
+        )
+        monitor.attach(loop)
+        try:
+            return await asyncio.wait_for(done, 5)
+        finally:
+            monitor.detach(loop)
+
+    assert asyncio.run(main()).exit_code == 2
+    monitor.close()
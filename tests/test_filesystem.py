@@ -35,16 +35,61 @@
 # imports
 # --------------------------------------------------
 import pytest
-from mini_container_runtime.filesystem import setup_rootfs
+from mini_container_runtime.container import Container
+from mini_container_runtime.filesystem import OverlayRootfs, setup_rootfs
 
 
 def test_setup_rootfs_creates_directory(tmp_path, monkeypatch):
     rootfs = tmp_path / "rootfs"
 
-    monkeypatch.setattr("subprocess.run", lambda *a, **k: None)
+    monkeypatch.setattr(
+        "mini_container_runtime.syscalls.mount", lambda *a, **k: None
+    )
     monkeypatch.setattr("os.chroot", lambda _: None)
     monkeypatch.setattr("os.chdir", lambda _: None)
 
     setup_rootfs(str(rootfs))
     assert rootfs.exists()
 
+
+
+def test_overlay_layout_and_cleanup(tmp_path):
+    overlay = OverlayRootfs(
+        ["/layers/app", "/layers/base"], "c1", scratch_root=str(tmp_path)
+    )
+    overlay.prepare()
+
+    assert (tmp_path / "c1" / "upper").is_dir()
+    assert (tmp_path / "c1" / "work").is_dir()
+    assert overlay.options() == (
+        "lowerdir=/layers/app:/layers/base,"
+        f"upperdir={tmp_path}/c1/upper,workdir={tmp_path}/c1/work"
+    )
+
+    overlay.cleanup()
+    assert not (tmp_path / "c1").exists()
+
+
+def test_setup_rootfs_mounts_overlay_as_root(tmp_path, monkeypatch):
+    mounts = []
+    roots = []
+    monkeypatch.setattr(
+        "mini_container_runtime.syscalls.mount",
+        lambda *a, **k: mounts.append(a)
+    )
+    monkeypatch.setattr("os.chroot", lambda _: None)
+    monkeypatch.setattr("os.chdir", roots.append)
+
+    overlay = OverlayRootfs("/layers/base", "c1", scratch_root=str(tmp_path))
+    setup_rootfs("/layers/base", overlay=overlay)
+
+    assert mounts[1][0] == "overlay"
+    assert roots[0] == overlay.merged
+
+
+def test_layer_stack_needs_an_overlay():
+    # Refused before any spawn
+    with pytest.raises(ValueError):
+        Container(["/bin/true"], rootfs=["/layers/app", "/layers/base"])
+    with pytest.raises(ValueError):
+        setup_rootfs(["/layers/app", "/layers/base"])
@@ -0,0 +1,126 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_init MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import signal
+import time
+from mini_container_runtime import container as container_module
+from mini_container_runtime import namespaces
+from mini_container_runtime.container import Container
+from mini_container_runtime.init import run_as_init
+
+
+def start_init(command) -> int:
+    pid = os.fork()
+    if pid == 0:
+        run_as_init(command)
+    return pid
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def state(pid: int) -> str:
+    with open(f"/proc/{pid}/stat") as f:
+        return f.read().rsplit(")", 1)[1].split()[0]
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def exit_code(pid: int) -> int:
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def test_reaps_orphans_and_relays_exit_code():
+    # The subshell exits at once, orphaning its "sleep" to init
+    pid = start_init(
+        ["/bin/sh", "-c", "(sleep 0.1 &); sleep 0.6; exit 4"]
+    )
+    wait_until(lambda: len(children(pid)) == 2)
+    orphan = max(children(pid))
+    wait_until(lambda: orphan not in children(pid))
+    assert all(state(child) != "Z" for child in children(pid))
+    assert exit_code(pid) == 4
+
+
+def test_forwards_signals():
+    pid = start_init(
+        ["/bin/sh", "-c", "trap 'exit 7' TERM; while :; do sleep 0.05; done"]
+    )
+    wait_until(lambda: children(pid))
+    time.sleep(0.1)  # let the shell install its trap
+    os.kill(pid, signal.SIGTERM)
+    assert exit_code(pid) == 7
+
+
+def test_killed_workload_exits_128_plus_signal():
+    pid = start_init(["/bin/sh", "-c", "kill -9 $$"])
+    assert exit_code(pid) == 128 + signal.SIGKILL
+
+
+def test_container_init_mode(monkeypatch):
+    real_spawn = namespaces.spawn
+    monkeypatch.setattr(
+        namespaces, "spawn", lambda ns, cgroup_fd=None: real_spawn([])
+    )
+    monkeypatch.setattr(namespaces, "set_hostname", lambda _: None)
+    monkeypatch.setattr(container_module, "setup_rootfs",
+                        lambda rootfs, overlay=None: None)
+    c = Container(["/bin/sh", "-c", "exit 5"], init=True)
+    c.start()
+    assert c.wait() == 5
+
+    # The trace's exec mark comes once the workload is spawned
+    traced = Container(["/bin/true"], init=True, trace=True)
+    real_posix_spawnp = os.posix_spawnp
+
+    def posix_spawnp(*args, **kwargs):
+        pid = real_posix_spawnp(*args, **kwargs)
+        traced.trace.record("workload", time.monotonic_ns(), None)
+        return pid
+
+    monkeypatch.setattr(os, "posix_spawnp", posix_spawnp)
+    traced.start()
+    assert traced.wait() == 0
+    names = [s["name"] for s in traced.trace.to_json()["spans"]]
+    assert names.index("workload") < names.index("exec")
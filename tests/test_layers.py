@@ -0,0 +1,122 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_layers MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import io
+import os
+import tarfile
+import pytest
+from mini_container_runtime.layers import LayerStore
+
+
+def _layer(files, compress=False):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz" if compress else "w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755
+            tar.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+def test_import_dedups_files_across_layers(tmp_path):
+    store = LayerStore(str(tmp_path))
+    base = store.import_layer(_layer({"bin/sh": b"shell", "etc/os": b"x"}))
+    app = store.import_layer(
+        _layer({"bin/sh": b"shell", "app/run": b"go"}, compress=True)
+    )
+
+    assert base.startswith("sha256:") and base != app
+    a = os.stat(os.path.join(store.path(base), "bin", "sh"))
+    b = os.stat(os.path.join(store.path(app), "bin", "sh"))
+    assert a.st_ino == b.st_ino
+    assert len(os.listdir(store.blobs)) == 3
+
+    assert store.stack([base, app]) == [store.path(app), store.path(base)]
+
+
+def test_known_digest_is_not_read(tmp_path):
+    store = LayerStore(str(tmp_path))
+    digest = store.import_layer(_layer({"a": b"1"}))
+
+    class Unreadable:
+        def read(self, size=-1):
+            raise AssertionError("layer was read again")
+
+    assert store.import_layer(Unreadable(), digest=digest) == digest
+    assert store.import_layer(_layer({"a": b"1"})) == digest
+
+
+def test_digest_mismatch_and_unsafe_paths(tmp_path):
+    store = LayerStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.import_layer(_layer({"a": b"1"}), digest="sha256:" + "0" * 64)
+
+    digest = store.import_layer(_layer({"../escape": b"x", "ok": b"y"}))
+    assert os.listdir(store.path(digest)) == ["ok"]
+    assert not (tmp_path / "escape").exists()
+
+
+def test_symlinked_dir_cannot_escape_layer(tmp_path):
+    store = LayerStore(str(tmp_path / "store"))
+    outside = tmp_path / "outside"
+    outside.mkdir(mode=0o700)
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        link = tarfile.TarInfo("x")
+        link.type = tarfile.SYMTYPE
+        link.linkname = str(outside)
+        tar.addfile(link)
+        folder = tarfile.TarInfo("x")
+        folder.type = tarfile.DIRTYPE
+        folder.mode = 0o777
+        tar.addfile(folder)
+        info = tarfile.TarInfo("x/sub/f")
+        info.size = 1
+        tar.addfile(info, io.BytesIO(b"f"))
+        dup = tarfile.TarInfo("x/sub/f")
+        dup.size = 1
+        tar.addfile(dup, io.BytesIO(b"g"))
+    buf.seek(0)
+
+    digest = store.import_layer(buf)
+    layer = os.path.join(store.path(digest), "x")
+    assert os.listdir(outside) == []
+    assert outside.stat().st_mode & 0o777 == 0o700
+    assert not os.path.islink(layer)
+    with open(os.path.join(layer, "sub", "f")) as f:
+        assert f.read() == "g"
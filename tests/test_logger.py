@@ -0,0 +1,108 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_logger MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import json
+import logging
+import os
+from mini_container_runtime.logger import QueueFileHandler
+
+
+def _logger(handler):
+    log = logging.getLogger("test_logger")
+    log.propagate = False
+    log.handlers = [handler]
+    log.setLevel(logging.INFO)
+    return log
+
+
+def _records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_are_json_lines(tmp_path):
+    path = tmp_path / "logs" / "mcr.log"
+    handler = QueueFileHandler(str(path), flush_interval=0.01)
+    log = _logger(handler)
+    log.info("hello")
+    log.warning("world")
+    handler.close()
+
+    records = _records(path)
+    assert [r["msg"] for r in records] == ["hello", "world"]
+    assert records[1]["level"] == "WARNING"
+    assert records[0]["pid"] == os.getpid()
+
+
+def test_overflow_is_counted_and_reported(tmp_path):
+    path = tmp_path / "mcr.log"
+    handler = QueueFileHandler(str(path), maxsize=2, start=False)
+    log = _logger(handler)
+    for i in range(5):
+        log.info(f"record {i}")
+    assert handler.stats() == {"queued": 2, "dropped": 3}
+    handler.close()
+
+    records = _records(path)
+    assert [r["msg"] for r in records[:2]] == ["record 0", "record 1"]
+    assert "Dropped 3" in records[2]["msg"]
+
+
+def test_forked_child_writes_directly(tmp_path):
+    path = tmp_path / "mcr.log"
+    handler = QueueFileHandler(str(path), start=False)
+    log = _logger(handler)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            log.info("from child")
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    records = _records(path)
+    assert records == [dict(records[0], msg="from child", pid=pid)]
+    handler.close()
+
+
+def test_file_is_opened_on_first_record(tmp_path, monkeypatch):
+    path = tmp_path / "lazy.log"
+    monkeypatch.setattr("config.Config.LOG_FILE", str(path))
+    handler = QueueFileHandler(flush_interval=0.01)
+    assert handler.fd is None and not path.exists()
+    _logger(handler).info("first")
+    handler.close()
+    assert [r["msg"] for r in _records(path)] == ["first"]
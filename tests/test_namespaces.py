@@ -34,10 +34,12 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import errno
+import os
+import signal
 import pytest
-from mini_container_runtime import namespaces
-import subprocess
-from unittest.mock import patch
+from mini_container_runtime import namespaces, syscalls
+from mini_container_runtime.backend import LinuxBackend
 
 
 def test_namespace_flags_are_ints():
@@ -46,22 +48,106 @@ def test_namespace_flags_are_ints():
     assert isinstance(namespaces.CLONE_NEWUTS, int)
 
 
-def test_invalid_hostname_rejected():
-    with patch("subprocess.run") as mock_run:
-        mock_run.side_effect = subprocess.CalledProcessError(
-            1, ["hostname", "bad_hostname"]
-        )
-        with pytest.raises(subprocess.CalledProcessError):
-            namespaces.set_hostname("bad_hostname")
+def test_invalid_hostname_rejected(monkeypatch):
+    def fake_sethostname(hostname):
+        raise OSError(errno.EINVAL, "Invalid argument")
+
+    monkeypatch.setattr(syscalls, "sethostname", fake_sethostname)
+    with pytest.raises(OSError):
+        namespaces.set_hostname("bad_hostname")
 
 def test_valid_hostname_passes(monkeypatch):
     called = {}
 
-    def fake_run(cmd, check):
-        called["hostname"] = cmd[1]
-        return
+    def fake_sethostname(hostname):
+        called["hostname"] = hostname
 
-    with patch("subprocess.run", fake_run):
-        namespaces.set_hostname("valid-host")
+    monkeypatch.setattr(syscalls, "sethostname", fake_sethostname)
+    namespaces.set_hostname("valid-host")
 
     assert called["hostname"] == "valid-host"
+
+
+@pytest.fixture(params=["direct", "helper"])
+def spawn_path(request, monkeypatch):
+    # "helper" is what a runtime with threads running takes
+    monkeypatch.setattr(LinuxBackend, "clone_safe",
+                        lambda self: request.param == "direct")
+    return request.param
+
+
+def test_spawn_clones_with_a_pidfd(spawn_path, monkeypatch):
+    # Called in the helper on that path: report it over a pipe
+    called_r, called_w = os.pipe()
+    clone3 = syscalls.clone3
+
+    def traced_clone3(flags, cgroup_fd=None):
+        os.write(called_w, b"c")
+        return clone3(flags, cgroup_fd)
+
+    monkeypatch.setattr(syscalls, "clone3", traced_clone3)
+    pid, pidfd = namespaces.spawn([])
+    if pid == 0:
+        os._exit(7)
+
+    try:
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 7
+        assert pidfd >= 0
+        assert os.read(called_r, 1) == b"c"
+    finally:
+        os.close(called_r)
+        os.close(called_w)
+        os.close(pidfd)
+
+
+def test_spawn_falls_back_without_clone3(spawn_path, monkeypatch):
+    def no_clone3(flags, cgroup_fd=None):
+        raise OSError(errno.ENOSYS, "Function not implemented")
+
+    monkeypatch.setattr(syscalls, "clone3", no_clone3)
+
+    pid, pidfd = namespaces.spawn([])
+    if pid == 0:
+        os._exit(3)
+
+    try:
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 3
+    finally:
+        os.close(pidfd)
+
+
+def _newpid_works():
+    pid = os.fork()
+    if pid == 0:
+        try:
+            syscalls.unshare(namespaces.CLONE_NEWPID)
+            os._exit(0)
+        finally:
+            os._exit(1)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) == 0
+
+
+@pytest.mark.skipif(not _newpid_works(), reason="needs CLONE_NEWPID")
+def test_pid_namespace_child_is_ours_on_every_path(spawn_path):
+    ready_r, ready_w = os.pipe()
+    pid, pidfd = namespaces.spawn([namespaces.CLONE_NEWPID])
+    if pid == 0:
+        try:
+            os.write(ready_w, b"1" if os.getpid() == 1 else b"0")
+            while True:
+                signal.pause()
+        finally:
+            os._exit(127)
+
+    try:
+        os.close(ready_w)
+        assert os.read(ready_r, 1) == b"1"
+        # The pidfd is PID 1 itself: same exit status on either path
+        signal.pidfd_send_signal(pidfd, signal.SIGKILL)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == -signal.SIGKILL
+    finally:
+        os.close(ready_r)
+        os.close(pidfd)
@@ -0,0 +1,181 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_network MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import socket
+import threading
+import pytest
+from mini_container_runtime import cgroups, syscalls
+from mini_container_runtime.backend import LinuxBackend, SimulatedBackend, \
+    set_backend
+from mini_container_runtime.namespaces import CLONE_NEWNET
+from mini_container_runtime.netlink import Netlink
+from mini_container_runtime.network import Ipam, NetworkManager
+from mini_container_runtime.runtime import MiniRuntime
+
+
+@pytest.fixture
+def sim(monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 1000)
+    backend = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(backend)
+    yield backend
+    set_backend(previous)
+
+
+def test_ipam():
+    ipam = Ipam("10.0.0.0/29")  # .1 is the gateway, .2-.6 for containers
+    assert str(ipam.gateway) == "10.0.0.1"
+    ipam.reserve("10.0.0.3/29")
+    first = ipam.allocate()
+    assert str(first) == "10.0.0.2/29"
+    assert [str(ipam.allocate().ip) for _ in range(3)] == \
+        ["10.0.0.4", "10.0.0.5", "10.0.0.6"]
+    with pytest.raises(RuntimeError):
+        ipam.allocate()
+    ipam.release(first)
+    ipam.release("10.0.0.3")
+    assert [str(ipam.allocate().ip) for _ in range(2)] == \
+        ["10.0.0.2", "10.0.0.3"]
+
+
+def test_runtime_modes(sim, tmp_path):
+    runtime = MiniRuntime(backend=sim, network="loopback", netns_pool=0,
+                          state=str(tmp_path / "state.db"))
+    host = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs", network="host")
+    assert host.netns is None and CLONE_NEWNET not in host.namespaces
+
+    lo = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs")
+    assert CLONE_NEWNET in lo.namespaces
+    assert sim.links(lo.netns.fd)["lo"].up
+    assert lo.address is None
+
+    web = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                         network="bridge")
+    db = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                        network="bridge")
+    bridge = sim.links()["mcr0"]
+    assert bridge.up and bridge.addresses == ["10.88.0.1/16"]
+    veth = sim.links()[web.netns.veth]
+    assert veth.up and veth.master == "mcr0"
+    eth0 = sim.links(web.netns.fd)["eth0"]
+    assert eth0.up and eth0.addresses == [web.address] == ["10.88.0.2/16"]
+    assert sim.routes(web.netns.fd) == [("default", "10.88.0.1", "eth0")]
+    assert db.address == "10.88.0.3/16"
+    assert runtime.ps(state="running", limit=1)[0]["address"] == db.address
+
+    # Exit closes the namespace, which takes the veth with it
+    veth_name = web.netns.veth
+    sim.exit(web.pid, 0)
+    runtime.wait_all([web])
+    assert web.netns is None and veth_name not in sim.links()
+    assert runtime.network.ipam.in_use == 1
+
+    with pytest.raises(ValueError):
+        runtime.launch(["/bin/true"], rootfs="/tmp/rootfs", network="vpn")
+    with pytest.raises(ValueError):
+        MiniRuntime(backend=sim, network="vpn")
+    runtime.shutdown()
+
+
+def test_pool(sim):
+    manager = NetworkManager(pool_size=3, refill=False)
+    first = manager.acquire("bridge")
+    manager.prewarm("bridge")
+    assert manager.stats()["idle"]["bridge"] == 3
+    taken = [manager.acquire("bridge") for _ in range(3)]
+    stats = manager.stats()
+    assert (stats["hits"], stats["misses"], stats["created"]) == (3, 1, 4)
+    assert len({n.address for n in [first] + taken}) == 4
+    for netns in [first] + taken:
+        netns.close()
+        netns.close()  # idempotent
+    assert manager.stats()["addresses"] == 0
+    manager.prewarm("none", 2)
+    manager.shutdown()
+    assert list(sim.links()) == ["lo", "mcr0"]
+
+
+def _netns_works():
+    if os.geteuid() != 0:
+        return False
+    try:
+        os.close(LinuxBackend().netns_create())
+    except OSError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(not _netns_works(), reason="needs root and netns")
+def test_bridge_connectivity():
+    previous = set_backend(LinuxBackend())
+    bridge = f"mcrt{os.getpid() % 100000}"
+    manager = NetworkManager(bridge=bridge, subnet="10.251.7.0/24",
+                             pool_size=1, refill=False)
+    try:
+        netns = manager.acquire("bridge")
+        master = os.readlink(f"/sys/class/net/{netns.veth}/master")
+        assert os.path.basename(master) == bridge
+
+        # A datagram from inside the namespace reaches the host's end
+        # of the bridge with the container's address as its source
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind((str(manager.ipam.gateway), 0))
+        server.settimeout(5)
+        errors = []
+
+        def send():
+            try:
+                syscalls.setns(netns.fd, CLONE_NEWNET)
+                client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                client.sendto(b"hi", server.getsockname())
+                client.close()
+            except OSError as e:
+                errors.append(e)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        sender.join()
+        assert not errors
+        data, (source, _) = server.recvfrom(16)
+        assert (data, source) == (b"hi", str(netns.address.ip))
+        server.close()
+        netns.close()
+    finally:
+        manager.shutdown()
+        with Netlink(LinuxBackend().netlink_open()) as host:
+            host.delete_link(host.link_index(bridge))
+        set_backend(previous)
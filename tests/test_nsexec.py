@@ -0,0 +1,103 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_nsexec MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import signal
+import pytest
+from mini_container_runtime import container as container_module
+from mini_container_runtime import namespaces
+from mini_container_runtime.container import Container
+from mini_container_runtime.nsexec import exec_in
+
+
+@pytest.fixture
+def running(monkeypatch):
+    # A plain fork child "container" with no namespaces of its own
+    monkeypatch.setattr(namespaces, "set_hostname", lambda _: None)
+    monkeypatch.setattr(container_module, "setup_rootfs",
+                        lambda rootfs, overlay=None: None)
+    c = Container(["/bin/sh", "-c", "sleep 30"], rootfs="/")
+    c.namespaces = []
+    c.start()
+    yield c
+    if c.running:
+        os.kill(c.pid, signal.SIGKILL)
+        c.wait()
+
+
+def test_exec_captures_output_and_exit_code(running):
+    result = exec_in(
+        running, ["/bin/sh", "-c", "echo out; echo err >&2; exit 3"],
+        capture=True,
+    )
+    assert result.exit_code == 3
+    assert result.stdout == b"out\n" and result.stderr == b"err\n"
+    assert not result.timed_out
+
+
+def test_exec_timeout_kills_command(running):
+    result = exec_in(running, ["/bin/sh", "-c", "sleep 30"],
+                     capture=True, timeout=0.2)
+    assert result.timed_out
+    assert result.exit_code == 128 + signal.SIGKILL
+
+
+def test_exec_needs_running_container(running):
+    assert exec_in(running, ["/nonexistent"]).exit_code == 127
+    os.kill(running.pid, signal.SIGKILL)
+    running.wait()
+    with pytest.raises(ProcessLookupError):
+        exec_in(running, ["/bin/true"])
+
+
+def test_exec_joins_the_container_pid_namespace(monkeypatch):
+    monkeypatch.setattr(namespaces, "set_hostname", lambda _: None)
+    monkeypatch.setattr(container_module, "setup_rootfs",
+                        lambda rootfs, overlay=None: None)
+    c = Container(["/bin/sh", "-c", "sleep 30"], rootfs="/")
+    assert namespaces.CLONE_NEWPID in c.namespaces
+    c.start()
+    try:
+        result = exec_in(c, ["/bin/readlink", "/proc/self/ns/pid"],
+                         capture=True)
+        assert result.exit_code == 0
+        ours = os.readlink("/proc/self/ns/pid").encode()
+        theirs = os.readlink(f"/proc/{c.pid}/ns/pid").encode()
+        assert theirs != ours
+        assert result.stdout == theirs + b"\n"
+    finally:
+        os.kill(c.pid, signal.SIGKILL)
+        c.wait()
@@ -0,0 +1,159 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_output MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import gzip
+import os
+import time
+from mini_container_runtime.output import (
+    Compressor,
+    OutputCollector,
+    RingBuffer,
+    RotatingLog,
+)
+
+
+class FakeContainer:
+    def __init__(self, container_id):
+        self.id = container_id
+        self.stdio = None
+
+
+def test_ring_buffer_keeps_last_bytes_and_lines():
+    ring = RingBuffer(capacity=8)
+    for i in range(10):
+        ring.write(f"{i}\n".encode())
+    assert ring.tail() == b"6\n7\n8\n9\n"
+    assert ring.tail(lines=2) == b"8\n9\n"
+    assert ring.tail(lines=0) == b""
+
+
+def test_rotation_compresses_and_limits_backups(tmp_path):
+    path = str(tmp_path / "container.log")
+    compressor = Compressor()
+    logfile = RotatingLog(path, max_bytes=10, backups=2, compressor=compressor)
+    for chunk in (b"a" * 10, b"b" * 10, b"c" * 10, b"d" * 4):
+        logfile.write(chunk)
+    logfile.close()
+    compressor.close()
+
+    assert open(path, "rb").read() == b"d" * 4
+    assert gzip.open(path + ".1.gz").read() == b"c" * 10
+    assert gzip.open(path + ".2.gz").read() == b"b" * 10
+    assert sorted(os.listdir(tmp_path)) == [
+        "container.log", "container.log.1.gz", "container.log.2.gz"
+    ]
+
+
+def test_collector_captures_both_streams(tmp_path):
+    collector = OutputCollector(root=str(tmp_path), ring_size=1024)
+    container = FakeContainer("c1")
+    collector.attach(container)
+
+    pid = os.fork()
+    if pid == 0:
+        os.dup2(container.stdio[0], 1)
+        os.dup2(container.stdio[1], 2)
+        os.write(1, b"out\n" * 1000)
+        os.write(2, b"err\n")
+        os._exit(0)
+    for fd in container.stdio:
+        os.close(fd)
+    os.waitpid(pid, 0)
+
+    deadline = time.monotonic() + 5
+    while collector._by_fd and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert collector.tail("c1", lines=1) == b"err\n"
+    collector.close()
+
+    with open(tmp_path / "c1" / "container.log", "rb") as f:
+        data = f.read()
+    assert data.count(b"out\n") == 1000 and b"err\n" in data
+
+
+def _open_files(pid):
+    files = []
+    for fd in os.listdir(f"/proc/{pid}/fd"):
+        target = os.readlink(f"/proc/{pid}/fd/{fd}")
+        files.append("pipe" if target.startswith("pipe:") else target)
+    return sorted(files)
+
+
+def test_detach_leaves_running_output_to_a_drainer(tmp_path):
+    collector = OutputCollector(root=str(tmp_path), ring_size=1024)
+    container = FakeContainer("c1")
+    collector.attach(container)
+    go_r, go_w = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        os.dup2(container.stdio[0], 1)
+        os.dup2(container.stdio[1], 2)
+        os.write(1, b"before\n")
+        os.read(go_r, 1)
+        # The collector is gone by now; the pipes must still be read
+        os.write(1, b"after\n")
+        os.write(2, b"err\n")
+        os._exit(0)
+    for fd in container.stdio:
+        os.close(fd)
+    deadline = time.monotonic() + 5
+    while not collector.tail("c1") and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    drainer = collector.detach()
+    assert drainer is not None
+    # The drainer holds the two pipes, the log file and its own epoll
+    expected = [str(tmp_path / "c1" / "container.log"),
+                "anon_inode:[eventpoll]", "pipe", "pipe"]
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            held = _open_files(drainer)
+        except FileNotFoundError:
+            continue  # closed while listing
+        if held == expected:
+            break
+        time.sleep(0.01)
+    assert held == expected
+    os.write(go_w, b"x")
+    assert os.waitpid(pid, 0)[1] == 0
+    assert os.waitpid(drainer, 0)[1] == 0
+    os.close(go_r)
+    os.close(go_w)
+
+    with open(tmp_path / "c1" / "container.log", "rb") as f:
+        assert f.read() == b"before\nafter\nerr\n"
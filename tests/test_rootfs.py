@@ -0,0 +1,74 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_rootfs MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import pytest
+from mini_container_runtime import rootfs
+from mini_container_runtime.rootfs import RootfsBuilder, read_elf
+
+
+SH = os.path.realpath("/bin/sh")
+
+
+def test_read_elf_finds_interp_and_libc():
+    info = read_elf(SH)
+    if info["interp"] is None:
+        pytest.skip("/bin/sh is statically linked")
+    assert any(name.startswith("libc.so") for name in info["needed"])
+
+
+def test_build_copies_closure_once(tmp_path, monkeypatch):
+    calls = []
+    real_resolve = rootfs.resolve_closure
+
+    def counting_resolve(binary, lib_dirs=None):
+        calls.append(binary)
+        return real_resolve(binary, lib_dirs)
+
+    monkeypatch.setattr(rootfs, "resolve_closure", counting_resolve)
+    dest = tmp_path / "rootfs"
+
+    builder = RootfsBuilder(cache_dir=str(tmp_path / "cache"))
+    copied = builder.build([SH], str(dest))
+    assert copied >= 1
+    assert (dest / SH.lstrip("/")).exists()
+    for path in builder.closure(SH):
+        assert (dest / path.lstrip("/")).exists()
+
+    # A fresh builder reuses the on-disk cache and copies nothing
+    again = RootfsBuilder(cache_dir=str(tmp_path / "cache"))
+    assert again.build([SH], str(dest)) == 0
+    assert calls == [SH]
@@ -34,11 +34,38 @@
 # --------------------------------------------------
 # imports
 # --------------------------------------------------
+import errno
+import os
+import signal
+import time
 import pytest
+from mini_container_runtime import cgroups
+from mini_container_runtime.backend import SimulatedBackend, set_backend
+from mini_container_runtime.cgroups import Cgroup
 from mini_container_runtime.runtime import MiniRuntime
 from mini_container_runtime.container import Container
 
 
+@pytest.fixture
+def sim(monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 1000)
+    backend = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(backend)
+    yield backend
+    set_backend(previous)
+
+
+def _ignore_sigterm(sim, monkeypatch, pids):
+    signal_pidfd = sim.pidfd_signal
+
+    def pidfd_signal(pidfd, sig):
+        pid = next(p.pid for p in sim._procs.values() if p.pidfd == pidfd)
+        if sig != signal.SIGTERM or pid not in pids:
+            signal_pidfd(pidfd, sig)
+
+    monkeypatch.setattr(sim, "pidfd_signal", pidfd_signal)
+
+
 def test_runtime_requires_root(monkeypatch):
     monkeypatch.setattr("os.geteuid", lambda: 1000)
     with pytest.raises(PermissionError):
@@ -66,3 +93,115 @@ def test_run_container_creates_container(monkeypatch):
     assert c.command == ["/bin/echo", "hello"]
     assert c.rootfs == "/tmp/rootfs"
     assert c.hostname == "test-container"
+
+
+def _fake_start(self, warm=None):
+    # Stand-in child that exits with the code given as argv[1]
+    pid = os.fork()
+    if pid == 0:
+        time.sleep(float(self.command[2]))
+        os._exit(int(self.command[1]))
+    self.pid = pid
+    self.pidfd = os.pidfd_open(pid)
+    return pid
+
+
+def test_launch_returns_without_waiting(monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 0)
+    monkeypatch.setattr(Container, "start", _fake_start)
+
+    runtime = MiniRuntime()
+    c = runtime.launch(command=["exit", "3", "0.2"], rootfs="/tmp/rootfs")
+
+    assert c.running
+    assert runtime.containers[c.id] is c
+    assert c.wait() == 3
+    assert not c.running
+
+
+def test_run_many_wait_any_and_all(monkeypatch):
+    monkeypatch.setattr("os.geteuid", lambda: 0)
+    monkeypatch.setattr(Container, "start", _fake_start)
+
+    runtime = MiniRuntime()
+    specs = [
+        {"command": ["exit", "1", "0"], "rootfs": "/tmp/rootfs"},
+        {"command": ["exit", "2", "5"], "rootfs": "/tmp/rootfs"},
+    ]
+    fast, slow = runtime.run_many(specs)
+
+    assert runtime.wait_any() is fast
+    assert fast.exit_code == 1
+    assert runtime.wait_all(timeout=0.05) == [slow]
+
+    os.kill(slow.pid, 9)
+    assert runtime.wait_all() == []
+    assert slow.exit_code == -9
+
+
+def test_pause_resume_stop(sim, monkeypatch):
+    runtime = MiniRuntime(backend=sim)
+    c = runtime.launch(["/bin/sh"], rootfs="/tmp/rootfs")
+    assert runtime.pause(c.id) and c.paused
+    assert "frozen 1" in c.cgroup.read("cgroup.events")
+    runtime.resume(c.id)
+    assert not c.paused
+
+    runtime.pause(c.id)
+    assert runtime.stop(c.id, timeout=1) == -signal.SIGTERM
+
+    stubborn = runtime.launch(["/bin/sh"], rootfs="/tmp/rootfs")
+    _ignore_sigterm(sim, monkeypatch, {stubborn.pid})
+    assert runtime.stop(stubborn.id, timeout=0.05) == -signal.SIGKILL
+    assert sim.processes() == []
+    runtime.shutdown()
+
+
+def test_stop_all_kills_per_container(sim, monkeypatch):
+    runtime = MiniRuntime(backend=sim)
+    neighbour = MiniRuntime(backend=sim)
+    bystander = neighbour.launch(["/bin/sh"], rootfs="/tmp/rootfs")
+    fleet = [runtime.launch(["/bin/sh"], rootfs="/tmp/rootfs")
+             for _ in range(200)]
+    _ignore_sigterm(sim, monkeypatch, {c.pid for c in fleet[::2]})
+    kills = []
+    cgroup_kill = Cgroup.kill
+    monkeypatch.setattr(Cgroup, "kill",
+                        lambda cg: kills.append(cg) or cgroup_kill(cg))
+
+    killed = runtime.stop_all(timeout=0.05)
+    assert killed == fleet[::2]
+    assert len(kills) == len(killed)
+    assert runtime.cgroups.parent not in kills
+    assert not any(c.running for c in fleet)
+    assert {c.exit_code for c in fleet} == {-signal.SIGTERM, -signal.SIGKILL}
+    # The shared slice was left alone
+    assert bystander.running
+
+    # Without cgroup.kill (Linux < 5.14) init is SIGKILLed instead
+    def no_cgroup_kill(cg):
+        raise OSError(errno.ENOENT, "cgroup.kill")
+    monkeypatch.setattr(Cgroup, "kill", no_cgroup_kill)
+    _ignore_sigterm(sim, monkeypatch, {bystander.pid})
+    assert neighbour.stop_all(timeout=0) == [bystander]
+    assert bystander.exit_code == -signal.SIGKILL
+    assert sim.processes() == []
+    runtime.shutdown()
+    neighbour.shutdown()
+
+
+def test_exited_containers_are_forgotten_after_retention(sim):
+    runtime = MiniRuntime(backend=sim)
+    runtime.retention = 60
+    old = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs")
+    sim.exit(old.pid, 0)
+    runtime.wait_all([old], timeout=5)
+    assert old.id in runtime.containers
+
+    runtime.retention = 0
+    new = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs")
+    assert list(runtime.containers) == [new.id]
+    sim.exit(new.pid, 0)
+    runtime.wait_all([new], timeout=5)
+    assert runtime.containers == {}
+    runtime.shutdown()
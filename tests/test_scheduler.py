@@ -0,0 +1,277 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_scheduler MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import errno
+import os
+import pytest
+from mini_container_runtime import cgroups, scheduler
+from mini_container_runtime.backend import SimulatedBackend, set_backend
+from mini_container_runtime.scheduler import (
+    PlacementError, Scheduler, Topology, format_cpulist, parse_cpulist,
+)
+from mini_container_runtime.runtime import MiniRuntime
+
+
+GiB = 1024 ** 3
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def topology(tmp_path):
+    # Two nodes, four cores each with two hyperthreads:
+    # node0 cpus 0-7 (siblings n, n+4), node1 cpus 8-15 (n, n+4)
+    root = tmp_path / "system"
+    write(str(root / "cpu" / "online"), "0-15\n")
+    for cpu in range(16):
+        base = cpu - cpu % 8
+        first = base + cpu % 4
+        write(
+            str(root / "cpu" / f"cpu{cpu}" / "topology"
+                / "thread_siblings_list"),
+            f"{first},{first + 4}\n",
+        )
+    for node in (0, 1):
+        path = root / "node" / f"node{node}"
+        write(str(path / "cpulist"), f"{node * 8}-{node * 8 + 7}\n")
+        write(str(path / "meminfo"),
+              f"Node {node} MemTotal:  4194304 kB\n")
+    write(str(root / "node" / "possible"), "0-1\n")
+    return Topology.from_sysfs(str(root), str(tmp_path / "meminfo"))
+
+
+def test_cpulist_roundtrip():
+    assert parse_cpulist("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert format_cpulist([11, 0, 1, 2, 3, 8, 10]) == "0-3,8,10-11"
+    assert parse_cpulist("") == []
+
+
+def test_topology_from_sysfs(topology, tmp_path):
+    assert sorted(topology.nodes) == [0, 1]
+    node = topology.nodes[1]
+    assert node.cpus == list(range(8, 16))
+    assert node.memory == 4 * GiB
+    assert [8, 12] in node.cores and len(node.cores) == 4
+
+    # No node directory: one node with everything
+    root = tmp_path / "flat"
+    write(str(root / "cpu" / "online"), "0-1\n")
+    write(str(tmp_path / "flat_meminfo"), "MemTotal:  1024 kB\n")
+    flat = Topology.from_sysfs(str(root), str(tmp_path / "flat_meminfo"))
+    assert list(flat.nodes) == [0]
+    assert flat.nodes[0].memory == 1024 * 1024
+
+
+def test_exclusive_bin_packing_prefers_whole_cores(topology):
+    sched = Scheduler(topology, reserved_cpus="0")
+    a = sched.place("a", cpus=2, exclusive=True)
+    assert a.mems == [0]
+    assert a.cpus == [1, 5]  # one core with both threads, not 0's sibling
+
+    # Best fit keeps filling node 0 before touching node 1
+    b = sched.place("b", cpus=4, exclusive=True)
+    assert b.mems == [0]
+    assert sched.stats()["nodes"][0]["shared_pool"] == 1
+
+    # Too big for any one node: spans both
+    c = sched.place("c", cpus=9, exclusive=True)
+    assert c.mems == [0, 1] and len(c.cpus) == 9
+    with pytest.raises(PlacementError):
+        sched.place("d", cpus=1, exclusive=True)
+
+    sched.release("c")
+    assert sched.place("d", cpus=8, exclusive=True).mems == [1]
+    with pytest.raises(ValueError):
+        sched.place("e", cpus=1.5, exclusive=True)
+
+
+def test_shared_pool_shrinks_and_grows(topology):
+    sched = Scheduler(topology)
+    shared = sched.place("s", cpus=2)
+    assert shared.cpuset_cpus == "0-7" and shared.cpuset_mems == "0"
+
+    sched.place("x", cpus=4, exclusive=True)
+    changed = sched.updates()
+    assert list(changed) == ["s"]
+    assert len(changed["s"].cpus) == 4
+    assert set(changed["s"].cpus).isdisjoint(sched.get("x").cpus)
+    assert sched.updates() == {}
+
+    sched.release("x")
+    assert sched.updates()["s"].cpuset_cpus == "0-7"
+
+
+def test_exclusive_leaves_room_for_shared_load(topology):
+    sched = Scheduler(topology)
+    sched.place("s", cpus=6)
+    sched.place("t", cpus=6)
+    assert sched.get("t").mems == [1]
+    # Each node keeps six shared CPUs for its shared load
+    assert sched.place("x", cpus=2, exclusive=True).mems == [0]
+    assert sched.place("y", cpus=2, exclusive=True).mems == [1]
+    with pytest.raises(PlacementError):
+        sched.place("z", cpus=1, exclusive=True)
+
+
+def test_unbound_containers_never_get_an_empty_cpuset(topology):
+    sched = Scheduler(topology)
+    anywhere = sched.place_unbound("u")
+    assert anywhere.cpuset_cpus == "0-15" and anywhere.mems == [0, 1]
+    # Without reserved CPUs every node keeps one shared CPU for it
+    sched.place("x", cpus=7, exclusive=True)
+    sched.place("y", cpus=7, exclusive=True)
+    with pytest.raises(PlacementError):
+        sched.place("z", cpus=1, exclusive=True)
+    assert len(anywhere.cpus) == 2
+    assert not set(anywhere.cpus) & set(sched.get("x").cpus)
+
+    # With reserved CPUs the pool may run dry: it falls back to those
+    sched = Scheduler(topology, reserved_cpus="0")
+    anywhere = sched.place_unbound("u")
+    sched.place("x", cpus=7, exclusive=True)
+    sched.place("y", cpus=8, exclusive=True)
+    assert anywhere.cpuset_cpus == "0"
+    sched.release("y")
+    assert anywhere.cpuset_cpus == "8-15"
+
+    # Nothing at all left to share
+    sched = Scheduler(topology)
+    sched.place("x", cpus=8, exclusive=True)
+    sched.place("y", cpus=8, exclusive=True)
+    with pytest.raises(PlacementError):
+        sched.place_unbound("u")
+
+
+def test_spill_and_rehome(topology):
+    sched = Scheduler(topology)
+    sched.place("a", cpus=6)
+    sched.place("b", cpus=6)
+    spilled = sched.place("c", cpus=4)
+    assert spilled.spilled and spilled.mems == [0, 1]
+    assert sched.stats()["spilled"] == 1
+
+    sched.release("a")
+    assert "c" in sched.updates()
+    assert not spilled.spilled
+    assert spilled.mems == [0] and spilled.cpuset_cpus == "0-7"
+    assert sched.stats()["spilled"] == 0
+
+
+def test_memory_is_reserved_per_node(topology):
+    sched = Scheduler(topology, overcommit=4.0)
+    assert sched.place("a", cpus=1, memory=3 * GiB).mems == [0]
+    assert sched.place("b", cpus=1, memory=3 * GiB).mems == [1]
+    with pytest.raises(PlacementError):
+        sched.place("c", cpus=1, memory=3 * GiB)
+    sched.release("a")
+    assert sched.stats()["nodes"][0]["memory_free"] == 4 * GiB
+    assert sched.place("c", cpus=1, memory=3 * GiB).mems == [0]
+
+
+def test_runtime_applies_placements(topology, monkeypatch):
+    sim = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(sim)
+    monkeypatch.setattr(scheduler, "_topology", topology)
+    runtime = MiniRuntime(backend=sim, scheduler=True)
+    try:
+        shared = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                                cpus=1, memory_limit="1G")
+        assert shared.cgroup.read("cpuset.cpus") == "0-7\n"
+        assert shared.cgroup.read("cpuset.mems") == "0\n"
+        anywhere = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs")
+        assert anywhere.cgroup.read("cpuset.mems") == "0-1\n"
+
+        pinned = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs",
+                                cpus=4, exclusive=True)
+        # Two whole cores: 0/4 and 1/5 are hyperthread siblings
+        assert pinned.cgroup.read("cpuset.cpus") == "0-1,4-5\n"
+        # Shared and unbound containers moved off the exclusive CPUs
+        assert shared.cgroup.read("cpuset.cpus") == "2-3,6-7\n"
+        assert anywhere.cgroup.read("cpuset.cpus") == "2-3,6-15\n"
+
+        sim.exit(pinned.pid, 0)
+        assert runtime.wait_all([pinned], timeout=5) == []
+        assert shared.cgroup.read("cpuset.cpus") == "0-7\n"
+        assert runtime.scheduler.get(pinned.id) is None
+
+        sim.exit(shared.pid, 0)
+        sim.exit(anywhere.pid, 0)
+        runtime.wait_all(timeout=5)
+        assert runtime.scheduler.stats()["placed"] == 0
+        assert runtime.scheduler.stats()["unbound"] == 0
+    finally:
+        runtime.shutdown()
+        set_backend(previous)
+
+
+def test_failed_launch_gives_its_cpus_back(topology, monkeypatch):
+    sim = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(sim)
+    monkeypatch.setattr(scheduler, "_topology", topology)
+    runtime = MiniRuntime(backend=sim, scheduler=True)
+    try:
+        shared = runtime.launch(["/bin/true"], rootfs="/tmp/rootfs", cpus=1)
+
+        def no_clone(flags, cgroup=None):
+            raise OSError(errno.EAGAIN, "Resource temporarily unavailable")
+
+        monkeypatch.setattr(sim, "clone", no_clone)
+        with pytest.raises(OSError):
+            runtime.launch(["/bin/true"], rootfs="/tmp/rootfs", cpus=4,
+                           exclusive=True)
+        # The shared container got back the CPUs the failed launch held
+        assert shared.cgroup.read("cpuset.cpus") == "0-7\n"
+        assert runtime.scheduler.stats()["placed"] == 1
+    finally:
+        runtime.shutdown()
+        set_backend(previous)
+
+
+def test_cpus_without_scheduler_is_refused():
+    sim = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(sim)
+    runtime = MiniRuntime(backend=sim)
+    try:
+        with pytest.raises(RuntimeError):
+            runtime.launch(["/bin/true"], rootfs="/tmp/rootfs", cpus=2)
+        assert runtime.containers == {} and sim.processes() == []
+    finally:
+        runtime.shutdown()
+        set_backend(previous)
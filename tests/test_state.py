@@ -0,0 +1,214 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_state MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import functools
+import time
+import pytest
+from mini_container_runtime import cgroups, scheduler
+from mini_container_runtime import container as container_module
+from mini_container_runtime.backend import SimulatedBackend, set_backend
+from mini_container_runtime.container import Container
+from mini_container_runtime.runtime import MiniRuntime
+from mini_container_runtime.scheduler import NumaNode, Topology
+from mini_container_runtime.state import EXITED, RUNNING, StateStore
+
+
+def record(store, pid, age=0.0, **labels):
+    c = Container(["/bin/true"], rootfs="/tmp/rootfs", labels=labels,
+                  memory_limit="64M")
+    c.pid = pid
+    c.created -= age
+    c.started = c.created
+    store.started(c, start_time=pid)
+    return c
+
+
+def test_lifecycle_and_queries(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    web = record(store, 100, age=60, app="web", tier="front")
+    db = record(store, 101, age=5, app="db")
+    db.exit_code = 3
+    db.exited = True
+    store.exited(db)
+
+    assert [r["id"] for r in store.query()] == [db.id, web.id]
+    assert [r["id"] for r in store.query(state=RUNNING)] == [web.id]
+    assert [r["id"] for r in store.query(labels={"app": "web"})] == [web.id]
+    assert store.query(labels={"app": "web", "tier": "back"}) == []
+    assert [r["id"] for r in store.query(older_than=30)] == [web.id]
+    assert [r["id"] for r in store.query(newer_than=30)] == [db.id]
+
+    full = store.get(db.id)
+    assert full["state"] == EXITED and full["exit_code"] == 3
+    assert full["limits"] == {"memory.max": 64 * 1024 * 1024}
+    assert full["command"] == ["/bin/true"]
+    assert "command" not in store.query(state=EXITED)[0]
+    assert store.query(state=EXITED, full=True)[0]["labels"] == {"app": "db"}
+
+    # Re-recording replaces labels instead of piling them up
+    web.labels = {"app": "api"}
+    store.started(web, start_time=100)
+    assert store.query(labels={"app": "web"}) == []
+    assert store.count() == 2
+
+    assert store.prune(older_than=0) == 1
+    assert store.get(db.id) is None
+    store.close()
+
+    # Everything is still there after reopening
+    reopened = StateStore(str(tmp_path / "state.db"))
+    assert reopened.get(web.id)["labels"] == {"app": "api"}
+    reopened.close()
+
+
+def test_indexed_queries_at_scale(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    now = time.time()
+    entries = []
+    for i in range(50000):
+        c = Container(["/bin/true"], rootfs="/tmp/rootfs",
+                      labels={"app": f"app{i % 50}"})
+        c.pid = i
+        # Far enough apart that a slow insert does not shift the cut
+        c.created = now - 100 * (50000 - i)
+        entries.append((c, i))
+    store.started_many(entries)
+
+    start = time.monotonic()
+    assert len(store.query(labels={"app": "app7"})) == 1000
+    assert len(store.query(older_than=4998950)) == 11
+    assert len(store.query(state=RUNNING, limit=20)) == 20
+    assert store.count(RUNNING) == 50000
+    assert time.monotonic() - start < 1.0
+    store.close()
+
+
+@pytest.fixture
+def sim():
+    backend = SimulatedBackend(root=cgroups.CGROUP_ROOT)
+    previous = set_backend(backend)
+    yield backend
+    set_backend(previous)
+
+
+def test_restarted_runtime_adopts_running_containers(sim, tmp_path):
+    path = str(tmp_path / "state.db")
+    first = MiniRuntime(backend=sim, state=path)
+    keep = first.launch(["/bin/sh"], rootfs="/tmp/rootfs",
+                        labels={"app": "web"})
+    done = first.launch(["/bin/true"], rootfs="/tmp/rootfs")
+    vanished = first.launch(["/bin/true"], rootfs="/tmp/rootfs")
+    sim.exit(done.pid, 0)
+    first.wait_all([done], timeout=5)
+    assert first.ps(state=EXITED)[0]["id"] == done.id
+    # The runtime goes away without its containers
+    first.monitor.close()
+    first.state.close()
+    sim.exit(vanished.pid, 0)
+    sim.wait(vanished.pid)
+
+    second = MiniRuntime(backend=sim, state=path)
+    try:
+        assert list(second.containers) == [keep.id]
+        adopted = second.containers[keep.id]
+        assert adopted.labels == {"app": "web"}
+        assert adopted.cgroup.path == keep.cgroup.path
+        assert second.ps(state=RUNNING) == second.ps(labels={"app": "web"})
+        assert second.state.get(vanished.id)["state"] == EXITED
+
+        sim.exit(keep.pid, 4)
+        assert second.wait_all(timeout=5) == []
+        assert second.state.get(keep.id)["exit_code"] == 4
+    finally:
+        second.shutdown()
+
+
+def test_adopted_containers_keep_their_bookings(sim, tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "_topology",
+                        Topology([NumaNode(0, range(8), 8 << 30)]))
+    path = str(tmp_path / "state.db")
+    options = dict(backend=sim, state=path, scheduler=True, admission=True)
+    first = MiniRuntime(**options)
+    pinned = first.launch(["/bin/sh"], rootfs="/tmp/rootfs", cpus=2,
+                          exclusive=True, memory_limit="1G", tenant="db")
+    shared = first.launch(["/bin/sh"], rootfs="/tmp/rootfs", cpus=0.5,
+                          cpu_quota=0.5)
+    before = first.scheduler.stats()
+    first.monitor.close()
+    first.state.close()
+
+    second = MiniRuntime(**options)
+    try:
+        assert second.scheduler.stats() == before
+        placement = second.scheduler.get(pinned.id)
+        assert placement.exclusive and placement.cpuset_cpus == "0-1"
+        assert second.scheduler.get(shared.id).cpu_request == 0.5
+        budget = second.admission_stats()
+        assert budget["memory_used"] == 1 << 30
+        assert budget["cpu_used"] == 0.5
+
+        # Reaped through Container.wait(), not the monitor
+        sim.exit(pinned.pid, 3)
+        second.containers[pinned.id].wait()
+        assert second.state.get(pinned.id)["state"] == EXITED
+        assert second.scheduler.get(pinned.id) is None
+        assert second.admission_stats()["memory_used"] == 0
+    finally:
+        second.shutdown()
+
+
+def test_layer_stack_containers_are_adopted(sim, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        container_module, "OverlayRootfs",
+        functools.partial(container_module.OverlayRootfs,
+                          scratch_root=str(tmp_path / "scratch")),
+    )
+    path = str(tmp_path / "state.db")
+    layers = ["/layers/app", "/layers/base"]
+    first = MiniRuntime(backend=sim, state=path)
+    stacked = first.launch(["/bin/sh"], rootfs=layers, overlay=True)
+    first.monitor.close()
+    first.state.close()
+
+    second = MiniRuntime(backend=sim, state=path)
+    try:
+        adopted = second.containers[stacked.id]
+        assert adopted.rootfs == layers
+        assert adopted.overlay.merged == stacked.overlay.merged
+        sim.exit(stacked.pid, 0)
+        assert second.wait_all(timeout=5) == []
+    finally:
+        second.shutdown()
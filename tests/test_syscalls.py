@@ -0,0 +1,52 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_syscalls MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import errno
+import pytest
+from mini_container_runtime import syscalls
+
+
+def test_errno_maps_to_oserror_subclass(tmp_path):
+    missing = tmp_path / "missing"
+    with pytest.raises((FileNotFoundError, PermissionError)) as exc:
+        syscalls.umount2(str(missing))
+    assert exc.value.filename == str(missing)
+
+
+def test_setns_bad_fd_raises():
+    with pytest.raises(OSError) as exc:
+        syscalls.setns(-1, 0)
+    assert exc.value.errno == errno.EBADF
@@ -0,0 +1,170 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_telemetry MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import asyncio
+import threading
+from mini_container_runtime.cgroups import Cgroup
+from mini_container_runtime.telemetry import Sampler, parse
+
+
+class FakeContainer:
+    def __init__(self, cgroup):
+        self.id = "c1"
+        self.cgroup = cgroup
+        self.running = True
+
+
+def _container():
+    cg = Cgroup("mini_c1")
+    cg.write("memory.current", "4096\n")
+    cg.write("cpu.stat", "usage_usec 10\nuser_usec 7\nsystem_usec 3\n")
+    cg.write("memory.pressure",
+             "some avg10=1.50 avg60=0.00 avg300=0.00 total=12\n"
+             "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+    return FakeContainer(cg)
+
+
+def test_parse_formats():
+    assert parse("pids.current", "3\n") == 3
+    assert parse("memory.max", "max\n") is None
+    assert parse("io.stat", "8:0 rbytes=1 wbytes=2\n") == {
+        "8:0": {"rbytes": 1, "wbytes": 2}
+    }
+
+
+def test_subscriber_receives_samples(cgroupfs):
+    container = _container()
+    sampler = Sampler(interval=0.01)
+    samples = sampler.subscribe()
+    sampler.watch(container)
+    sampler.start()
+
+    sample = next(samples)
+    assert sample["container"] == "c1"
+    assert sample["memory.current"] == 4096
+    assert sample["cpu.stat"]["usage_usec"] == 10
+    assert sample["memory.pressure"]["some"]["avg10"] == 1.5
+    assert "io.stat" not in sample
+
+    # Exited containers are dropped and their fds closed
+    container.running = False
+    sampler.stop()
+    remaining = list(samples)  # ends once the sampler stops
+    assert all(s["container"] == "c1" for s in remaining)
+    assert sampler._watched == {}
+
+
+def test_reused_cgroup_is_sampled_from_its_baseline(cgroupfs):
+    container = _container()
+    cg = container.cgroup
+    cg.write("memory.peak", "8192\n")
+    cg.apply({"memory.max": 1024})
+    assert cg.reset()
+
+    # The next container's share, not the cgroup's lifetime totals
+    cg.write("cpu.stat", "usage_usec 15\nuser_usec 10\nsystem_usec 5\n")
+    cg.write("memory.current", "2048\n")
+    sampler = Sampler()
+    sampler.watch(container)
+    _, fds, backend, baseline = sampler._watched["c1"]
+    try:
+        sample = sampler.sample(container, fds, backend, baseline)
+    finally:
+        sampler.stop()
+
+    assert sample["cpu.stat"] == {
+        "usage_usec": 5, "user_usec": 3, "system_usec": 2,
+    }
+    assert sample["memory.peak"] == 2048
+
+
+def test_reads_do_not_hold_up_watch_or_unwatch(cgroupfs):
+    container = _container()
+    backend = container.cgroup.backend
+    reading, release = threading.Event(), threading.Event()
+    closed = []
+    stat_read, stat_close = backend.stat_read, backend.stat_close
+
+    def slow_read(fd):
+        reading.set()
+        release.wait(5)
+        return stat_read(fd)
+
+    def close(fd):
+        closed.append(fd)
+        stat_close(fd)
+
+    backend.stat_read, backend.stat_close = slow_read, close
+    sampler = Sampler(interval=0.01)
+    sampler.watch(container)
+    _, fds, _, _ = sampler._watched["c1"]
+    sampler.start()
+    try:
+        assert reading.wait(5)
+        # Mid-read: neither call waits for the round to finish...
+        other = FakeContainer(Cgroup("mini_c2"))
+        other.id = "c2"
+        sampler.watch(other)
+        sampler.unwatch("c1")
+        # ...and the fds being read stay open until it has
+        assert closed == []
+        release.set()
+    finally:
+        release.set()
+        sampler.stop()
+        del backend.stat_read, backend.stat_close
+    assert set(fds.values()) <= set(closed)
+
+
+def test_async_stream(cgroupfs):
+    container = _container()
+    sampler = Sampler(interval=0.01)
+    sampler.watch(container)
+
+    async def first():
+        async for sample in sampler.stream():
+            return sample
+
+    async def main():
+        task = asyncio.ensure_future(first())
+        await asyncio.sleep(0)
+        sampler.start()
+        return await task
+
+    try:
+        assert asyncio.run(main())["memory.current"] == 4096
+    finally:
+        sampler.stop()
@@ -0,0 +1,113 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_tracing MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import errno
+import json
+import os
+import pytest
+from mini_container_runtime import namespaces, tracing
+from mini_container_runtime.container import Container
+
+
+@tracing.traced("work")
+def _work(x):
+    return x * 2
+
+
+def test_disabled_tracing_is_a_noop():
+    assert tracing.current() is None
+    assert tracing.span("anything") is tracing._NOOP
+    assert _work(2) == 4
+
+
+def test_spans_recorded_when_active():
+    trace = tracing.Trace("c1")
+    with tracing.activate(trace):
+        with tracing.span("outer", step=1):
+            assert _work(3) == 6
+    assert tracing.current() is None
+
+    spans = trace.to_json()["spans"]
+    assert [s["name"] for s in spans] == ["outer", "work"]
+    assert spans[0]["args"] == {"step": 1}
+    assert all(s["end_ns"] >= s["start_ns"] for s in spans)
+
+
+def test_child_spans_come_back_over_pipe(tmp_path):
+    trace = tracing.Trace("c1")
+    with tracing.activate(trace):
+        trace.open_channel()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _work(1)
+                trace.send()
+            finally:
+                os._exit(0)
+        trace.collect(pid)
+    os.waitpid(pid, 0)
+
+    names = {s["name"]: s for s in trace.spans}
+    assert names["work"]["pid"] == pid
+    assert names["exec"]["end_ns"] >= names["exec"]["start_ns"]
+
+    path = tmp_path / "trace.json"
+    trace.export(str(path), fmt="chrome")
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {e["name"] for e in events} == {"work", "exec"}
+    assert all(e["ph"] == "X" and e["args"]["container"] == "c1"
+               for e in events)
+
+
+def test_failed_spawn_closes_the_channel(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError(errno.EAGAIN, "no more pids")
+
+    monkeypatch.setattr(namespaces, "spawn", fail)
+    def pipes():
+        found = 0
+        for fd in os.listdir("/proc/self/fd"):
+            try:
+                found += os.readlink(f"/proc/self/fd/{fd}").startswith("pipe:")
+            except FileNotFoundError:
+                pass  # the listing's own fd
+        return found
+
+    c = Container(command=["/bin/true"], rootfs="/tmp/rootfs", trace=True)
+    before = pipes()
+    with pytest.raises(OSError):
+        c.start()
+    assert pipes() == before
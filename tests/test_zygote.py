@@ -0,0 +1,141 @@
+# --------------------------------------------------
+# -*- Python -*- Compatibility Header
+#
+# Copyright (C) 2023 Developer Jarvis (Pen Name)
+#
+# This file is part of the Mini Container Runtime Library. This library is free
+# software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+#
+# Mini Container Runtime - Start isolated "containers" using namespaces (Linux)
+#               Skills: OS internals, syscalls, process management
+#
+# Author: Developer Jarvis (Pen Name)
+# Contact: https://github.com/DeveloperJarvis
+#
+# --------------------------------------------------
+
+# --------------------------------------------------
+# test_zygote MODULE
+# --------------------------------------------------
+
+# --------------------------------------------------
+# imports
+# --------------------------------------------------
+import os
+import signal
+import threading
+import pytest
+from mini_container_runtime import container as container_module
+from mini_container_runtime import namespaces
+from mini_container_runtime import zygote
+from mini_container_runtime.container import Container
+from mini_container_runtime.zygote import ZygotePool
+
+
+@pytest.fixture
+def unisolated(tmp_path, monkeypatch):
+    # Plain fork children, no chroot/hostname, cgroups under tmp_path
+    real_spawn = namespaces.spawn
+    monkeypatch.setattr(
+        "mini_container_runtime.cgroups.CGROUP_ROOT",
+        str(tmp_path / "cgroup")
+    )
+    monkeypatch.setattr(
+        namespaces, "spawn", lambda ns, cgroup_fd=None: real_spawn([])
+    )
+    monkeypatch.setattr(namespaces, "set_hostname", lambda _: None)
+    monkeypatch.setattr(zygote, "setup_rootfs", lambda _: None)
+    monkeypatch.setattr(container_module, "setup_rootfs",
+                        lambda *args, **kwargs: None)
+
+
+def test_warm_hit_execs_command(unisolated):
+    pool = ZygotePool(size=2, refill=False)
+    pool.prewarm("/tmp/rootfs")
+    assert pool.stats()["idle"] == 2
+
+    member = pool.acquire("/tmp/rootfs")
+    c = Container(command=["/bin/sh", "-c", "exit 5"], rootfs="/tmp/rootfs")
+    c.start(warm=member)
+
+    assert c.pid == member.pid
+    assert c.wait() == 5
+    assert pool.stats()["hits"] == 1
+    pool.shutdown()
+
+
+def test_miss_and_eviction(unisolated):
+    pool = ZygotePool(size=1, refill=False)
+    assert pool.acquire("/tmp/other") is None
+
+    pool.prewarm("/tmp/other")
+    assert pool.evict(max_idle=0) == 1
+
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.0
+    assert stats["evicted"] == 1
+    assert stats["idle"] == 0
+    pool.shutdown()
+
+
+def test_dead_member_falls_back_to_a_cold_start(unisolated):
+    pool = ZygotePool(size=1, refill=False)
+    pool.prewarm("/tmp/rootfs")
+    member = pool.acquire("/tmp/rootfs")
+    os.kill(member.pid, signal.SIGKILL)
+    os.waitid(os.P_PIDFD, member.pidfd, os.WEXITED | os.WNOWAIT)
+
+    c = Container(command=["/bin/sh", "-c", "exit 5"], rootfs="/tmp/rootfs",
+                  cgroups=pool.cgroups)
+    c.start(warm=member)
+
+    assert c.pid != member.pid
+    assert c.wait() == 5
+    assert member.cgroup in pool.cgroups._dead  # released, not leaked
+    pool.shutdown()
+
+
+def test_failed_handoff_releases_the_members_cgroup(unisolated, monkeypatch):
+    pool = ZygotePool(size=1, refill=False)
+    pool.prewarm("/tmp/rootfs")
+    member = pool.acquire("/tmp/rootfs")
+
+    c = Container(command=["/bin/true"], rootfs="/tmp/rootfs",
+                  cgroups=pool.cgroups)
+    monkeypatch.setattr(c, "_apply_limits", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        c.start(warm=member)
+
+    assert c.cgroup is None
+    assert member.cgroup in pool.cgroups._dead
+    pool.shutdown()
+
+
+def test_concurrent_prewarm_does_not_overshoot(unisolated):
+    pool = ZygotePool(size=2, refill=False)
+    threads = [
+        threading.Thread(target=pool.prewarm, args=("/tmp/rootfs",))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert pool.stats()["idle"] == 2
+    assert pool.stats()["created"] == 2
+    pool.shutdown()